@@ -0,0 +1,296 @@
+import argparse
+import csv
+import itertools
+import json
+import logging
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import toml
+
+from inference.embedding_cache import EmbeddingCache
+from inference.infer import FlatClassifier
+from inference.runtime_settings import (
+    apply_runtime_settings,
+    quantized_engines,
+)
+from train_args import args as config
+
+result_prefix = "AUTOTUNE_RESULT "
+
+cwd = Path(__file__).resolve().parent
+cpu_count = os.cpu_count() or 1
+
+parser = argparse.ArgumentParser(
+    description="Find the torch thread, quantized engine and tokenizer settings with the lowest single query latency on this machine."
+)
+parser.add_argument(
+    "--candidate-threads",
+    type=int,
+    nargs="+",
+    help="the intra-op thread counts to try. Defaults to powers of two up to the number of CPUs",
+    default=sorted(
+        {2**i for i in range(cpu_count.bit_length()) if 2**i <= cpu_count} | {cpu_count}
+    ),
+)
+parser.add_argument(
+    "--candidate-interop-threads",
+    type=int,
+    nargs="+",
+    help="the inter-op thread counts to try. Each one runs in its own process as torch only allows it to be set once",
+    default=[1, 2],
+)
+parser.add_argument(
+    "--candidate-engines",
+    type=str,
+    nargs="+",
+    help="the quantized engines to try. Defaults to every supported engine when uses_quantized_model is on",
+    default=None,
+)
+parser.add_argument(
+    "--candidate-tokenizers-parallelism",
+    type=str,
+    nargs="+",
+    help="the tokenizer parallelism settings to try",
+    choices=["true", "false"],
+    default=["true", "false"],
+)
+parser.add_argument(
+    "--queries-file",
+    type=str,
+    help="a file of representative queries, one per line. Defaults to the benchmarking data, or the warm up queries if there isn't any",
+    default=None,
+)
+parser.add_argument(
+    "--number-of-queries",
+    type=int,
+    help="how many queries to time for each combination of settings",
+    default=200,
+)
+parser.add_argument(
+    "--warm-up-iterations",
+    type=int,
+    help="how many queries to run (untimed) before timing each combination of settings",
+    default=10,
+)
+parser.add_argument(
+    "--write-config",
+    help="write the winning settings to search-config.toml (or the file passed with --config)",
+    required=False,
+    default=False,
+    action="store_true",
+)
+parser.add_argument(
+    "--output",
+    help="choose how you want the results outputted",
+    type=str,
+    default="text",
+    choices=["text", "json"],
+)
+parser.add_argument(
+    "--trial-interop-threads",
+    type=int,
+    help=argparse.SUPPRESS,
+    default=None,
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("autotune")
+
+
+def load_queries(queries_file: str | None, number_of_queries: int) -> list[str]:
+    if queries_file is not None:
+        with open(queries_file, "r") as f:
+            queries = f.read().splitlines()
+    else:
+        queries = []
+
+        for file in sorted((cwd / "benchmarking_data").glob("**/*.csv")):
+            with open(file, "r") as f:
+                queries += [row[0] for row in csv.reader(f) if row]
+
+        queries = queries or config.warm_up_queries()
+
+    queries = list(dict.fromkeys(q.strip().lower() for q in queries if q.strip()))
+
+    if len(queries) > number_of_queries:
+        queries = random.Random(0).sample(queries, number_of_queries)
+
+    return queries
+
+
+def percentile(latencies: list[float], percent: float) -> float:
+    return latencies[int(percent * (len(latencies) - 1))]
+
+
+def run_trials(options, interop_threads: int) -> list[dict]:
+    """
+    Times single query classification (as the Lambda does) for every combination of settings with the
+    given number of inter-op threads. This has to run in a fresh process as inter-op threads can only be set once.
+    """
+    apply_runtime_settings(num_interop_threads=interop_threads)
+
+    engines = options.candidate_engines or (
+        quantized_engines() if config.uses_quantized_model() else [""]
+    )
+    queries = load_queries(options.queries_file, options.number_of_queries)
+    trials = []
+
+    for engine in engines:
+        # Quantized layers are packed for the engine in effect when they're loaded and keep using it, so the
+        # classifier is loaded again for each engine
+        apply_runtime_settings(
+            num_interop_threads=interop_threads, quantized_engine=engine
+        )
+        classifier = FlatClassifier(
+            FlatClassifier.load_subheadings(),
+            "cpu",
+            embedding_cache=EmbeddingCache(max_size=0),
+        )
+
+        for threads, tokenizers_parallelism in itertools.product(
+            options.candidate_threads,
+            options.candidate_tokenizers_parallelism,
+        ):
+            settings = apply_runtime_settings(
+                threads, interop_threads, engine, tokenizers_parallelism
+            )
+            trials.append(run_trial(options, classifier, queries, settings))
+
+    return trials
+
+
+def run_trial(options, classifier, queries: list[str], settings: dict) -> dict:
+    for query in queries[: options.warm_up_iterations]:
+        classifier.classify(query)
+
+    latencies = []
+
+    for query in queries:
+        start = time.perf_counter()
+        classifier.classify(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    latencies.sort()
+    trial = {
+        **settings,
+        "queries": len(queries),
+        "meanLatencyMs": sum(latencies) / len(latencies),
+        "p50LatencyMs": percentile(latencies, 0.5),
+        "p99LatencyMs": percentile(latencies, 0.99),
+    }
+    logger.info(f"Trial {trial}")
+
+    return trial
+
+
+def run_trial_process(interop_threads: int) -> list[dict]:
+    completed = subprocess.run(
+        [
+            sys.executable,
+            __file__,
+            *sys.argv[1:],
+            "--trial-interop-threads",
+            str(interop_threads),
+        ],
+        stdout=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+
+    return [
+        json.loads(line[len(result_prefix) :])
+        for line in completed.stdout.splitlines()
+        if line.startswith(result_prefix)
+    ]
+
+
+def set_config_values(config_text: str, values: dict) -> str:
+    """
+    Sets top level keys of a TOML config in place, appending any that aren't there yet, so the rest of the
+    file (its comments, order and formatting) is left as it is.
+    """
+    for key, value in values.items():
+        line = toml.dumps({key: value}).strip()
+        pattern = re.compile(rf"^{re.escape(key)}\s*=.*$", re.MULTILINE)
+
+        if pattern.search(config_text):
+            config_text = pattern.sub(
+                lambda _match, line=line: line, config_text, count=1
+            )
+        else:
+            config_text = config_text.rstrip("\n") + "\n" + line + "\n"
+
+    return config_text
+
+
+def write_config(winner: dict) -> None:
+    config_file = config.parsed_args.config or config.pwd() / "search-config.toml"
+
+    with open(config_file, "r") as f:
+        config_text = f.read()
+
+    config_text = set_config_values(
+        config_text,
+        {
+            "torch_num_threads": winner["num_threads"],
+            "torch_num_interop_threads": winner["num_interop_threads"],
+            "torch_quantized_engine": winner["quantized_engine"],
+            "tokenizers_parallelism": winner["tokenizers_parallelism"],
+        },
+    )
+
+    with open(config_file, "w") as f:
+        f.write(config_text)
+
+    logger.info(f"Wrote the winning settings to {config_file}")
+
+
+if __name__ == "__main__":
+    # Anything else (e.g. --config) is for the shared configuration
+    options, _unknown = parser.parse_known_args()
+
+    if options.trial_interop_threads is not None:
+        for trial in run_trials(options, options.trial_interop_threads):
+            print(result_prefix + json.dumps(trial), flush=True)
+
+        sys.exit(0)
+
+    trials = [
+        trial
+        for interop_threads in options.candidate_interop_threads
+        for trial in run_trial_process(interop_threads)
+    ]
+    trials.sort(key=lambda trial: (trial["p50LatencyMs"], trial["p99LatencyMs"]))
+    winner = trials[0]
+
+    if options.output == "json":
+        print(json.dumps({"winner": winner, "trials": trials}, indent=4))
+    else:
+        # Imported here as prettytable isn't in the Lambda image, which is where this is most useful to run
+        from prettytable import PrettyTable
+
+        table = PrettyTable(list(winner))
+        for trial in trials:
+            table.add_row(
+                [
+                    round(value, 2) if isinstance(value, float) else value
+                    for value in trial.values()
+                ]
+            )
+        print(table)
+        print(
+            "Winning settings for search-config.toml:\n"
+            f"torch_num_threads = {winner['num_threads']}\n"
+            f"torch_num_interop_threads = {winner['num_interop_threads']}\n"
+            f'torch_quantized_engine = "{winner["quantized_engine"]}"\n'
+            f'tokenizers_parallelism = "{winner["tokenizers_parallelism"]}"'
+        )
+
+    if options.write_config:
+        write_config(winner)
@@ -5,10 +5,13 @@ from typing import Union
 
 import aws_lambda_powertools
 
+from aws_lambda.result_cache import ResultCache
+from aws_lambda.startup_profiler import profiler
 from data_sources.search_references import SearchReferencesDataSource
 from data_sources.vague_terms import VagueTermsCSVDataSource
+from inference.cascade import CascadeClassifier
 from inference.infer import ClassificationResult, Classifier
-from train_args import TrainScriptArgsParser
+from train_args import args, shared_config
 from training.cleaning_pipeline import (
     CleaningPipeline,
     DescriptionLower,
@@ -19,43 +22,50 @@ from training.cleaning_pipeline import (
     StripExcessCharacters,
 )
 
-with open("REVISION", "r") as f:
-    REVISION = f.read().strip()
+with profiler.phase("config"):
+    with open("REVISION", "r") as f:
+        REVISION = f.read().strip()
 
-with open("MODEL_VERSION", "r") as f:
-    MODEL_VERSION = f.read().strip()
+    with open("MODEL_VERSION", "r") as f:
+        MODEL_VERSION = f.read().strip()
 
-args = TrainScriptArgsParser()
-args.load_config_file()
-language_skips_file = args.pwd() / args.partial_non_english_terms()
-language_keeps_file = args.pwd() / args.partial_english_terms()
-language_keeps_exact_file = args.pwd() / args.exact_english_terms()
+    shared_config()
 
-with open(language_skips_file, "r") as f:
-    language_skips = f.read().splitlines()
+with profiler.phase("reference files"):
+    language_skips_file = args.pwd() / args.partial_non_english_terms()
+    language_keeps_file = args.pwd() / args.partial_english_terms()
+    language_keeps_exact_file = args.pwd() / args.exact_english_terms()
 
-with open(language_keeps_file, "r") as f:
-    language_keeps = f.read().splitlines()
+    with open(language_skips_file, "r") as f:
+        language_skips = f.read().splitlines()
 
-with open(language_keeps_exact_file, "r") as f:
-    language_keeps_exact = f.read().splitlines()
+    with open(language_keeps_file, "r") as f:
+        language_keeps = f.read().splitlines()
 
-filters = [
-    StripExcessCharacters(),
-    RemoveEmptyDescription(),
-    DescriptionLower(),
-    RemoveShortDescription(min_length=1),
-    RemoveDescriptionsMatchingRegexes.build(),
-    LanguageCleaning(
+    with open(language_keeps_exact_file, "r") as f:
+        language_keeps_exact = f.read().splitlines()
+
+with profiler.phase("cleaning pipeline"):
+    language_cleaning = LanguageCleaning(
         detected_languages=args.detected_languages(),
         preferred_languages=args.preferred_languages(),
         partial_skips=language_skips,
         partial_keeps=language_keeps,
         exact_keeps=language_keeps_exact,
-    ),
-]
-
-pipeline = CleaningPipeline(filters, return_meta=True)
+        preload_models=True,
+        low_accuracy=args.language_detection_low_accuracy(),
+    )
+    filters = [
+        StripExcessCharacters(),
+        RemoveEmptyDescription(),
+        DescriptionLower(),
+        RemoveShortDescription(min_length=1),
+        RemoveDescriptionsMatchingRegexes.build(),
+        language_cleaning,
+    ]
+
+    # Compiled so that a request doesn't build meta for every cleaner. Rejections still carry their reason.
+    pipeline = CleaningPipeline(filters).compile()
 
 
 def log_handler(func):
@@ -87,15 +97,45 @@ class LambdaHandler:
         logger: aws_lambda_powertools.Logger | logging.Logger = logging.getLogger(
             "handler"
         ),
+        result_cache: ResultCache | None = None,
+        first_stage: Classifier | None = None,
+        cascade_threshold: float | None = None,
     ) -> None:
-        self._classifier = classifier
         self._logger = logger
-        self._search_references = SearchReferencesDataSource.build_from_json()
-        self._vague_terms = VagueTermsCSVDataSource(
-            args.vague_terms_data_file(),
-            args.vague_terms_regex_file(),
+        self._cascade = None
+
+        # In cascade mode the cheap first stage answers the searches it's confident about
+        if first_stage is not None:
+            self._cascade = CascadeClassifier(
+                first_stage,
+                classifier,
+                args.cascade_threshold()
+                if cascade_threshold is None
+                else cascade_threshold,
+            )
+
+        self._classifier = classifier if self._cascade is None else self._cascade
+        self._result_cache = (
+            ResultCache(
+                max_size=args.result_cache_size(),
+                ttl_seconds=args.result_cache_ttl_seconds(),
+            )
+            if result_cache is None
+            else result_cache
         )
 
+        with profiler.phase("search references"):
+            self._search_references = SearchReferencesDataSource.build_from_json()
+
+        with profiler.phase("vague terms"):
+            self._vague_terms = VagueTermsCSVDataSource(
+                args.vague_terms_data_file(),
+                args.vague_terms_regex_file(),
+            )
+            # Load the terms and patterns now rather than on the first request
+            self._vague_terms.get_codes(0)
+            self._vague_terms.get_patterns()
+
     def handle(self, event, _context):
         if isinstance(self._logger, aws_lambda_powertools.Logger):
             api_key_id = (
@@ -117,6 +157,66 @@ class LambdaHandler:
 
         return handler(event, _context)
 
+    def warm_up(self, queries: list[str] | None = None) -> dict[str, float]:
+        """
+        Runs synthetic queries through every stage of the handler (cleaning, vague terms, search references,
+        encode, head and the full request path) so that lazy initialisation happens during the Lambda's init
+        phase rather than on the first customer request.
+
+        Returns the total milliseconds spent in each stage.
+        """
+        queries = args.warm_up_queries() if queries is None else queries
+        timings: dict[str, float] = {}
+
+        def timed(stage, func, *func_args):
+            start = time.perf_counter()
+            result = func(*func_args)
+            timings[stage] = (
+                timings.get(stage, 0.0) + (time.perf_counter() - start) * 1000
+            )
+
+            return result
+
+        # Keep the warm-up outcomes out of the result cache (and its stats)
+        result_cache = self._result_cache
+        self._result_cache = ResultCache(max_size=0)
+
+        try:
+            for query in queries:
+                (_subheading, cleaned_description, _meta), cleaning_timings = (
+                    self._clean(query)
+                )
+                description = cleaned_description or query
+
+                for stage, lapsed in cleaning_timings.items():
+                    timings[stage] = timings.get(stage, 0.0) + lapsed
+
+                timed(
+                    "vague_terms", self._vague_terms.includes_description, description
+                )
+                timed(
+                    "search_references",
+                    self._search_references.get_commodity_code,
+                    description,
+                )
+
+                for stage, lapsed in self._classifier.warm_up([description]).items():
+                    timings[stage] = timings.get(stage, 0.0) + lapsed
+
+                timed("handler", self._handle_classification, query, "6", "5", False)
+        finally:
+            self._result_cache = result_cache
+            # Nor should the warm-up count towards the cascade or embedding cache stats
+            self._classifier.reset_stats()
+
+        self._logger.info(
+            "Warm-up completed in %.2fms",
+            sum(timings.values()),
+            extra={"warm_up_queries": len(queries), "warm_up_timings_ms": timings},
+        )
+
+        return timings
+
     @log_handler
     def handle_fpo_code_search_post(self, event, _context):
         if not event.get("body"):
@@ -145,6 +245,9 @@ class LambdaHandler:
 
         return response
 
+    def cascade_stats(self) -> dict | None:
+        return None if self._cascade is None else self._cascade.stats()
+
     def handle_healthcheck_get(self, event, _context):
         return {
             "statusCode": 200,
@@ -166,7 +269,11 @@ class LambdaHandler:
         }
 
     def _handle_classification(
-        self, description: str, digits: Union[str, int], limit: Union[str, int]
+        self,
+        description: str,
+        digits: Union[str, int],
+        limit: Union[str, int],
+        log: bool = True,
     ):
         valid = self._validate(description, digits, limit)
 
@@ -176,7 +283,17 @@ class LambdaHandler:
                 "body": json.dumps({"message": f"Invalid value for {valid[1]}"}),
             }
 
-        (_subheading, cleaned_description, meta) = pipeline.filter("", description)
+        # Cleaning outcomes (including rejections) are cached against the raw description
+        cleaning_key = ("cleaning", description)
+        cleaned = self._result_cache.get(cleaning_key)
+        cleaning_cache_hit = cleaned is not None
+        cleaning_timings: dict[str, float] = {}
+
+        if cleaned is None:
+            cleaned, cleaning_timings = self._clean(description)
+            self._result_cache.put(cleaning_key, cleaned)
+
+        (_subheading, cleaned_description, meta) = cleaned
 
         if cleaned_description is None:
             reason = filter(
@@ -184,53 +301,90 @@ class LambdaHandler:
             )
             reason = list(reason)
 
+            if log:
+                self._logger.info(
+                    "Skipping classification due to cleaning",
+                    extra={
+                        "request_description": description,
+                        "request_digits": int(digits),
+                        "request_limit": int(limit),
+                        "cleaned_description": cleaned_description,
+                        "cleaned_reason": reason,
+                        "meta": meta,
+                        "cache_hit": cleaning_cache_hit,
+                        "timings_ms": cleaning_timings,
+                    },
+                )
+
+            return {
+                "statusCode": 400,
+                "body": json.dumps({"message": reason}),
+            }
+
+        # Classification outcomes (including vague term rejections) are cached against the cleaned description
+        results_key = ("results", cleaned_description, int(digits), int(limit))
+        results = self._result_cache.get(results_key)
+        cache_hit = results is not None
+
+        if results is None:
+            results = self._classify(cleaned_description, digits, limit)
+            self._result_cache.put(results_key, results)
+
+        cascade_extra = (
+            {} if self._cascade is None else {"cascade": self._cascade.stats()}
+        )
+
+        if log:
             self._logger.info(
-                "Skipping classification due to cleaning",
+                "Inference result",
                 extra={
+                    **cascade_extra,
                     "request_description": description,
                     "request_digits": int(digits),
                     "request_limit": int(limit),
+                    "result_count": len(results),
+                    "results": results,
                     "cleaned_description": cleaned_description,
-                    "cleaned_reason": reason,
                     "meta": meta,
+                    "cache_hit": cache_hit,
+                    "timings_ms": cleaning_timings,
                 },
             )
 
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"message": reason}),
-            }
+        return {"statusCode": 200, "body": json.dumps({"results": results})}
+
+    def _clean(self, description: str) -> tuple[tuple, dict[str, float]]:
+        """
+        Runs the cleaning pipeline and returns its outcome along with the milliseconds spent detecting the
+        description's language and in the rest of cleaning.
+        """
+        detection_ms = language_cleaning.detection_ms
+        start = time.perf_counter()
+        cleaned = pipeline.filter("", description)
+        lapsed = (time.perf_counter() - start) * 1000
+        detection_ms = language_cleaning.detection_ms - detection_ms
 
-        early_result = self._early_result(cleaned_description, digits)
+        return cleaned, {
+            "cleaning": lapsed - detection_ms,
+            "language_detection": detection_ms,
+        }
+
+    def _classify(
+        self, description: str, digits: Union[str, int], limit: Union[str, int]
+    ) -> list[dict]:
+        early_result = self._early_result(description, digits)
 
         if early_result is None:
             results = []
         elif early_result:
             results = early_result
         else:
-            results = self._classifier.classify(
-                cleaned_description, int(limit), int(digits)
-            )
+            results = self._classifier.classify(description, int(limit), int(digits))
 
-        results = [
+        return [
             {"code": result.code, "score": result.score * 1000} for result in results
         ]
 
-        self._logger.info(
-            "Inference result",
-            extra={
-                "request_description": description,
-                "request_digits": int(digits),
-                "request_limit": int(limit),
-                "result_count": len(results),
-                "results": results,
-                "cleaned_description": cleaned_description,
-                "meta": meta,
-            },
-        )
-
-        return {"statusCode": 200, "body": json.dumps({"results": results})}
-
     def _early_result(
         self, description: str, digits: Union[str, int]
     ) -> list[ClassificationResult] | None:
@@ -0,0 +1,153 @@
+import json
+import os
+import resource
+import sys
+import time
+from contextlib import contextmanager
+from os import PathLike
+from typing import Iterator, Union
+
+
+def current_rss_mb() -> float:
+    """
+    The resident set size of this process in MB. Falls back to the peak RSS where /proc isn't available.
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and kilobytes everywhere else
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class StartupProfiler:
+    """
+    Records the wall time and RSS of each import and init phase of the Lambda so that cold start work can be
+    driven by data.
+
+    Phases can be nested. When disabled every phase is a no-op so the profiler can stay in place in production.
+
+    It's configured through environment variables rather than search-config.toml because parsing the config is
+    one of the phases it measures:
+
+    - STARTUP_PROFILE=1 enables it
+    - STARTUP_PROFILE_TRACE=<path> also writes a Chrome trace (open it in chrome://tracing or Perfetto)
+    """
+
+    def __init__(
+        self, enabled: bool = False, trace_file: Union[str, PathLike, None] = None
+    ) -> None:
+        self.enabled = enabled
+        self.trace_file = trace_file
+        self.phases: list[dict] = []
+        self._origin = time.perf_counter()
+        self._depth = 0
+
+    @classmethod
+    def from_environment(cls) -> "StartupProfiler":
+        trace_file = os.environ.get("STARTUP_PROFILE_TRACE") or None
+
+        return cls(
+            enabled=os.environ.get("STARTUP_PROFILE", "0") == "1"
+            or trace_file is not None,
+            trace_file=trace_file,
+        )
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+
+        record = {
+            "name": name,
+            "depth": self._depth,
+            "start_ms": (time.perf_counter() - self._origin) * 1000,
+            "rss_start_mb": current_rss_mb(),
+        }
+        # Record the phase up front so that phases are reported in the order they started
+        self.phases.append(record)
+        self._depth += 1
+
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            record["duration_ms"] = (
+                time.perf_counter() - self._origin
+            ) * 1000 - record["start_ms"]
+            record["rss_end_mb"] = current_rss_mb()
+            record["rss_delta_mb"] = record["rss_end_mb"] - record["rss_start_mb"]
+
+    def report(self) -> dict:
+        return {
+            "total_ms": sum(
+                phase["duration_ms"] for phase in self.phases if phase["depth"] == 0
+            ),
+            "rss_mb": current_rss_mb(),
+            "phases": self.phases,
+        }
+
+    def chrome_trace(self) -> dict:
+        pid = os.getpid()
+
+        return {
+            "traceEvents": [
+                {
+                    "name": phase["name"],
+                    "ph": "X",
+                    "ts": phase["start_ms"] * 1000,
+                    "dur": phase["duration_ms"] * 1000,
+                    "pid": pid,
+                    "tid": 0,
+                    "args": {
+                        "rss_start_mb": round(phase["rss_start_mb"], 2),
+                        "rss_end_mb": round(phase["rss_end_mb"], 2),
+                        "rss_delta_mb": round(phase["rss_delta_mb"], 2),
+                    },
+                }
+                for phase in self.phases
+            ]
+            + [
+                {
+                    "name": "rss_mb",
+                    "ph": "C",
+                    "ts": phase["start_ms"] * 1000,
+                    "pid": pid,
+                    "args": {"rss_mb": round(phase["rss_start_mb"], 2)},
+                }
+                for phase in self.phases
+            ],
+            "displayTimeUnit": "ms",
+        }
+
+    def finish(self, logger) -> dict | None:
+        """
+        Logs the structured breakdown of the startup phases and writes the Chrome trace if one was asked for.
+        """
+        if not self.enabled:
+            return None
+
+        report = self.report()
+
+        logger.info(
+            "Startup profile: %.2fms, %.2fMB RSS",
+            report["total_ms"],
+            report["rss_mb"],
+            extra={"startup_profile": report},
+        )
+
+        if self.trace_file is not None:
+            with open(self.trace_file, "w") as f:
+                json.dump(self.chrome_trace(), f)
+
+            logger.info(f"Startup trace written to {self.trace_file}")
+
+        return report
+
+
+# Shared by every module that takes part in the Lambda's init phase
+profiler = StartupProfiler.from_environment()
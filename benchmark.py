@@ -1,17 +1,40 @@
 import argparse
+import copy
+import io
 import json
 import logging
 import os
+import sys
+import time
 from pathlib import Path
 from typing import List
 
+import torch
 import tqdm
 from prettytable import PrettyTable
 from prettytable.colortable import ColorTable, Themes
 
+from aws_lambda.startup_profiler import current_rss_mb
 from data_sources.basic_csv import BasicCSVDataSource
 from data_sources.data_source import DataSource
-from inference.infer import FlatClassifier
+from inference.cascade import CascadeClassifier
+from inference.embedding_cache import EmbeddingCache
+from inference.infer import (
+    Classifier,
+    FlatClassifier,
+    LeanSentenceEncoder,
+    encoders,
+)
+from inference.mips_index import CandidatePrunedModel, MipsIndex
+from inference.ngram_classifier import load_ngram_classifier
+from inference.sequence_length import (
+    candidate_max_seq_lengths,
+    log_truncation_report,
+    truncation_report,
+)
+from inference.static_encoder import StaticSentenceEncoder
+from model.bundle import ModelBundle
+from model.model import HierarchicalNN
 from train_args import TrainScriptArgsParser
 from training.cleaning_pipeline import (
     CleaningPipeline,
@@ -63,6 +86,86 @@ parser.add_argument(
     action="store_true",
 )
 
+parser.add_argument(
+    "--batch-size",
+    type=int,
+    help="how many descriptions to classify in a single batch. 0 classifies each one on its own, as the Lambda does",
+    default=0,
+)
+
+parser.add_argument(
+    "--compare-backends",
+    help="compare the accuracy and latency of the torch and onnx inference backends. Default is False",
+    required=False,
+    default=False,
+    action="store_true",
+)
+
+parser.add_argument(
+    "--compare-quantized-encoder",
+    help="compare the accuracy, latency and size of the fp32 and int8 quantized sentence transformer. Default is False",
+    required=False,
+    default=False,
+    action="store_true",
+)
+
+parser.add_argument(
+    "--compare-lean-encoder",
+    help="micro-benchmark encoding single descriptions with SentenceTransformer.encode and with the lean encoder, and check the embeddings are identical. Default is False",
+    required=False,
+    default=False,
+    action="store_true",
+)
+
+parser.add_argument(
+    "--compare-encoders",
+    type=str,
+    nargs="+",
+    help="compare the accuracy, latency and memory of the classifier pipelines with each of these encoders (e.g. teacher student static)",
+    choices=encoders,
+    default=None,
+)
+
+parser.add_argument(
+    "--compare-cascade-thresholds",
+    type=float,
+    nargs="+",
+    help="compare the accuracy and latency of the transformer classifier, the n-gram classifier and the cascade of the two at each of these thresholds, and how often the n-gram classifier answers",
+    default=None,
+)
+
+parser.add_argument(
+    "--compare-fc2-ranks",
+    type=int,
+    nargs="+",
+    help="compare the accuracy, head latency and size of the (fp32) model with its output layer (fc2) dense and factorised by a truncated SVD at each of these ranks",
+    default=None,
+)
+
+parser.add_argument(
+    "--compare-hierarchy-top-headings",
+    type=int,
+    nargs="+",
+    help="compare the accuracy, head latency and parity with full scoring of the (fp32) hierarchical model when it only scores the subheadings under each of these numbers of top headings",
+    default=None,
+)
+
+parser.add_argument(
+    "--compare-fc2-candidates",
+    type=int,
+    nargs="+",
+    help="compare the accuracy, head latency and candidate recall (of the top 5 under full scoring) of the (fp32) model when it only scores each of these numbers of fc2 index candidates",
+    default=None,
+)
+
+parser.add_argument(
+    "--compare-max-seq-lengths",
+    type=int,
+    nargs="+",
+    help="compare the accuracy and latency of the classifier with each of these sentence transformer max sequence lengths, and how many descriptions each would truncate",
+    default=None,
+)
+
 parser.add_argument(
     "--output",
     help="choose how you want the results outputted",
@@ -169,8 +272,6 @@ model_file = target_dir / "model.pt"
 if not model_file.exists():
     raise FileNotFoundError(f"Could not find model file: {model_file}")
 
-classifier = FlatClassifier(subheadings, device)
-
 data_sources: List[DataSource] = []
 
 benchmarking_data_dir = cwd / "benchmarking_data"
@@ -247,15 +348,473 @@ details = []  # New: collect per-description details
 if args.number_of_items:
     items = items[: args.number_of_items]
 
-progress_items = tqdm.tqdm(items) if not no_progress else items
+items = [item for item in items if item[0] not in skip_descriptions]
 
-for description, code in progress_items:
-    if description in skip_descriptions:
-        continue
 
-    num += 1
+def module_size_mb(module) -> float:
+    buffer = io.BytesIO()
+    torch.save(module.state_dict(), buffer)
+
+    return buffer.tell() / 1024 / 1024
+
+
+def compare_classifiers(
+    classifiers: dict[str, Classifier], extra: dict[str, dict] | None = None
+):
+    """
+    Classifies each item one at a time (as the Lambda does) with each classifier and reports the
+    accuracy, the per item latency and how often the top code agrees with the first classifier.
+
+    Any extra columns (e.g. model sizes) can be passed per classifier.
+    """
+    if not items:
+        logger.warning("There are no benchmark items to compare the classifiers on")
+        return
+
+    reference_codes = None
+    comparison = {}
+
+    for name, candidate in classifiers.items():
+        latencies = []
+        top_codes = []
+        first = 0
+        top5 = 0
 
-    term_results = classifier.classify(description, 5, digits)
+        for description, code in tqdm.tqdm(items, desc=name, disable=no_progress):
+            start = time.perf_counter()
+            term_results = candidate.classify(description, 5, digits)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+            codes = [tr.code for tr in term_results]
+            top_codes.append(codes[0] if codes else None)
+            first += 1 if codes[:1] == [code] else 0
+            top5 += 1 if code in codes else 0
+
+        reference_codes = reference_codes or top_codes
+        agreement = sum(a == b for a, b in zip(reference_codes, top_codes))
+        latencies.sort()
+
+        comparison[name] = {
+            "total": len(items),
+            "result1Percent": 100 * first / len(items),
+            "inTop5Percent": 100 * top5 / len(items),
+            "agreementPercent": 100 * agreement / len(items),
+            "meanLatencyMs": sum(latencies) / len(latencies),
+            "p50LatencyMs": latencies[int(0.5 * (len(latencies) - 1))],
+            "p99LatencyMs": latencies[int(0.99 * (len(latencies) - 1))],
+            **(extra or {}).get(name, {}),
+        }
+
+    if output == "json":
+        print(json.dumps(comparison, indent=4))
+    else:
+        table = PrettyTable(["Classifier"] + list(next(iter(comparison.values()))))
+        for name, row in comparison.items():
+            table.add_row(
+                [name]
+                + [
+                    round(value, 2) if isinstance(value, float) else value
+                    for value in row.values()
+                ]
+            )
+        print(table)
+
+
+if args.compare_backends:
+    compare_classifiers(
+        {
+            backend: FlatClassifier(
+                subheadings,
+                device,
+                backend=backend,
+                embedding_cache=EmbeddingCache(max_size=0),
+            )
+            for backend in ["torch", "onnx"]
+        }
+    )
+    sys.exit(0)
+
+if args.compare_quantized_encoder:
+    encoder_classifiers = {
+        name: FlatClassifier(
+            subheadings,
+            device,
+            backend="torch",
+            embedding_cache=EmbeddingCache(max_size=0),
+            quantize_transformer=quantized,
+        )
+        for name, quantized in [("fp32 encoder", False), ("int8 encoder", True)]
+    }
+    compare_classifiers(
+        encoder_classifiers,
+        {
+            name: {"encoderSizeMb": module_size_mb(candidate.sentence_transformer)}
+            for name, candidate in encoder_classifiers.items()
+        },
+    )
+    sys.exit(0)
+
+
+def compare_encoders(sentence_transformer):
+    """
+    Encodes each description on its own (as the Lambda does) with SentenceTransformer.encode and with the
+    lean encoder and reports the latency of each along with how many embeddings are bit-identical.
+    """
+    lean_encoder = LeanSentenceEncoder(sentence_transformer, device)
+    encoders = {
+        "SentenceTransformer.encode": lambda description: sentence_transformer.encode(
+            [description],
+            convert_to_tensor=True,
+            device=device,
+            show_progress_bar=False,
+            normalize_embeddings=True,
+        ),
+        "LeanSentenceEncoder": lambda description: lean_encoder.encode_one(
+            description
+        ).clone(),
+    }
+    latencies = {name: [] for name in encoders}
+    identical = 0
+
+    for description, _code in tqdm.tqdm(items, disable=no_progress):
+        embeddings = []
+
+        for name, encode in encoders.items():
+            start = time.perf_counter()
+            embeddings.append(encode(description))
+            latencies[name].append((time.perf_counter() - start) * 1000)
+
+        identical += 1 if torch.equal(*embeddings) else 0
+
+    comparison = {}
+
+    for name, encoder_latencies in latencies.items():
+        encoder_latencies.sort()
+        comparison[name] = {
+            "total": len(items),
+            "identicalPercent": 100 * identical / len(items),
+            "meanLatencyMs": sum(encoder_latencies) / len(encoder_latencies),
+            "p50LatencyMs": encoder_latencies[int(0.5 * (len(encoder_latencies) - 1))],
+            "p99LatencyMs": encoder_latencies[int(0.99 * (len(encoder_latencies) - 1))],
+        }
+
+    if output == "json":
+        print(json.dumps(comparison, indent=4))
+    else:
+        table = PrettyTable(["Encoder"] + list(next(iter(comparison.values()))))
+        for name, row in comparison.items():
+            table.add_row(
+                [name]
+                + [
+                    round(value, 2) if isinstance(value, float) else value
+                    for value in row.values()
+                ]
+            )
+        print(table)
+
+
+if args.compare_lean_encoder:
+    compare_encoders(
+        FlatClassifier(
+            subheadings, device, backend="torch", lean_encoder=False
+        ).sentence_transformer
+    )
+    sys.exit(0)
+
+
+def encoder_footprint(encoder) -> dict:
+    if isinstance(encoder, StaticSentenceEncoder):
+        return {
+            "encoderSizeMb": encoder.embeddings.nbytes / 1024 / 1024,
+            "encoderParameters": encoder.embeddings.size,
+        }
+
+    return {
+        "encoderSizeMb": module_size_mb(encoder),
+        "encoderParameters": sum(
+            parameter.numel() for parameter in encoder.parameters()
+        ),
+    }
+
+
+if args.compare_encoders:
+    encoder_classifiers = {}
+    memory = {}
+
+    for encoder in args.compare_encoders:
+        # The RSS growth while loading each pipeline is approximate as the allocator can reuse freed memory
+        rss_before = current_rss_mb()
+        encoder_classifiers[encoder] = FlatClassifier(
+            subheadings,
+            device,
+            backend="torch",
+            embedding_cache=EmbeddingCache(max_size=0),
+            encoder=encoder,
+        )
+        memory[encoder] = {
+            "loadRssMb": current_rss_mb() - rss_before,
+            **encoder_footprint(encoder_classifiers[encoder].sentence_transformer),
+        }
+
+    compare_classifiers(encoder_classifiers, memory)
+    sys.exit(0)
+
+if args.compare_cascade_thresholds:
+    transformer_classifier = FlatClassifier(
+        subheadings, device, embedding_cache=EmbeddingCache(max_size=0)
+    )
+    first_stage = load_ngram_classifier(target_dir / "ngram_classifier", subheadings)
+    # How often the first stage answers only depends on its top score, so find those once up front
+    top_scores = [
+        results[0].score if results else None
+        for results in first_stage.classify_batch(
+            [description for description, _code in items], 5, digits
+        )
+    ]
+    cascade_classifiers = {
+        f"cascade {threshold}": CascadeClassifier(
+            first_stage, transformer_classifier, threshold
+        )
+        for threshold in args.compare_cascade_thresholds
+    }
+    compare_classifiers(
+        {
+            "transformer": transformer_classifier,
+            "n-gram": first_stage,
+            **cascade_classifiers,
+        },
+        {
+            "transformer": {"firstStagePercent": 0.0},
+            "n-gram": {"firstStagePercent": 100.0},
+            **{
+                name: {
+                    "firstStagePercent": 100
+                    * sum(
+                        score is not None and score >= cascade.threshold
+                        for score in top_scores
+                    )
+                    / len(top_scores)
+                }
+                for name, cascade in cascade_classifiers.items()
+            },
+        },
+    )
+    sys.exit(0)
+
+
+def head_latency_ms(model, embeddings: torch.Tensor) -> float:
+    """
+    The mean milliseconds the model takes to score one embedding at a time (as the Lambda does).
+    """
+    start = time.perf_counter()
+
+    with torch.no_grad():
+        for i in range(len(embeddings)):
+            model(embeddings[i : i + 1])
+
+    return (time.perf_counter() - start) * 1000 / len(embeddings)
+
+
+if args.compare_fc2_ranks:
+    dense_model = ModelBundle.load(FlatClassifier.bundle_file(False)).build_model()
+    rank_models = {
+        "dense": dense_model,
+        **{
+            f"fc2 rank {rank}": copy.deepcopy(dense_model).factorise_fc2(rank)
+            for rank in args.compare_fc2_ranks
+        },
+    }
+    sentence_transformer = FlatClassifier(
+        subheadings, device, model=dense_model
+    ).sentence_transformer
+    embeddings = sentence_transformer.encode(
+        [description for description, _code in items],
+        convert_to_tensor=True,
+        device=device,
+        show_progress_bar=not no_progress,
+        normalize_embeddings=True,
+    ).cpu()
+    compare_classifiers(
+        {
+            name: FlatClassifier(
+                subheadings,
+                device,
+                model=model,
+                sentence_transformer_model=sentence_transformer,
+                embedding_cache=EmbeddingCache(max_size=0),
+            )
+            for name, model in rank_models.items()
+        },
+        {
+            name: {
+                "modelSizeMb": module_size_mb(model),
+                "fc2Parameters": sum(
+                    parameter.numel() for parameter in model.fc2.parameters()
+                ),
+                "headLatencyMs": head_latency_ms(model, embeddings),
+            }
+            for name, model in rank_models.items()
+        },
+    )
+    sys.exit(0)
+
+if args.compare_hierarchy_top_headings:
+    full_model = ModelBundle.load(FlatClassifier.bundle_file(False)).build_model()
+
+    if not isinstance(full_model, HierarchicalNN):
+        raise ValueError("The model wasn't trained with the hierarchical head")
+
+    full_model.eval()
+    full_model.top_headings = 0
+    top_heading_models = {"full scoring": full_model}
+
+    for top_headings in args.compare_hierarchy_top_headings:
+        # A shallow copy shares the weights
+        pruned_model = copy.copy(full_model)
+        pruned_model.top_chapters = training_args.hierarchy_top_chapters()
+        pruned_model.top_headings = top_headings
+        top_heading_models[
+            f"top {pruned_model.top_chapters} chapters, {top_headings} headings"
+        ] = pruned_model
+
+    sentence_transformer = FlatClassifier(
+        subheadings, device, model=full_model
+    ).sentence_transformer
+    embeddings = sentence_transformer.encode(
+        [description for description, _code in items],
+        convert_to_tensor=True,
+        device=device,
+        show_progress_bar=not no_progress,
+        normalize_embeddings=True,
+    ).cpu()
+    # The agreement column is the parity of the pruned models' top result with full scoring
+    compare_classifiers(
+        {
+            name: FlatClassifier(
+                subheadings,
+                device,
+                model=model,
+                sentence_transformer_model=sentence_transformer,
+                embedding_cache=EmbeddingCache(max_size=0),
+            )
+            for name, model in top_heading_models.items()
+        },
+        {
+            name: {"headLatencyMs": head_latency_ms(model, embeddings)}
+            for name, model in top_heading_models.items()
+        },
+    )
+    sys.exit(0)
+
+if args.compare_fc2_candidates:
+    full_model = ModelBundle.load(FlatClassifier.bundle_file(False)).build_model()
+    candidate_models = {"full scoring": full_model}
+
+    for candidates in args.compare_fc2_candidates:
+        candidate_models[f"{candidates} candidates"] = CandidatePrunedModel(
+            full_model, MipsIndex(FlatClassifier.fc2_index_dir()), candidates
+        )
+
+    sentence_transformer = FlatClassifier(
+        subheadings, device, model=full_model
+    ).sentence_transformer
+    embeddings = sentence_transformer.encode(
+        [description for description, _code in items],
+        convert_to_tensor=True,
+        device=device,
+        show_progress_bar=not no_progress,
+        normalize_embeddings=True,
+    ).cpu()
+    compare_classifiers(
+        {
+            name: FlatClassifier(
+                subheadings,
+                device,
+                model=model,
+                sentence_transformer_model=sentence_transformer,
+                embedding_cache=EmbeddingCache(max_size=0),
+            )
+            for name, model in candidate_models.items()
+        },
+        {
+            name: {
+                "candidateRecallPercent": (
+                    100 * model.recall(embeddings)
+                    if isinstance(model, CandidatePrunedModel)
+                    else 100.0
+                ),
+                "headLatencyMs": head_latency_ms(model, embeddings),
+            }
+            for name, model in candidate_models.items()
+        },
+    )
+    sys.exit(0)
+
+if args.compare_max_seq_lengths:
+    length_classifiers = {
+        f"max_seq_length {max_seq_length}": FlatClassifier(
+            subheadings,
+            device,
+            embedding_cache=EmbeddingCache(max_size=0),
+            max_seq_length=max_seq_length,
+        )
+        for max_seq_length in args.compare_max_seq_lengths
+    }
+    truncation = truncation_report(
+        next(iter(length_classifiers.values())).sentence_transformer.tokenizer,
+        [description for description, _code in items],
+        args.compare_max_seq_lengths,
+    )
+    compare_classifiers(
+        length_classifiers,
+        {
+            f"max_seq_length {max_seq_length}": truncation[max_seq_length]
+            for max_seq_length in args.compare_max_seq_lengths
+        },
+    )
+    sys.exit(0)
+
+classifier = FlatClassifier(subheadings, device)
+
+log_truncation_report(
+    logger,
+    "benchmark descriptions",
+    classifier.sentence_transformer.tokenizer,
+    [description for description, _code in items],
+    sorted(
+        set(candidate_max_seq_lengths)
+        | {classifier.sentence_transformer.max_seq_length}
+    ),
+)
+
+batches = [
+    items[i : i + args.batch_size]
+    for i in range(0, len(items), max(args.batch_size, 1))
+]
+progress = tqdm.tqdm(total=len(items), disable=no_progress)
+
+
+def classified_items():
+    if args.batch_size < 1:
+        for description, code in items:
+            term_results = classifier.classify(description, 5, digits)
+            progress.update(1)
+
+            yield (description, code), term_results
+
+        return
+
+    for batch in batches:
+        batch_results = classifier.classify_batch(
+            [description for description, _code in batch], 5, digits
+        )
+        progress.update(len(batch))
+
+        yield from zip(batch, batch_results)
+
+
+for (description, code), term_results in classified_items():
+    num += 1
 
     # New: Assume term_results is list of objects with .code and .score
     predictions = [{"code": tr.code, "score": tr.score} for tr in term_results]
@@ -290,6 +849,8 @@ for description, code in progress_items:
     if term_results and term_results[0].code[:6] == code[:6]:
         res["subheading"] += 1
 
+progress.close()
+
 top5sum = res["1"] + res["2"] + res["3"] + res["4"] + res["5"]
 
 columns = [
@@ -8,6 +8,7 @@ from typing import Any, Dict, List, Optional, Set, Union
 import dill
 
 from data_sources.data_source import DataSource
+from train_args import args
 from training.cleaning_pipeline import CleaningPipeline
 
 logger = logging.getLogger(__name__)
@@ -16,32 +17,48 @@ logger = logging.getLogger(__name__)
 def generate_chunk_wrapper(serialized_args: bytes) -> Dict[str, Set[str]]:
     """Wrapper function to deserialize arguments and do any processing."""
     # Deserialize the arguments
-    cleaning_pipeline_data, chunk, code_col, description_col, digits = dill.loads(
-        serialized_args
-    )
-
-    # Reconstruct the cleaning pipeline
+    (
+        cleaning_pipeline_data,
+        chunk,
+        code_col,
+        description_col,
+        digits,
+        batch_cleaning,
+    ) = dill.loads(serialized_args)
+
+    # Reconstruct the cleaning pipeline and compile it for this worker
     if cleaning_pipeline_data:
         cleaning_pipeline = CleaningPipeline.from_serialized_data(
             cleaning_pipeline_data
-        )
+        ).compile()
     else:
         cleaning_pipeline = None
 
     # Process the chunk
     codes: dict[str, set[str]] = {}
+    rows = [
+        (row[code_col].replace(" ", "")[:digits], row[description_col].strip().lower())
+        for row in chunk
+    ]
+
+    if cleaning_pipeline and batch_cleaning:
+        cleaned = cleaning_pipeline.filter_many(
+            [subheading for subheading, _description in rows],
+            [description for _subheading, description in rows],
+        )
+        rows = zip(
+            cleaned.subheadings[cleaned.keep].tolist(),
+            cleaned.descriptions[cleaned.keep].tolist(),
+        )
+    elif cleaning_pipeline:
+        rows = [
+            cleaning_pipeline.filter(subheading, description)[:2]
+            for subheading, description in rows
+        ]
 
-    for row in chunk:
-        subheading = row[code_col].replace(" ", "")[:digits]
-        description = row[description_col].strip().lower()
-
-        if cleaning_pipeline:
-            subheading, description, _meta = cleaning_pipeline.filter(
-                subheading, description
-            )
-
-            if subheading is None or description is None:
-                continue
+    for subheading, description in rows:
+        if subheading is None or description is None:
+            continue
 
         if subheading in codes:
             codes[subheading].add(description)
@@ -51,6 +68,11 @@ def generate_chunk_wrapper(serialized_args: bytes) -> Dict[str, Set[str]]:
     return codes
 
 
+def limit_detection_threads(threads: int) -> None:
+    """Caps the threads lingua's batch language detection starts in this worker."""
+    os.environ["RAYON_NUM_THREADS"] = str(threads)
+
+
 class BasicCSVDataSource(DataSource):
     def __init__(
         self,
@@ -62,6 +84,7 @@ class BasicCSVDataSource(DataSource):
         authoritative: bool = False,
         creates_codes: bool = False,
         multiplier: int = 1,
+        batch_cleaning: Optional[bool] = None,
     ) -> None:
         super().__init__(
             description=f"CSV data source from {str(filename)}",
@@ -74,6 +97,9 @@ class BasicCSVDataSource(DataSource):
         self._code_col = code_col
         self._description_col = description_col
         self._encoding = encoding
+        self._batch_cleaning = (
+            args.batch_cleaning() if batch_cleaning is None else batch_cleaning
+        )
 
     def get_codes(self, digits: int) -> dict[str, set[str]]:
         with open(self.filename, mode="r", encoding=self._encoding) as csv_file:
@@ -104,33 +130,41 @@ class BasicCSVDataSource(DataSource):
             next(csv_reader)
             code_data = list(csv_reader)
 
-        codes = []
-        for row in code_data:
-            subheading = row[self._code_col].replace(" ", "")[:digits]
-            description = row[self._description_col].strip().lower()
-            uncleaned_subheading = row[self._code_col]
-            uncleaned_description = row[self._description_col]
+        if not self.cleaning_pipeline:
+            return []
 
-            if self.cleaning_pipeline:
-                subheading, description, meta = self.cleaning_pipeline.filter(
-                    subheading, description
-                )
-                result = [
-                    subheading,
-                    description,
-                    uncleaned_subheading,
-                    uncleaned_description,
-                    meta,
-                ]
-                codes.append(result)
+        cleaned = self.cleaning_pipeline.filter_many(
+            [row[self._code_col].replace(" ", "")[:digits] for row in code_data],
+            [row[self._description_col].strip().lower() for row in code_data],
+        )
 
-        return codes
+        return [
+            [
+                subheading if keep else None,
+                description if keep else None,
+                row[self._code_col],
+                row[self._description_col],
+                {rejected_by: {"reason": reason}} if rejected_by else {},
+            ]
+            for row, keep, subheading, description, rejected_by, reason in zip(
+                code_data,
+                cleaned.keep.tolist(),
+                cleaned.subheadings.tolist(),
+                cleaned.descriptions.tolist(),
+                cleaned.rejected_by.tolist(),
+                cleaned.reasons.tolist(),
+            )
+        ]
 
     def _do_work(
         self, chunks: List[List[List[str]]], digits: int
     ) -> List[dict[str, set[str]]]:
         all_results = []
-        with ProcessPoolExecutor(self._max_workers()) as executor:
+        with ProcessPoolExecutor(
+            self._max_workers(),
+            initializer=limit_detection_threads,
+            initargs=(self._detection_threads(),),
+        ) as executor:
             # Serialize only the necessary components using dill
             serialized_tasks = [
                 dill.dumps(
@@ -144,6 +178,7 @@ class BasicCSVDataSource(DataSource):
                         self._code_col,
                         self._description_col,
                         digits,
+                        self._batch_cleaning,
                     )
                 )
                 for chunk in chunks
@@ -174,6 +209,10 @@ class BasicCSVDataSource(DataSource):
                     codes[subheading] = descriptions
         return codes
 
+    def _detection_threads(self) -> int:
+        # Each worker's batch language detection gets its share of the cores rather than all of them
+        return max(1, (os.cpu_count() or 1) // self._max_workers())
+
     def _max_workers(self, core_percentage: float = 0.8) -> int:
         cores = os.cpu_count() or 1
         return max(1, int(cores * core_percentage))
@@ -1,9 +1,7 @@
 import csv
 import datetime
 import logging
-from typing import Dict, List, Optional, Set, Tuple
-
-import requests
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
 from data_sources.data_source import DataSource
 from training.cleaning_pipeline import CleaningPipeline
@@ -59,17 +57,28 @@ class CommoditiesDataSource(DataSource):
         )
 
         self._url = url
-        self._cleaning_pipeline = cleaning_pipeline
+        self._cleaning_pipeline = (
+            cleaning_pipeline.compile() if cleaning_pipeline else None
+        )
 
     def get_codes(self, digits: int) -> Dict[str, Set[str]]:
         commodities: Dict[str, Set[str]] = {}
         hierarchical_descriptions: Dict[str, str] = {}
+        subheadings: List[str] = []
+        descriptions: List[str] = []
 
         for index, row in enumerate(self._reader()):
             if index == 0:
                 continue
 
-            self._process_row(row, digits, commodities, hierarchical_descriptions)
+            self._process_row(
+                row, digits, subheadings, descriptions, hierarchical_descriptions
+            )
+
+        for subheading, description in self._filter_descriptions(
+            subheadings, descriptions
+        ):
+            self._add_to_commodities(subheading, description, commodities)
 
         self._log_statistics(commodities)
         return commodities
@@ -78,7 +87,8 @@ class CommoditiesDataSource(DataSource):
         self,
         row: List[str],
         digits: int,
-        commodities: Dict[str, Set[str]],
+        subheadings: List[str],
+        descriptions: List[str],
         hierarchical_descriptions: Dict[str, str],
     ) -> None:
         subheading: str = row[self.COMMODITY_CODE][:digits]
@@ -89,13 +99,12 @@ class CommoditiesDataSource(DataSource):
         if row[self.CLASS] != self.TARGETED_LEVEL:
             hierarchical_descriptions[item_id_plus_pls] = description
         else:
-            description = self._build_description(
-                hierarchy, hierarchical_descriptions, description
+            subheadings.append(subheading)
+            descriptions.append(
+                self._build_description(
+                    hierarchy, hierarchical_descriptions, description
+                )
             )
-            result = self._filter_description(subheading, description)
-            if result is not None:
-                subheading, description = result
-                self._add_to_commodities(subheading, description, commodities)
 
     def _build_description(
         self,
@@ -110,17 +119,20 @@ class CommoditiesDataSource(DataSource):
         acc += description
         return acc
 
-    def _filter_description(
+    def _filter_descriptions(
         self,
-        subheading: str,
-        description: str,
-    ) -> Optional[Tuple[str, str]]:
-        if self._cleaning_pipeline:
-            subheading, description, _meta = self._cleaning_pipeline.filter(
-                subheading, description
-            )
+        subheadings: List[str],
+        descriptions: List[str],
+    ) -> Iterable[Tuple[str, str]]:
+        if not self._cleaning_pipeline:
+            return zip(subheadings, descriptions)
 
-        return subheading, description
+        cleaned = self._cleaning_pipeline.filter_many(subheadings, descriptions)
+
+        return zip(
+            cleaned.subheadings[cleaned.keep].tolist(),
+            cleaned.descriptions[cleaned.keep].tolist(),
+        )
 
     def _add_to_commodities(
         self,
@@ -149,6 +161,8 @@ class CommoditiesDataSource(DataSource):
         )
 
     def _reader(self) -> csv.reader:
+        import requests
+
         response = requests.get(self._url)
         content = response.content.decode("utf-8").splitlines()
         return csv.reader(content)
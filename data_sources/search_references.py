@@ -1,4 +1,3 @@
-import requests
 import logging
 import json
 
@@ -110,6 +109,8 @@ class SearchReferencesDataSource(DataSource):
             return cls(json_codes=json_content)
 
     def _get(self):
+        import requests
+
         response = requests.get(self.url)
 
         return response.json()
@@ -0,0 +1,31 @@
+import toml
+from sentence_transformers import SentenceTransformer
+
+from inference.infer import FlatClassifier
+from inference.onnx_backend import export_encoder, export_head
+from quantize_model import load_model
+from train_args import args
+
+
+# This exports the sentence transformer and the (unquantized) model to ONNX so they can run in ONNX Runtime.
+# It needs target/model.pt so must run before quantize_model.py removes it.
+def export_models():
+    onnx_dir = FlatClassifier.onnx_dir()
+    model_config = toml.load(args.target_dir() / "model.toml")
+
+    print("== Exporting sentence transformer ==")
+    sentence_transformer = SentenceTransformer(args.transformer(), device="cpu")
+    export_encoder(sentence_transformer, onnx_dir)
+
+    print("== Exporting model ==")
+    export_head(load_model(), model_config["input_size"], onnx_dir)
+
+    print(f"== ONNX models written to {onnx_dir} ==")
+
+
+if __name__ == "__main__":
+    if args.inference_backend() == "onnx":
+        print("== inference_backend is onnx, proceeding with ONNX export ==")
+        export_models()
+    else:
+        print("== inference_backend is torch, skipping ONNX export ==")
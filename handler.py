@@ -1,34 +1,75 @@
-import json
 import os
 import time
-from pathlib import Path
 
-from aws_lambda_powertools import Logger
+from aws_lambda.startup_profiler import profiler
 
-from aws_lambda.handler import LambdaHandler
-from inference.infer import FlatClassifier
+# Import the heavy dependencies one at a time so that the startup profile attributes their cost
+with profiler.phase("import torch"):
+    import torch  # noqa: F401
+
+with profiler.phase("import aws_lambda_powertools"):
+    from aws_lambda_powertools import Logger
+
+with profiler.phase("import inference"):
+    from inference.infer import FlatClassifier
+    from inference.ngram_classifier import load_ngram_classifier
+    from inference.runtime_settings import apply_runtime_settings
+    from train_args import args
+
+with profiler.phase("import aws_lambda.handler"):
+    from aws_lambda.handler import LambdaHandler
 
 logger = Logger(service="fpo-commodity-code-tool")
 
+with profiler.phase("runtime settings"):
+    runtime_settings = apply_runtime_settings(
+        args.torch_num_threads(),
+        args.torch_num_interop_threads(),
+        args.torch_quantized_engine(),
+        args.tokenizers_parallelism(),
+    )
+logger.info("🚀⇨ Runtime settings applied", extra=runtime_settings)
+
 start = time.perf_counter()
-cwd = Path(__file__).resolve().parent
-target_dir = cwd / "target"
-subheadings_file = target_dir / "subheadings.json"
-with open(subheadings_file, "r") as fp:
-    subheadings = json.load(fp)
+
+with profiler.phase("subheadings"):
+    subheadings = FlatClassifier.load_subheadings()
 logger.info("🚀⇨ Subheadings loaded in %.2fms", (time.perf_counter() - start) * 1000)
 
 
 start = time.perf_counter()
 logger.info("🚀⇨ Loading static classifier")
 
-classifier = FlatClassifier(
-    subheadings, "cpu", offline=(os.environ.get("OFFLINE", "0") == "1"), logger=logger
-)
+with profiler.phase("classifier"):
+    classifier = FlatClassifier(
+        subheadings,
+        "cpu",
+        offline=(os.environ.get("OFFLINE", "0") == "1"),
+        logger=logger,
+    )
 logger.info(
     "🚀⇨ Static classifier loaded in %.2fms", (time.perf_counter() - start) * 1000
 )
-lambda_handler = LambdaHandler(classifier, logger=logger)
+
+first_stage = None
+
+if args.cascade():
+    with profiler.phase("n-gram classifier"):
+        first_stage = load_ngram_classifier(
+            args.target_dir() / "ngram_classifier", subheadings, logger=logger
+        )
+    logger.info(
+        "🚀⇨ Cascade enabled with a threshold of %.2f", args.cascade_threshold()
+    )
+
+with profiler.phase("lambda handler"):
+    lambda_handler = LambdaHandler(classifier, logger=logger, first_stage=first_stage)
+
+# Provisioned concurrency runs this during init, so the first customer request doesn't pay for lazy initialisation
+with profiler.phase("warm up"):
+    lambda_handler.warm_up()
+
+profiler.finish(logger)
 
 
 def strip_sensitive_headers(event, _hint):
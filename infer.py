@@ -46,10 +46,12 @@ with open(subheadings_file, "r") as fp:
 
 classifier = FlatClassifier(subheadings, device)
 
-for query in args.query:
-    query, expected = query.split(":") if ":" in query else (query, None)
-    result = classifier.classify(search_text=query, limit=limit, digits=digits)
+queries = [query.split(":") if ":" in query else (query, None) for query in args.query]
+results = classifier.classify_batch(
+    [query for query, _expected in queries], limit=limit, digits=digits
+)
 
+for (query, expected), result in zip(queries, results):
     if expected:
         match = any(expected in r.code for r in result)
         print(
@@ -0,0 +1,89 @@
+from inference.infer import ClassificationResult, Classifier
+
+
+class CascadeClassifier(Classifier):
+    """
+    Answers with a cheap first stage classifier when it is confident and only falls back to the (expensive)
+    classifier when the first stage's top result scores below the threshold.
+
+    Counts how many classifications each stage answered.
+    """
+
+    def __init__(
+        self, first_stage: Classifier, fallback: Classifier, threshold: float
+    ) -> None:
+        self._first_stage = first_stage
+        self._fallback = fallback
+        self._threshold = threshold
+
+        self.first_stage_hits = 0
+        self.fallbacks = 0
+
+    @property
+    def threshold(self) -> float:
+        return self._threshold
+
+    def classify(
+        self,
+        search_text: str,
+        limit: int = 5,
+        digits: int = 6,
+    ) -> list[ClassificationResult]:
+        return self.classify_batch([search_text], limit, digits)[0]
+
+    def classify_batch(
+        self,
+        texts: list[str],
+        limit: int = 5,
+        digits: int = 6,
+    ) -> list[list[ClassificationResult]]:
+        results = self._first_stage.classify_batch(texts, limit, digits)
+        unconfident = [
+            i for i, result in enumerate(results) if not self.confident(result)
+        ]
+
+        self.first_stage_hits += len(texts) - len(unconfident)
+        self.fallbacks += len(unconfident)
+
+        if unconfident:
+            fallback_results = self._fallback.classify_batch(
+                [texts[i] for i in unconfident], limit, digits
+            )
+
+            for i, result in zip(unconfident, fallback_results):
+                results[i] = result
+
+        return results
+
+    def confident(self, results: list[ClassificationResult]) -> bool:
+        return bool(results) and results[0].score >= self._threshold
+
+    def warm_up(self, texts: list[str]) -> dict[str, float]:
+        """
+        Warms up both stages (whatever the first stage's confidence) without counting towards the stats.
+        """
+        return {
+            **{
+                f"first_stage_{stage}": lapsed
+                for stage, lapsed in self._first_stage.warm_up(texts).items()
+            },
+            **self._fallback.warm_up(texts),
+        }
+
+    def reset_stats(self) -> None:
+        self.first_stage_hits = 0
+        self.fallbacks = 0
+        self._first_stage.reset_stats()
+        self._fallback.reset_stats()
+
+    def stats(self) -> dict:
+        classifications = self.first_stage_hits + self.fallbacks
+
+        return {
+            "threshold": self._threshold,
+            "first_stage_hits": self.first_stage_hits,
+            "fallbacks": self.fallbacks,
+            "first_stage_hit_rate": (
+                self.first_stage_hits / classifications if classifications else 0.0
+            ),
+        }
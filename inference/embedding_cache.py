@@ -0,0 +1,103 @@
+from collections import OrderedDict
+
+import numpy as np
+
+embedding_cache_dtypes = ["float16", "int8"]
+
+
+class EmbeddingCache:
+    """
+    A bounded, least recently used cache of sentence embeddings keyed on the (cleaned) search text.
+
+    Embeddings are stored compactly so that a large number of entries fit in the Lambda's memory:
+
+    - float16 halves the size of each embedding with a negligible loss of precision
+    - int8 quarters the size of each embedding by storing it with a per-embedding scale
+
+    A max_size of 0 disables the cache (every lookup is a miss and nothing is stored).
+    """
+
+    def __init__(self, max_size: int = 50000, dtype: str = "float16") -> None:
+        if dtype not in embedding_cache_dtypes:
+            raise ValueError(
+                f"Unsupported embedding cache dtype {dtype}. Expected one of {embedding_cache_dtypes}"
+            )
+
+        self._max_size = max(0, max_size)
+        self._dtype = dtype
+        self._entries: OrderedDict[str, tuple[np.ndarray, float]] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, text: str) -> bool:
+        return text in self._entries
+
+    def get(self, text: str) -> np.ndarray | None:
+        entry = self._entries.get(text)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(text)
+        self.hits += 1
+
+        return self._decode(*entry)
+
+    def put(self, text: str, embedding: np.ndarray) -> np.ndarray:
+        """
+        Stores the embedding and returns it as get will, so that a search gets the same embedding whether or not
+        it was cached.
+        """
+        if self._max_size == 0:
+            return np.asarray(embedding, dtype=np.float32)
+
+        entry = self._encode(embedding)
+        self._entries[text] = entry
+        self._entries.move_to_end(text)
+
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+        return self._decode(*entry)
+
+    def clear(self) -> None:
+        """
+        Drops every entry and resets the stats.
+        """
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+
+        return {
+            "size": len(self._entries),
+            "max_size": self._max_size,
+            "dtype": self._dtype,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _encode(self, embedding: np.ndarray) -> tuple[np.ndarray, float]:
+        embedding = np.asarray(embedding, dtype=np.float32)
+
+        if self._dtype == "float16":
+            return (embedding.astype(np.float16), 1.0)
+
+        scale = float(np.max(np.abs(embedding))) / 127 or 1.0
+
+        return (np.round(embedding / scale).astype(np.int8), scale)
+
+    def _decode(self, stored: np.ndarray, scale: float) -> np.ndarray:
+        return stored.astype(np.float32) * scale
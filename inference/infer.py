@@ -1,25 +1,41 @@
+import inspect
+import json
 import logging
+import time
 from logging import Logger
 from math import floor
+from typing import TYPE_CHECKING
 
 import numpy as np
 import toml
 import torch
 from aws_lambda_powertools import Logger as AWSLogger
-from scipy.special import logsumexp
-from sentence_transformers import SentenceTransformer
 
-from model.model import SimpleNN
-from quantize_model import load_model, quantize_model
-from train_args import TrainScriptArgsParser
+from inference import onnx_backend
+from inference.embedding_cache import EmbeddingCache
+from inference.mips_index import CandidatePrunedModel, MipsIndex, mips_index_exists
+from inference.static_encoder import StaticSentenceEncoder
+from model.bundle import ModelBundle
+from model.model import HierarchicalNN, SimpleNN, build_model
+from quantize_model import quantize_linear_layers
+from train_args import args
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
 
-args = TrainScriptArgsParser()
-args.load_config_file()
 
 score_cutoff = 0.01  # We won't send back any results with a score lower than this
 top_n_softmax_percent = 0.05  # We only softmax over the top 5% of results to ignore the long tail of nonsense ones
 cumulative_cutoff = 0.9
+inference_backends = ["torch", "onnx"]
+encoders = ["teacher", "student", "static"]
 vague_term_code = "vvvvvvvvvv"
+prefix_digits = [
+    2,
+    4,
+    6,
+    8,
+]  # Digit levels we precompute prefix groups for at load time
 
 
 class ClassificationResult:
@@ -31,6 +47,48 @@ class ClassificationResult:
         return "%s = %.2f" % (self.code, self.score * 1000)
 
 
+class PrefixGroups:
+    """
+    A precomputed index of the subheadings grouped by their code prefix at a given number of digits.
+
+    The subheadings are reordered so that each prefix group occupies a contiguous run of positions,
+    which lets us aggregate the logits of every group with a handful of segmented NumPy reductions
+    rather than walking the logits in Python for each request.
+
+    Groups are kept in the order their prefix is first seen in the subheadings.
+    """
+
+    def __init__(self, subheadings: list[str], digits: int) -> None:
+        prefixes = np.array([str(subheading)[:digits] for subheading in subheadings])
+        codes, first_seen, segment_ids = np.unique(
+            prefixes, return_index=True, return_inverse=True
+        )
+
+        group_order = np.argsort(first_seen, kind="stable")
+        group_rank = np.empty_like(group_order)
+        group_rank[group_order] = np.arange(len(group_order))
+        segment_ids = group_rank[segment_ids]
+
+        self.digits = digits
+        self.codes = codes[group_order]
+        self.order = np.argsort(segment_ids, kind="stable")
+        self.segment_ids = segment_ids[self.order]
+        self.starts = np.concatenate(([0], np.cumsum(np.bincount(segment_ids))[:-1]))
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def logsumexp(self, logits: np.ndarray) -> np.ndarray:
+        """
+        Aggregates logits (over the last axis) into one logsumexp value per prefix group.
+        """
+        grouped = np.take(logits, self.order, axis=-1)
+        maxes = np.maximum.reduceat(grouped, self.starts, axis=-1)
+        shifted = np.exp(grouped - np.take(maxes, self.segment_ids, axis=-1))
+
+        return maxes + np.log(np.add.reduceat(shifted, self.starts, axis=-1))
+
+
 class Classifier:
     def classify(
         self,
@@ -40,6 +98,152 @@ class Classifier:
     ) -> list[ClassificationResult]:
         raise NotImplementedError()
 
+    def classify_batch(
+        self,
+        texts: list[str],
+        limit: int = 5,
+        digits: int = 6,
+    ) -> list[list[ClassificationResult]]:
+        return [self.classify(text, limit, digits) for text in texts]
+
+    def warm_up(self, texts: list[str]) -> dict[str, float]:
+        """
+        Runs texts through the classifier so that any lazy initialisation happens up front. Returns
+        the milliseconds spent in each stage of classification.
+        """
+        start = time.perf_counter()
+        self.classify_batch(texts)
+
+        return {"classify": (time.perf_counter() - start) * 1000}
+
+    def reset_stats(self) -> None:
+        """
+        Forgets what the classifier has counted (and cached) so far, e.g. so that the warm-up doesn't count.
+        """
+
+
+class LeanSentenceEncoder:
+    """
+    Encodes one search text at a time without going through SentenceTransformer.encode, which is built for bulk
+    use (length sorting, batching, progress bars and moving tensors back and forth).
+
+    The text is tokenized into preallocated buffers, run through the underlying transformer under
+    torch.inference_mode, mean pooled and normalised with exactly the same operations as the sentence
+    transformer so the embeddings are bit-identical to the SentenceTransformer.encode path.
+
+    Only sentence transformers made up of a transformer, mean pooling and then any dense projections (like a
+    distilled student encoder's) and normalisation are supported.
+    """
+
+    def __init__(
+        self, sentence_transformer: "SentenceTransformer", device: str
+    ) -> None:
+        from sentence_transformers.sentence_transformer.modules import (
+            Dense,
+            Normalize,
+        )
+
+        transformer, pooling, *post_pooling = list(sentence_transformer)
+
+        if getattr(pooling, "pooling_mode", None) != "mean" or not all(
+            isinstance(module, Normalize)
+            or (
+                isinstance(module, Dense)
+                and module.module_input_name == "sentence_embedding"
+                and module.module_output_name == "sentence_embedding"
+            )
+            for module in post_pooling
+        ):
+            raise ValueError(
+                "Only mean pooled (and projected or normalised) sentence transformers can be encoded with the lean encoder"
+            )
+
+        self._sentence_transformer = sentence_transformer
+        self._model = transformer.auto_model
+        self._tokenizer = sentence_transformer.tokenizer
+        self._device = device
+        # The Dense modules are applied as they are and Normalize is None
+        self._post_pooling = [
+            module if isinstance(module, Dense) else None for module in post_pooling
+        ]
+        self._takes_token_type_ids = (
+            "token_type_ids" in inspect.signature(self._model.forward).parameters
+        )
+        self._allocate(self.max_seq_length)
+
+    @property
+    def max_seq_length(self) -> int:
+        return self._sentence_transformer.max_seq_length
+
+    @property
+    def tokenizer(self):
+        return self._tokenizer
+
+    def encode(self, texts: list[str], **_kwargs) -> torch.Tensor:
+        return torch.cat([self.encode_one(text) for text in texts])
+
+    def encode_one(self, text: str) -> torch.Tensor:
+        """
+        Returns a (1, embedding size) tensor. The input and pooling buffers are reused but the embedding is new.
+        """
+        input_ids = self._tokenizer(
+            text,
+            truncation="longest_first",
+            max_length=self.max_seq_length,
+            return_attention_mask=False,
+            return_token_type_ids=False,
+        )["input_ids"]
+        length = len(input_ids)
+
+        # The sentence transformer's max_seq_length can be changed after the buffers were allocated
+        if length > self._input_ids.shape[1]:
+            self._allocate(self.max_seq_length)
+
+        with torch.inference_mode():
+            self._input_ids[0, :length] = torch.tensor(input_ids, dtype=torch.long)
+            features = {
+                "input_ids": self._input_ids[:, :length],
+                "attention_mask": self._attention_mask[:, :length],
+            }
+
+            if self._takes_token_type_ids:
+                features["token_type_ids"] = self._token_type_ids[:, :length]
+
+            token_embeddings = self._model(**features, return_dict=True)[0]
+            mask = (
+                features["attention_mask"]
+                .unsqueeze(-1)
+                .expand_as(token_embeddings)
+                .to(token_embeddings.dtype)
+            )
+            torch.sum(token_embeddings * mask, dim=1, out=self._pooled)
+            embedding = self._pooled / torch.clamp(mask.sum(dim=1), min=1e-9)
+
+            for dense in self._post_pooling:
+                if dense is None:
+                    embedding = torch.nn.functional.normalize(embedding, p=2, dim=1)
+                else:
+                    embedding = dense.activation_function(dense.linear(embedding))
+
+            # The normalize_embeddings the classifier asks encode for
+            embedding = torch.nn.functional.normalize(embedding, p=2, dim=1)
+
+        return embedding
+
+    def _allocate(self, max_seq_length: int) -> None:
+        self._input_ids = torch.zeros(
+            (1, max_seq_length), dtype=torch.long, device=self._device
+        )
+        self._attention_mask = torch.ones(
+            (1, max_seq_length), dtype=torch.long, device=self._device
+        )
+        self._token_type_ids = torch.zeros(
+            (1, max_seq_length), dtype=torch.long, device=self._device
+        )
+        self._pooled = torch.empty(
+            (1, self._model.config.hidden_size), device=self._device
+        )
+
 
 class FlatClassifier(Classifier):
     def __init__(
@@ -49,81 +253,297 @@ class FlatClassifier(Classifier):
         offline: bool = False,
         model: SimpleNN | None = None,
         logger: Logger | AWSLogger = logging.getLogger("inference"),
+        sentence_transformer_model: "SentenceTransformer | None" = None,
+        embedding_cache: EmbeddingCache | None = None,
+        backend: str | None = None,
+        quantize_transformer: bool | None = None,
+        max_seq_length: int | None = None,
+        lean_encoder: bool | None = None,
+        encoder: str | None = None,
     ) -> None:
         super().__init__()
 
         self._subheadings = subheadings
         self._device = device
         self._logger = logger
+        self._prefix_groups = {
+            digits: PrefixGroups(subheadings, digits) for digits in prefix_digits
+        }
+        self._embedding_cache = (
+            EmbeddingCache(args.embedding_cache_size(), args.embedding_cache_dtype())
+            if embedding_cache is None
+            else embedding_cache
+        )
+
+        self._encoder = encoder or args.encoder()
+
+        if self._encoder not in encoders:
+            raise ValueError(
+                f"Unsupported encoder {self._encoder}. Expected one of {encoders}"
+            )
+
+        self._backend = self._resolve_backend(backend or args.inference_backend())
+        self._lean_encoder: LeanSentenceEncoder | None = None
 
         # Load the model from disk
-        self._model = self.load_model().to(self._device) if model is None else model
+        if model is not None:
+            self._model = model
+        elif self._backend == "onnx":
+            self._model = onnx_backend.OnnxHead(self.onnx_dir())
+        else:
+            self._model = self.load_model().to(self._device)
 
-        logger.info(
-            f"💾⇨ Sentence Transformers running in {'Offline' if offline else 'Online'} mode"
+        if sentence_transformer_model is not None:
+            self._sentence_transformer_model = sentence_transformer_model
+
+            # A sentence transformer that's passed in is only encoded with the lean encoder when asked to
+            if lean_encoder:
+                self._lean_encoder = LeanSentenceEncoder(
+                    sentence_transformer_model, self._device
+                )
+
+            return
+
+        if self._encoder == "static":
+            logger.info(f"💾⇨ Loading static encoder: {self.static_encoder_dir()}")
+            self._sentence_transformer_model = StaticSentenceEncoder(
+                self.static_encoder_dir()
+            )
+        elif self._backend == "onnx":
+            logger.info("💾⇨ Sentence Transformers running in ONNX Runtime")
+            self._sentence_transformer_model = onnx_backend.OnnxSentenceEncoder(
+                self.onnx_dir()
+            )
+        else:
+            logger.info(
+                f"💾⇨ Sentence Transformers running in {'Offline' if offline else 'Online'} mode"
+            )
+
+            self._sentence_transformer_model = self.load_sentence_transformer(
+                offline,
+                args.uses_quantized_model()
+                if quantize_transformer is None
+                else quantize_transformer,
+            )
+
+        # Search descriptions are short so capping the sequence length only truncates the rare long ones
+        max_seq_length = (
+            args.max_seq_length() if max_seq_length is None else max_seq_length
         )
 
-        self._sentence_transformer_model = SentenceTransformer(
-            args.transformer(), device=self._device, local_files_only=offline
+        if max_seq_length > 0:
+            self._sentence_transformer_model.max_seq_length = max_seq_length
+
+        logger.info(
+            f"💾⇨ Sentence Transformers max_seq_length is {self._sentence_transformer_model.max_seq_length}"
         )
 
+        # The static encoder is a table lookup already
+        if (
+            self._backend == "torch"
+            and self._encoder != "static"
+            and (args.lean_encoder() if lean_encoder is None else lean_encoder)
+        ):
+            try:
+                self._lean_encoder = LeanSentenceEncoder(
+                    self._sentence_transformer_model, self._device
+                )
+                logger.info("💾⇨ Searches are encoded with the lean encoder")
+            except ValueError as e:
+                logger.warning(f"Not using the lean encoder: {e}")
+
     def classify(
         self,
         search_text: str,
         limit: int = 5,
         digits: int = 6,
     ) -> list[ClassificationResult]:
-        # Fetch the embedding for the search text
-        new_texts = [search_text]
-        new_embeddings = self._sentence_transformer_model.encode(
-            new_texts,
-            convert_to_tensor=True,
-            device=self._device,
-            show_progress_bar=False,
-            normalize_embeddings=True,
-        )
+        return self.classify_batch([search_text], limit, digits)[0]
+
+    def classify_batch(
+        self,
+        texts: list[str],
+        limit: int = 5,
+        digits: int = 6,
+    ) -> list[list[ClassificationResult]]:
+        if not texts:
+            return []
+
+        return self._predict(self._embed(texts), limit, digits)
+
+    def warm_up(self, texts: list[str]) -> dict[str, float]:
+        """
+        Runs texts through the sentence transformer and the model, bypassing the embedding cache so that
+        every call exercises the encoder. Returns the milliseconds spent encoding and in the model head.
+        """
+        start = time.perf_counter()
+        embeddings = self._encode(texts)
+        encoded = time.perf_counter()
+        self._predict(torch.from_numpy(embeddings).to(self._device), 5, 6)
+        predicted = time.perf_counter()
+
+        return {
+            "encode": (encoded - start) * 1000,
+            "head": (predicted - encoded) * 1000,
+        }
+
+    def reset_stats(self) -> None:
+        self._embedding_cache.clear()
 
-        # Run it through the model to get the predictions (with no_grad for inference efficiency)
+    def _predict(
+        self, embeddings: torch.Tensor, limit: int, digits: int
+    ) -> list[list[ClassificationResult]]:
+        # Run them through the model to get the predictions (with no_grad for inference efficiency)
         with torch.no_grad():
-            results = self._model(new_embeddings).detach().numpy()
+            logits = self._model(embeddings).detach().numpy()  # One row per text
 
-        logits = results[0]  # 1D NumPy array of logits for the single input
+        groups = self._groups_for(digits)
+        predictions_to_digits = groups.logsumexp(logits)
 
-        groups = {}
+        return [
+            self._results_from_predictions(groups, predictions, limit, digits)
+            for predictions in predictions_to_digits
+        ]
 
-        for i, logit in enumerate(logits):
-            code = str(self._subheadings[i])[:digits]
-            if code not in groups:
-                groups[code] = []
-            groups[code].append(logit)
+    @property
+    def embedding_cache(self) -> EmbeddingCache:
+        return self._embedding_cache
 
-        predictions_to_digits = {
-            code: logsumexp(group_logits) for code, group_logits in groups.items()
-        }
-        top_results = sorted(
-            predictions_to_digits.items(), key=lambda x: x[1], reverse=True
+    @property
+    def sentence_transformer(self):
+        return self._sentence_transformer_model
+
+    @property
+    def backend(self) -> str:
+        return self._backend
+
+    @property
+    def encoder(self) -> str:
+        return self._encoder
+
+    @classmethod
+    def onnx_dir(cls):
+        return args.target_dir() / "onnx"
+
+    @classmethod
+    def student_encoder_dir(cls):
+        return args.target_dir() / "student_encoder"
+
+    @classmethod
+    def static_encoder_dir(cls):
+        return args.target_dir() / "static_encoder"
+
+    def _resolve_backend(self, backend: str) -> str:
+        if backend not in inference_backends:
+            raise ValueError(
+                f"Unsupported inference backend {backend}. Expected one of {inference_backends}"
+            )
+
+        if backend == "onnx" and self._encoder != "teacher":
+            self._logger.warning(
+                "Only the teacher encoder is exported to ONNX, falling back to the torch backend"
+            )
+            return "torch"
+
+        if backend == "onnx" and not onnx_backend.onnx_runtime_available():
+            self._logger.warning(
+                "onnxruntime is not installed, falling back to the torch backend"
+            )
+            return "torch"
+
+        if backend == "onnx" and not onnx_backend.onnx_models_exist(self.onnx_dir()):
+            self._logger.warning(
+                f"ONNX models not found in {self.onnx_dir()}, falling back to the torch backend"
+            )
+            return "torch"
+
+        return backend
+
+    def _encode(self, texts: list[str]) -> np.ndarray:
+        # Each text is encoded on its own, as a Lambda request's single search is. Padding texts to a common
+        # length changes their embeddings slightly, so a batch wouldn't get the same results as classify.
+        if self._lean_encoder is not None:
+            return self._lean_encoder.encode(texts).cpu().numpy()
+
+        return (
+            torch.cat(
+                [
+                    self._sentence_transformer_model.encode(
+                        [text],
+                        convert_to_tensor=True,
+                        device=self._device,
+                        show_progress_bar=False,
+                        normalize_embeddings=True,
+                    )
+                    for text in texts
+                ]
+            )
+            .cpu()
+            .numpy()
+        )
+
+    def _embed(self, texts: list[str]) -> torch.Tensor:
+        cached = [self._embedding_cache.get(text) for text in texts]
+        missing = list(
+            dict.fromkeys(
+                text for text, embedding in zip(texts, cached) if embedding is None
+            )
         )
+        encoded = {}
 
-        top_results = top_results[: floor(len(top_results) * top_n_softmax_percent)]
+        if missing:
+            # Fetch the embeddings for all of the uncached texts in a single encode call
+            new_embeddings = self._encode(missing)
 
-        # Extract values
-        values = np.array([val for _, val in top_results])
+            for text, embedding in zip(missing, new_embeddings):
+                encoded[text] = self._embedding_cache.put(text, embedding)
+
+        embeddings = np.stack(
+            [
+                encoded[text] if embedding is None else embedding
+                for text, embedding in zip(texts, cached)
+            ]
+        )
+
+        return torch.from_numpy(embeddings).to(self._device)
+
+    def _results_from_predictions(
+        self,
+        groups: PrefixGroups,
+        predictions_to_digits: np.ndarray,
+        limit: int,
+        digits: int,
+    ) -> list[ClassificationResult]:
+        top_n = floor(len(groups) * top_n_softmax_percent)
+
+        if top_n < 1:
+            return []
+
+        # Partially select the top N groups and only sort those survivors. argpartition picks any of the
+        # groups tied with the Nth score, so the first-seen ones are taken explicitly and ties are broken on
+        # the index, as a stable sort of every group would.
+        nth_value = -np.partition(-predictions_to_digits, top_n - 1)[top_n - 1]
+        above = np.flatnonzero(predictions_to_digits > nth_value)
+        tied = np.flatnonzero(predictions_to_digits == nth_value)
+        top_indexes = np.concatenate([above, tied[: top_n - len(above)]])
+        top_indexes = top_indexes[
+            np.lexsort((top_indexes, -predictions_to_digits[top_indexes]))
+        ]
+        values = predictions_to_digits[top_indexes]
 
         # Compute softmax
-        exp_values = np.exp(
-            values - np.max(values)
-        )  # Subtract max for numerical stability
+        exp_values = np.exp(values - values[0])  # Subtract max for numerical stability
         softmax_values = exp_values / np.sum(exp_values)
 
-        max_val = np.max(softmax_values)
+        max_val = softmax_values[0]
         min_confidence = 0.05
 
         # Cutoff everything below confidence level of the top result
-        softmax_results = [
-            (category, softmax)
-            for (category, _), softmax in zip(top_results, softmax_values)
-            if max_val * min_confidence <= softmax
-        ]
+        confident = max_val * min_confidence <= softmax_values
+        softmax_results = zip(
+            groups.codes[top_indexes[confident]].tolist(),
+            softmax_values[confident].tolist(),
+        )
 
         result = []
 
@@ -153,20 +573,177 @@ class FlatClassifier(Classifier):
 
         return result
 
+    def _groups_for(self, digits: int) -> PrefixGroups:
+        if digits not in self._prefix_groups:
+            self._prefix_groups[digits] = PrefixGroups(self._subheadings, digits)
+
+        return self._prefix_groups[digits]
+
+    def load_sentence_transformer(
+        self, offline: bool, quantized: bool
+    ) -> "SentenceTransformer":
+        # sentence-transformers takes seconds to import so only pay for it when the torch backend needs it
+        from sentence_transformers import SentenceTransformer
+
+        if self._encoder == "student":
+            self._logger.info(
+                f"💾⇨ Loading student encoder: {self.student_encoder_dir()}"
+            )
+            sentence_transformer = SentenceTransformer(
+                str(self.student_encoder_dir()), device=self._device
+            )
+        else:
+            sentence_transformer = SentenceTransformer(
+                args.transformer(), device=self._device, local_files_only=offline
+            )
+
+        if not quantized:
+            return sentence_transformer
+
+        if self._encoder == "student":
+            # The student is small enough to quantize at load time
+            sentence_transformer = quantize_linear_layers(sentence_transformer)
+            sentence_transformer.eval()
+            self._logger.info("🧠⚡ Quantized student encoder loaded")
+
+            return sentence_transformer
+
+        transformer_quantized_file = args.target_dir() / "transformer_quantized.pt"
+        sentence_transformer = quantize_linear_layers(sentence_transformer)
+
+        if transformer_quantized_file.exists():
+            self._logger.info(
+                f"💾⇨ Loading quantized transformer file: {transformer_quantized_file}"
+            )
+            sentence_transformer.load_state_dict(
+                torch.load(
+                    transformer_quantized_file,
+                    map_location=self._device,
+                    weights_only=True,
+                )
+            )
+        else:
+            self._logger.warning(
+                f"Quantized transformer file not found: {transformer_quantized_file}. Quantized the transformer in memory instead."
+            )
+
+        sentence_transformer.eval()
+        self._logger.info("🧠⚡ Quantized transformer loaded")
+
+        return sentence_transformer
+
+    @classmethod
+    def load_subheadings(cls) -> list[str]:
+        # The model bundle carries the subheadings the model was trained with so prefer those when we have one
+        bundle_file = cls.bundle_file()
+
+        if bundle_file.exists():
+            return ModelBundle.read_header(bundle_file)["subheadings"]
+
+        with open(args.target_dir() / "subheadings.json", "r") as fp:
+            return json.load(fp)
+
+    @classmethod
+    def bundle_file(cls, quantized: bool | None = None):
+        if quantized is None:
+            quantized = args.uses_quantized_model()
+
+        return args.target_dir() / (
+            "model_quantized.bundle" if quantized else "model.bundle"
+        )
+
+    @classmethod
+    def fc2_index_dir(cls):
+        # The maximum inner product index over the (teacher) model's output layer rows
+        return args.target_dir() / "fc2_index"
+
+    @classmethod
+    def encoder_bundle_file(cls, encoder: str):
+        # The model retrained on the student or static encoder's embeddings
+        return args.target_dir() / f"{encoder}_model.bundle"
+
     def load_model(self):
+        quantized = args.uses_quantized_model()
+
+        if self._encoder != "teacher":
+            model = self.load_bundle(self.encoder_bundle_file(self._encoder))
+
+            if quantized:
+                model = quantize_linear_layers(model)
+
+            model.eval()
+            self.configure_hierarchy(model)
+            self._logger.info(f"🧠⚡ Model for the {self._encoder} encoder loaded")
+
+            return model
+
+        bundle_file = self.bundle_file(quantized)
+        fallback_bundle_file = self.bundle_file(False)
+
+        if bundle_file.exists():
+            model = self.load_bundle(bundle_file)
+        elif quantized and fallback_bundle_file.exists():
+            self._logger.warning(
+                f"Quantized model bundle not found: {bundle_file}. Quantizing {fallback_bundle_file} in memory instead."
+            )
+            model = quantize_linear_layers(self.load_bundle(fallback_bundle_file))
+        else:
+            model = self.load_legacy_model(quantized)
+
+        model.eval()
+        self.configure_hierarchy(model)
+        self._logger.info("🧠⚡ Model loaded")
+
+        return self.prune_candidates(model)
+
+    def prune_candidates(self, model: torch.nn.Module) -> torch.nn.Module:
+        candidates = args.fc2_candidates()
+
+        if candidates < 1 or not isinstance(model, SimpleNN):
+            return model
+
+        if not mips_index_exists(self.fc2_index_dir()):
+            self._logger.warning(
+                f"fc2 index not found: {self.fc2_index_dir()}. Scoring every subheading instead."
+            )
+            return model
+
+        self._logger.info(
+            f"🔎 Only scoring the {candidates} fc2 candidates the index picks per search"
+        )
+
+        return CandidatePrunedModel(model, MipsIndex(self.fc2_index_dir()), candidates)
+
+    def configure_hierarchy(self, model: torch.nn.Module) -> None:
+        if isinstance(model, HierarchicalNN):
+            model.top_chapters = args.hierarchy_top_chapters()
+            model.top_headings = args.hierarchy_top_headings()
+            self._logger.info(
+                f"🌳 Scoring the subheadings under the top {model.top_headings} headings of the top {model.top_chapters} chapters"
+            )
+
+    def load_bundle(self, bundle_file) -> torch.nn.Module:
+        self._logger.info(f"💾⇨ Loading model bundle: {bundle_file}")
+        bundle = ModelBundle.load(bundle_file)
+
+        if bundle.subheadings != self._subheadings:
+            raise ValueError(
+                f"The subheadings in {bundle_file} do not match the subheadings the classifier was given"
+            )
+
+        return bundle.build_model()
+
+    # Models trained before model bundles were introduced
+    def load_legacy_model(self, quantized: bool) -> torch.nn.Module:
         model_file = args.target_dir() / "model.pt"
         model_qauntized_file = args.target_dir() / "model_quantized.pt"
         model_config_file = args.target_dir() / "model.toml"
 
-        if args.uses_quantized_model():
+        if quantized and model_qauntized_file.exists():
             self._logger.info(f"💾⇨ Loading model file: {model_qauntized_file}")
-            if not model_qauntized_file.exists():
-                model = load_model()
-                quantize_model(model)
-
             torch.serialization.add_safe_globals([SimpleNN])
             try:
-                model = torch.load(
+                return torch.load(
                     model_qauntized_file,
                     map_location=self._device,
                     weights_only=False,
@@ -174,21 +751,18 @@ class FlatClassifier(Classifier):
             except Exception as e:
                 self._logger.error(f"Failed to load the model: {e}")
                 raise e
-        else:
-            self._logger.info(f"💾⇨ Loading model file: {model_file}")
-            model_config = toml.load(model_config_file)
 
-            model = SimpleNN(
-                model_config["input_size"],
-                model_config["hidden_size"],
-                model_config["output_size"],
-                model_config["dropout_layer_1_percentage"],
-                model_config["dropout_layer_2_percentage"],
-            )
+        self._logger.info(f"💾⇨ Loading model file: {model_file}")
+        model_config = toml.load(model_config_file)
 
-            model.load_state_dict(torch.load(model_file, map_location=self._device))
+        model = build_model(model_config, self._subheadings)
 
-        model.eval()
-        self._logger.info("🧠⚡ Model loaded")
+        model.load_state_dict(torch.load(model_file, map_location=self._device))
+
+        if quantized:
+            self._logger.warning(
+                f"Quantized model file not found: {model_qauntized_file}. Quantizing {model_file} in memory instead."
+            )
+            model = quantize_linear_layers(model)
 
         return model
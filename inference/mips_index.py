@@ -0,0 +1,157 @@
+from pathlib import Path
+
+import numpy as np
+import torch
+from torch import nn
+from torch.ao.nn.quantized.dynamic import Linear as DynamicQuantizedLinear
+
+from model.model import LowRankLinear, SimpleNN, pruned_logit
+
+centroids_file = "centroids.npy"
+order_file = "order.npy"
+starts_file = "starts.npy"
+
+
+def mips_index_exists(index_dir: Path) -> bool:
+    return all(
+        (index_dir / file).exists()
+        for file in [centroids_file, order_file, starts_file]
+    )
+
+
+def write_mips_index(
+    index_dir: Path, centroids: np.ndarray, assignments: np.ndarray
+) -> None:
+    """
+    Writes the cluster centroids and the rows of each cluster (as a sorted order and the start of each
+    cluster in it) as plain .npy files.
+    """
+    index_dir.mkdir(parents=True, exist_ok=True)
+
+    order = np.argsort(assignments, kind="stable")
+    starts = np.concatenate(
+        [[0], np.cumsum(np.bincount(assignments, minlength=len(centroids)))]
+    )
+
+    np.save(index_dir / centroids_file, centroids.astype(np.float32))
+    np.save(index_dir / order_file, order.astype(np.int64))
+    np.save(index_dir / starts_file, starts.astype(np.int64))
+
+
+def output_rows(fc2: nn.Module) -> tuple[nn.Module, torch.Tensor, torch.Tensor]:
+    """
+    Splits an output layer into the projection it applies to the hidden layer (none when it's dense) and the
+    weight and bias rows that then score each subheading. int8 rows are dequantized.
+    """
+    if isinstance(fc2, LowRankLinear):
+        return fc2.down, *output_rows(fc2.up)[1:]
+
+    if isinstance(fc2, DynamicQuantizedLinear):
+        return nn.Identity(), fc2.weight().dequantize(), fc2.bias()
+
+    return nn.Identity(), fc2.weight.detach(), fc2.bias.detach()
+
+
+class MipsIndex:
+    """
+    A maximum inner product index over the rows of the output layer, each with its bias appended, grouped
+    into clusters.
+
+    The candidates for a query are the rows of the clusters whose centroids score best against it.
+    """
+
+    def __init__(self, index_dir: Path) -> None:
+        self._centroids = torch.from_numpy(
+            np.load(index_dir / centroids_file, allow_pickle=False)
+        )
+        order = np.load(index_dir / order_file, allow_pickle=False)
+        starts = np.load(index_dir / starts_file, allow_pickle=False)
+        sizes = np.diff(starts)
+        self._rows = len(order)
+        self._sizes = torch.from_numpy(sizes)
+        # The most clusters a query can need is when it takes the smallest ones first
+        self._smallest_first = np.cumsum(np.sort(sizes))
+        # The rows of each cluster, a row per cluster padded out with the number of rows
+        members = np.full((len(sizes), max(sizes.max(initial=0), 1)), len(order))
+        members[
+            np.repeat(np.arange(len(sizes)), sizes),
+            np.arange(len(order)) - np.repeat(starts[:-1], sizes),
+        ] = order
+        self._members = torch.from_numpy(members)
+
+    @property
+    def rows(self) -> int:
+        return self._rows
+
+    def candidates(self, query: torch.Tensor, count: int) -> torch.Tensor:
+        """
+        The rows of the best scoring clusters for each query in a batch, taking whole clusters until there are
+        at least count of them. Each query's rows are padded out with the number of rows.
+        """
+        scores = query @ self._centroids[:, :-1].T + self._centroids[:, -1]
+        needed = min(
+            int(np.searchsorted(self._smallest_first, count)) + 1, len(self._sizes)
+        )
+        clusters = scores.topk(needed, dim=1).indices
+        sizes = self._sizes[clusters]
+        # A cluster is taken when the better scoring ones before it don't have count rows between them
+        taken = sizes.cumsum(1) - sizes < count
+
+        return (
+            self._members[clusters]
+            .masked_fill(~taken[:, :, None], self.rows)
+            .flatten(1)
+        )
+
+
+class CandidatePrunedModel(nn.Module):
+    """
+    Wraps a flat model so that only the output layer rows the index picks as candidates for each search are
+    scored. They get exactly the logits the full output layer would give them, the rest get pruned_logit.
+    """
+
+    def __init__(self, model: SimpleNN, index: MipsIndex, candidates: int) -> None:
+        super().__init__()
+        self.model = model
+        self.candidates = candidates
+        self._index = index
+        self._project, weight, bias = output_rows(model.fc2)
+
+        if len(weight) != index.rows:
+            raise ValueError(
+                f"The fc2 index was built for {index.rows} subheadings but the model has {len(weight)}"
+            )
+
+        self.register_buffer("_weight", weight, persistent=False)
+        self.register_buffer("_bias", bias, persistent=False)
+
+    def candidate_rows(self, query: torch.Tensor) -> torch.Tensor:
+        return self._index.candidates(query, self.candidates)
+
+    def forward(self, x):
+        query = self._project(self.model.hidden(x))
+        # The padding rows are scored into an extra column that is dropped
+        candidates = self.candidate_rows(query)
+        rows = candidates.clamp(max=len(self._weight) - 1)
+        scores = (self._weight[rows] @ query[:, :, None]).squeeze(2) + self._bias[rows]
+
+        logits = torch.full(
+            (query.shape[0], len(self._weight) + 1),
+            pruned_logit,
+            dtype=scores.dtype,
+            device=query.device,
+        )
+        logits.scatter_(1, candidates, scores)
+
+        return logits[:, : len(self._weight)]
+
+    def recall(self, x: torch.Tensor, k: int = 5) -> float:
+        """
+        The fraction of the top k subheadings under full scoring that are among the candidates.
+        """
+        with torch.no_grad():
+            query = self._project(self.model.hidden(x))
+            top = (query @ self._weight.T + self._bias).topk(k, dim=1).indices
+            found = (top[:, :, None] == self.candidate_rows(query)[:, None, :]).any(2)
+
+        return found.sum().item() / top.numel()
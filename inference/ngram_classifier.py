@@ -0,0 +1,159 @@
+import logging
+import zlib
+from logging import Logger
+from pathlib import Path
+
+import numpy as np
+import toml
+import torch
+from aws_lambda_powertools import Logger as AWSLogger
+from torch import nn
+
+from inference.embedding_cache import EmbeddingCache
+from inference.infer import FlatClassifier
+
+embeddings_file = "embeddings.npy"
+weight_file = "weight.npy"
+bias_file = "bias.npy"
+config_file = "ngram.toml"
+
+# The sizes of the character n-grams taken from each word (with boundary markers)
+ngram_sizes = [3, 4, 5]
+
+
+def ngram_ids(text: str, buckets: int) -> np.ndarray:
+    """
+    Hashes the words of a text and the character n-grams of each word into buckets, fastText style.
+
+    crc32 is used rather than hash() because hash() is salted per process.
+    """
+    features = []
+
+    for word in text.split():
+        features.append(f"w:{word}")
+        marked = f"<{word}>"
+
+        for n in ngram_sizes:
+            features += [marked[i : i + n] for i in range(len(marked) - n + 1)]
+
+    return np.array(
+        [zlib.crc32(feature.encode()) % buckets for feature in features],
+        dtype=np.int64,
+    )
+
+
+class NgramModel(nn.Module):
+    """
+    A linear classifier over hashed word and character n-grams: the mean of the n-grams' vectors goes
+    through a single linear layer.
+    """
+
+    def __init__(self, buckets: int, dimensions: int, output_size: int) -> None:
+        super().__init__()
+        self.embeddings = nn.EmbeddingBag(buckets, dimensions, mode="mean", sparse=True)
+        self.fc = nn.Linear(dimensions, output_size)
+
+    def forward(self, ids: torch.Tensor, offsets: torch.Tensor) -> torch.Tensor:
+        return self.fc(self.embeddings(ids, offsets))
+
+
+class NgramEncoder:
+    """
+    Embeds a text as the mean of its hashed n-gram vectors so that the n-gram model can run through the
+    FlatClassifier with its linear layer as the head.
+
+    Exposes the parts of the SentenceTransformer.encode interface that the FlatClassifier uses.
+    """
+
+    def __init__(self, embeddings: np.ndarray) -> None:
+        self._embeddings = embeddings
+        self._buckets = embeddings.shape[0]
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        return self._embeddings
+
+    def encode(self, texts: list[str], **_kwargs) -> torch.Tensor:
+        return torch.from_numpy(np.stack([self.encode_one(text) for text in texts]))
+
+    def encode_one(self, text: str) -> np.ndarray:
+        ids = ngram_ids(text, self._buckets)
+
+        if len(ids) == 0:
+            return np.zeros(self._embeddings.shape[1], dtype=np.float32)
+
+        return self._embeddings[ids].mean(axis=0)
+
+
+def ngram_classifier_exists(ngram_dir: Path) -> bool:
+    return all(
+        (ngram_dir / file).exists()
+        for file in [embeddings_file, weight_file, bias_file, config_file]
+    )
+
+
+def write_ngram_classifier(ngram_dir: Path, model: NgramModel) -> None:
+    ngram_dir.mkdir(parents=True, exist_ok=True)
+
+    np.save(ngram_dir / embeddings_file, model.embeddings.weight.detach().cpu().numpy())
+    np.save(ngram_dir / weight_file, model.fc.weight.detach().cpu().numpy())
+    np.save(ngram_dir / bias_file, model.fc.bias.detach().cpu().numpy())
+
+    with open(ngram_dir / config_file, "w") as f:
+        toml.dump(
+            {
+                "buckets": model.embeddings.num_embeddings,
+                "ngram_sizes": ngram_sizes,
+            },
+            f,
+        )
+
+
+def load_ngram_classifier(
+    ngram_dir: Path,
+    subheadings: list[str],
+    logger: Logger | AWSLogger = logging.getLogger("inference"),
+) -> FlatClassifier:
+    """
+    Loads the n-gram model as a FlatClassifier so that its results are aggregated and cut off in exactly
+    the same way as the sentence transformer classifier's.
+    """
+    config = toml.load(ngram_dir / config_file)
+
+    if config["ngram_sizes"] != ngram_sizes:
+        raise ValueError(
+            f"The n-gram classifier in {ngram_dir} was trained with n-gram sizes {config['ngram_sizes']}, expected {ngram_sizes}"
+        )
+
+    weight = torch.from_numpy(np.load(ngram_dir / weight_file, allow_pickle=False))
+
+    if weight.shape[0] != len(subheadings):
+        raise ValueError(
+            f"The n-gram classifier in {ngram_dir} has {weight.shape[0]} outputs but there are {len(subheadings)} subheadings"
+        )
+
+    head = nn.Linear(weight.shape[1], weight.shape[0])
+    head.load_state_dict(
+        {
+            "weight": weight,
+            "bias": torch.from_numpy(
+                np.load(ngram_dir / bias_file, allow_pickle=False)
+            ),
+        }
+    )
+    head.eval()
+
+    logger.info(f"💾⇨ Loaded n-gram classifier: {ngram_dir}")
+
+    return FlatClassifier(
+        subheadings,
+        "cpu",
+        model=head,
+        logger=logger,
+        sentence_transformer_model=NgramEncoder(
+            np.load(ngram_dir / embeddings_file, allow_pickle=False)
+        ),
+        # Encoding is cheaper than a cache lookup and the result cache sits in front of the cascade anyway
+        embedding_cache=EmbeddingCache(max_size=0),
+        backend="torch",
+    )
@@ -0,0 +1,188 @@
+import importlib.util
+import logging
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+import toml
+import torch
+
+from inference.mips_index import CandidatePrunedModel
+from model.model import HierarchicalNN
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+logger = logging.getLogger("onnx_backend")
+
+encoder_file = "encoder.onnx"
+head_file = "head.onnx"
+tokenizer_dir = "tokenizer"
+config_file = "onnx.toml"
+
+
+class MeanPooledEncoder(torch.nn.Module):
+    """
+    Wraps the underlying transformer of a SentenceTransformer with the mean pooling and normalisation
+    steps so that the whole tokens -> embedding path can be exported as a single ONNX graph.
+    """
+
+    def __init__(self, transformer: torch.nn.Module) -> None:
+        super().__init__()
+        self.transformer = transformer
+
+    def forward(
+        self, input_ids: torch.Tensor, attention_mask: torch.Tensor
+    ) -> torch.Tensor:
+        token_embeddings = self.transformer(
+            input_ids=input_ids, attention_mask=attention_mask
+        )[0]
+        mask = attention_mask.unsqueeze(-1).to(token_embeddings.dtype)
+        pooled = (token_embeddings * mask).sum(1) / mask.sum(1).clamp(min=1e-9)
+
+        return torch.nn.functional.normalize(pooled, p=2, dim=1)
+
+
+def onnx_runtime_available() -> bool:
+    return importlib.util.find_spec("onnxruntime") is not None
+
+
+def onnx_models_exist(onnx_dir: Path) -> bool:
+    return all(
+        (onnx_dir / file).exists()
+        for file in [encoder_file, head_file, tokenizer_dir, config_file]
+    )
+
+
+def export_encoder(sentence_transformer: "SentenceTransformer", onnx_dir: Path) -> None:
+    """
+    Exports the sentence transformer (transformer, mean pooling and normalisation) to ONNX along with its tokenizer.
+    """
+    pooling = sentence_transformer[1]
+    if getattr(pooling, "pooling_mode", "mean") != "mean":
+        raise ValueError("Only mean pooled sentence transformers can be exported")
+
+    onnx_dir.mkdir(parents=True, exist_ok=True)
+
+    encoder = MeanPooledEncoder(sentence_transformer[0].auto_model).eval()
+    tokens = sentence_transformer.tokenizer(
+        ["an example goods description"], return_tensors="pt"
+    )
+
+    torch.onnx.export(
+        encoder,
+        (tokens["input_ids"], tokens["attention_mask"]),
+        onnx_dir / encoder_file,
+        input_names=["input_ids", "attention_mask"],
+        output_names=["embeddings"],
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "embeddings": {0: "batch"},
+        },
+        opset_version=17,
+        dynamo=False,
+    )
+
+    sentence_transformer.tokenizer.save_pretrained(onnx_dir / tokenizer_dir)
+
+    with open(onnx_dir / config_file, "w") as f:
+        toml.dump({"max_seq_length": sentence_transformer.max_seq_length}, f)
+
+
+def export_head(model: torch.nn.Module, input_size: int, onnx_dir: Path) -> None:
+    """
+    Exports the (unquantized) classification head to ONNX.
+
+    The hierarchical and candidate pruned heads pick the rows to score in Python, which tracing would bake into
+    the graph for the example input, so they can't be exported.
+    """
+    if isinstance(model, (HierarchicalNN, CandidatePrunedModel)):
+        raise ValueError(
+            f"A {model.__class__.__name__} head can't be exported to ONNX, use the torch backend instead"
+        )
+
+    onnx_dir.mkdir(parents=True, exist_ok=True)
+
+    torch.onnx.export(
+        model.eval(),
+        (torch.zeros(1, input_size),),
+        onnx_dir / head_file,
+        input_names=["embeddings"],
+        output_names=["logits"],
+        dynamic_axes={"embeddings": {0: "batch"}, "logits": {0: "batch"}},
+        opset_version=17,
+        dynamo=False,
+    )
+
+
+def _session(path: Path):
+    import onnxruntime
+
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+    return onnxruntime.InferenceSession(
+        str(path), options, providers=["CPUExecutionProvider"]
+    )
+
+
+class OnnxSentenceEncoder:
+    """
+    Runs the exported sentence transformer in ONNX Runtime.
+
+    Exposes the parts of the SentenceTransformer.encode interface that the FlatClassifier uses.
+    """
+
+    def __init__(self, onnx_dir: Path) -> None:
+        from transformers import AutoTokenizer
+
+        self._session = _session(onnx_dir / encoder_file)
+        self._tokenizer = AutoTokenizer.from_pretrained(onnx_dir / tokenizer_dir)
+        self.max_seq_length = toml.load(onnx_dir / config_file)["max_seq_length"]
+
+    @property
+    def tokenizer(self):
+        return self._tokenizer
+
+    def encode(self, texts: list[str], **_kwargs) -> torch.Tensor:
+        tokens = self._tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_seq_length,
+            return_tensors="np",
+        )
+        (embeddings,) = self._session.run(
+            None,
+            {
+                "input_ids": tokens["input_ids"].astype(np.int64),
+                "attention_mask": tokens["attention_mask"].astype(np.int64),
+            },
+        )
+
+        return torch.from_numpy(embeddings)
+
+
+class OnnxHead:
+    """
+    Runs the exported classification head in ONNX Runtime.
+
+    Exposes the parts of the SimpleNN module interface that the FlatClassifier uses.
+    """
+
+    def __init__(self, onnx_dir: Path) -> None:
+        self._session = _session(onnx_dir / head_file)
+
+    def __call__(self, embeddings: torch.Tensor) -> torch.Tensor:
+        (logits,) = self._session.run(
+            None, {"embeddings": embeddings.cpu().numpy().astype(np.float32)}
+        )
+
+        return torch.from_numpy(logits)
+
+    def to(self, _device: str) -> "OnnxHead":
+        return self
+
+    def eval(self) -> "OnnxHead":
+        return self
@@ -0,0 +1,53 @@
+import os
+
+import torch
+
+
+def quantized_engines() -> list[str]:
+    return [
+        engine
+        for engine in torch.backends.quantized.supported_engines
+        if engine != "none"
+    ]
+
+
+def apply_runtime_settings(
+    num_threads: int = 0,
+    num_interop_threads: int = 0,
+    quantized_engine: str = "",
+    tokenizers_parallelism: str = "",
+) -> dict:
+    """
+    Applies the torch threading, quantized engine and tokenizer parallelism settings (as picked by autotune.py).
+
+    0 or "" leaves a setting as torch or the tokenizers library would pick it. The interop thread count can only
+    be set before torch does any parallel work so this needs to run before the classifier is loaded.
+
+    Returns the settings that are in effect.
+    """
+    if num_threads > 0:
+        torch.set_num_threads(num_threads)
+
+    if (
+        num_interop_threads > 0
+        and torch.get_num_interop_threads() != num_interop_threads
+    ):
+        torch.set_num_interop_threads(num_interop_threads)
+
+    if quantized_engine:
+        if quantized_engine not in quantized_engines():
+            raise ValueError(
+                f"Unsupported quantized engine {quantized_engine}. Expected one of {quantized_engines()}"
+            )
+
+        torch.backends.quantized.engine = quantized_engine
+
+    if tokenizers_parallelism:
+        os.environ["TOKENIZERS_PARALLELISM"] = tokenizers_parallelism
+
+    return {
+        "num_threads": torch.get_num_threads(),
+        "num_interop_threads": torch.get_num_interop_threads(),
+        "quantized_engine": torch.backends.quantized.engine,
+        "tokenizers_parallelism": os.environ.get("TOKENIZERS_PARALLELISM", ""),
+    }
@@ -0,0 +1,52 @@
+import numpy as np
+
+# The sequence lengths truncation is reported for in training and the benchmark
+candidate_max_seq_lengths = [16, 32, 64, 128, 256, 384]
+
+
+def token_lengths(tokenizer, texts: list[str], batch_size: int = 10000) -> np.ndarray:
+    """
+    The number of tokens (including the special tokens) each text encodes to.
+    """
+    lengths = []
+
+    for i in range(0, len(texts), batch_size):
+        # Not verbose as it would warn about every text longer than the tokenizer's max length
+        encoded = tokenizer(
+            texts[i : i + batch_size], add_special_tokens=True, verbose=False
+        )
+        lengths += [len(input_ids) for input_ids in encoded["input_ids"]]
+
+    return np.array(lengths, dtype=np.int64)
+
+
+def truncation_report(
+    tokenizer, texts: list[str], max_seq_lengths: list[int]
+) -> dict[int, dict]:
+    """
+    How many of the texts would be truncated at each of the max sequence lengths.
+    """
+    lengths = token_lengths(tokenizer, texts)
+
+    return {
+        max_seq_length: {
+            "truncated": int((lengths > max_seq_length).sum()),
+            "truncated_percent": 100 * float((lengths > max_seq_length).mean())
+            if len(lengths)
+            else 0.0,
+        }
+        for max_seq_length in max_seq_lengths
+    }
+
+
+def log_truncation_report(
+    logger, name: str, tokenizer, texts: list[str], max_seq_lengths: list[int]
+) -> dict[int, dict]:
+    report = truncation_report(tokenizer, texts, max_seq_lengths)
+
+    for max_seq_length, truncation in report.items():
+        logger.info(
+            f"{truncation['truncated']} of {len(texts)} {name} ({truncation['truncated_percent']:.2f}%) would be truncated at max_seq_length {max_seq_length}"
+        )
+
+    return report
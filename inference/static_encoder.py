@@ -0,0 +1,91 @@
+from pathlib import Path
+
+import numpy as np
+import torch
+
+embeddings_file = "embeddings.npy"
+token_ids_file = "token_ids.npy"
+tokenizer_dir = "tokenizer"
+
+
+def static_encoder_exists(static_dir: Path) -> bool:
+    return all(
+        (static_dir / file).exists()
+        for file in [embeddings_file, token_ids_file, tokenizer_dir]
+    )
+
+
+def write_static_encoder(
+    static_dir: Path, tokenizer, token_ids: np.ndarray, embeddings: np.ndarray
+) -> None:
+    """
+    Writes a static encoder: the tokenizer, the ids of the tokens in its vocabulary that have a vector and the
+    vectors themselves (one row per token id). Both arrays are plain .npy files so loading them needs no pickle.
+    """
+    static_dir.mkdir(parents=True, exist_ok=True)
+
+    tokenizer.save_pretrained(static_dir / tokenizer_dir)
+    np.save(static_dir / token_ids_file, token_ids.astype(np.int64))
+    np.save(static_dir / embeddings_file, embeddings.astype(np.float32))
+
+
+class StaticSentenceEncoder:
+    """
+    Embeds a text as the normalised mean of per token vectors distilled from the sentence transformer, so
+    encoding is a tokenizer call and a table lookup rather than a transformer forward pass.
+
+    Tokens without a vector (those never seen in the training descriptions) are skipped. A text with none of
+    them embeds to zeros.
+
+    Exposes the parts of the SentenceTransformer.encode interface that the FlatClassifier uses.
+    """
+
+    def __init__(self, static_dir: Path) -> None:
+        from transformers import AutoTokenizer
+
+        self._tokenizer = AutoTokenizer.from_pretrained(static_dir / tokenizer_dir)
+        # Encoding goes straight to the backend tokenizer so it mustn't pad or truncate behind our back
+        self._tokenizer.backend_tokenizer.no_padding()
+        self._tokenizer.backend_tokenizer.no_truncation()
+        self._embeddings = np.load(static_dir / embeddings_file, allow_pickle=False)
+        self._rows = token_rows(
+            len(self._tokenizer),
+            np.load(static_dir / token_ids_file, allow_pickle=False),
+        )
+        self.max_seq_length = self._tokenizer.model_max_length
+
+    @property
+    def tokenizer(self):
+        return self._tokenizer
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        return self._embeddings
+
+    def encode(self, texts: list[str], **_kwargs) -> torch.Tensor:
+        return torch.from_numpy(np.stack([self.encode_one(text) for text in texts]))
+
+    def encode_one(self, text: str) -> np.ndarray:
+        # The backend tokenizer skips the Python overhead of the transformers tokenizer call
+        ids = self._tokenizer.backend_tokenizer.encode(
+            text, add_special_tokens=False
+        ).ids[: self.max_seq_length]
+        rows = self._rows[ids]
+        rows = rows[rows >= 0]
+
+        if len(rows) == 0:
+            return np.zeros(self._embeddings.shape[1], dtype=np.float32)
+
+        embedding = self._embeddings[rows].mean(axis=0)
+
+        return embedding / max(float(np.linalg.norm(embedding)), 1e-12)
+
+
+def token_rows(vocab_size: int, token_ids: np.ndarray) -> np.ndarray:
+    """
+    Maps every token id in the vocabulary to its row in the embeddings, or -1 when it doesn't have one.
+    """
+    rows = np.full(max(vocab_size, int(token_ids.max(initial=-1)) + 1), -1)
+    rows[token_ids] = np.arange(len(token_ids))
+
+    return rows
@@ -0,0 +1,244 @@
+import hashlib
+import json
+import struct
+from os import PathLike
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+import torch
+from torch.ao.nn.quantized.dynamic import Linear as DynamicQuantizedLinear
+
+from model.model import build_model
+
+bundle_magic = b"FPOBNDL1"
+bundle_format_version = 1
+bundle_alignment = 64
+quantized_layers = ["fc1", "fc2"]
+low_rank_quantized_layers = ["fc1", "fc2.down", "fc2.up"]
+# The hierarchical model's output layer stays fp32 as it's only partly used per query
+hierarchical_quantized_layers = ["fc1", "chapter_head", "heading_head"]
+
+
+def quantized_layers_for(config: dict) -> list[str]:
+    if config.get("architecture") == "hierarchical":
+        return hierarchical_quantized_layers
+
+    return low_rank_quantized_layers if config.get("fc2_rank", 0) else quantized_layers
+
+
+class ModelBundle:
+    """
+    A single, versioned, pickle-free file containing everything needed to run the classification head:
+
+    - the model weights, either fp32 or int8 (with per output channel scales)
+    - the subheadings that each model output maps to
+    - the model config (the contents of model.toml)
+    - a sha256 checksum of every tensor
+
+    The file is laid out as a magic string, the length of a JSON header, the JSON header and then the
+    raw tensor data (aligned to 64 bytes). Loading memory maps the file so the fp32 weights are used
+    in place without unpickling or copying them. int8 weights are handed to the quantized Linear layers
+    which pack them for the quantized engine.
+
+    The checksums are verified when the bundle is written and again when the Docker image is built
+    (verify_bundles.py), not when it's loaded, as hashing the tensors would read every page of the memory map
+    during the Lambda's init.
+    """
+
+    def __init__(
+        self,
+        config: dict,
+        subheadings: list[str],
+        tensors: dict[str, np.ndarray],
+        quantized: bool = False,
+        model_version: str = "",
+    ) -> None:
+        self.config = config
+        self.subheadings = subheadings
+        self.tensors = tensors
+        self.quantized = quantized
+        self.model_version = model_version
+
+    @classmethod
+    def from_state_dict(
+        cls,
+        state_dict: dict[str, torch.Tensor],
+        config: dict,
+        subheadings: list[str],
+        quantized: bool = False,
+        model_version: str = "",
+    ) -> "ModelBundle":
+        tensors = {
+            name: tensor.detach().cpu().numpy().astype(np.float32)
+            for name, tensor in state_dict.items()
+        }
+
+        if quantized:
+            for layer in quantized_layers_for(config):
+                weight = tensors.pop(f"{layer}.weight")
+                scale = np.abs(weight).max(axis=1) / 127
+                scale[scale == 0] = 1.0
+
+                tensors[f"{layer}.weight"] = np.round(weight / scale[:, None]).astype(
+                    np.int8
+                )
+                tensors[f"{layer}.weight_scale"] = scale.astype(np.float32)
+
+        return cls(config, subheadings, tensors, quantized, model_version)
+
+    def write(self, path: Union[str, PathLike]) -> None:
+        tensor_headers = {}
+        offset = 0
+
+        for name, tensor in self.tensors.items():
+            tensor = np.ascontiguousarray(tensor)
+            offset = _aligned(offset)
+            tensor_headers[name] = {
+                "dtype": str(tensor.dtype),
+                "shape": list(tensor.shape),
+                "offset": offset,
+                "nbytes": tensor.nbytes,
+                "sha256": hashlib.sha256(tensor.tobytes()).hexdigest(),
+            }
+            offset += tensor.nbytes
+
+        header = json.dumps(
+            {
+                "format_version": bundle_format_version,
+                "model_version": self.model_version,
+                "quantized": self.quantized,
+                "config": self.config,
+                "subheadings": self.subheadings,
+                "tensors": tensor_headers,
+            }
+        ).encode("utf-8")
+        data_start = _aligned(len(bundle_magic) + 8 + len(header))
+
+        with open(path, "wb") as f:
+            f.write(bundle_magic)
+            f.write(struct.pack("<Q", len(header)))
+            f.write(header)
+
+            for name, tensor in self.tensors.items():
+                f.seek(data_start + tensor_headers[name]["offset"])
+                f.write(np.ascontiguousarray(tensor).tobytes())
+
+        self.verify(path)
+
+    @classmethod
+    def verify(cls, path: Union[str, PathLike]) -> None:
+        """
+        Checks every tensor in the bundle against its checksum.
+        """
+        cls.load(path, verify=True)
+
+    @classmethod
+    def read_header(cls, path: Union[str, PathLike]) -> dict:
+        with open(path, "rb") as f:
+            return _read_header(f)[0]
+
+    @classmethod
+    def load(cls, path: Union[str, PathLike], verify: bool = False) -> "ModelBundle":
+        with open(path, "rb") as f:
+            header, header_end = _read_header(f)
+
+        if header["format_version"] != bundle_format_version:
+            raise ValueError(
+                f"Unsupported model bundle format version {header['format_version']} in {path}"
+            )
+
+        data_start = _aligned(header_end)
+        # Copy on write so that torch gets writable tensors without copying the weights up front
+        data = np.memmap(Path(path), dtype=np.uint8, mode="c")
+        tensors = {}
+
+        for name, tensor_header in header["tensors"].items():
+            start = data_start + tensor_header["offset"]
+            raw = data[start : start + tensor_header["nbytes"]]
+
+            if verify and hashlib.sha256(raw).hexdigest() != tensor_header["sha256"]:
+                raise ValueError(f"Checksum mismatch for {name} in model bundle {path}")
+
+            tensors[name] = raw.view(np.dtype(tensor_header["dtype"])).reshape(
+                tensor_header["shape"]
+            )
+
+        return cls(
+            header["config"],
+            header["subheadings"],
+            tensors,
+            header["quantized"],
+            header["model_version"],
+        )
+
+    def build_model(self) -> torch.nn.Module:
+        # Build on the meta device so that no weights are allocated (or initialised) before we assign ours
+        with torch.device("meta"):
+            model = build_model(self.config, self.subheadings)
+
+        layers = quantized_layers_for(self.config) if self.quantized else []
+
+        # The weights outside of the quantized layers (e.g. the hierarchical head's subheading weights) are fp32
+        model.load_state_dict(
+            {
+                name: torch.from_numpy(tensor)
+                for name, tensor in self.tensors.items()
+                if name.rpartition(".")[0] not in layers
+            },
+            strict=not layers,
+            assign=True,
+        )
+
+        for layer in layers:
+            parent, _, name = layer.rpartition(".")
+            setattr(
+                model.get_submodule(parent),
+                name,
+                self._quantized_linear(layer),
+            )
+
+        model.eval()
+
+        return model
+
+    def _quantized_linear(self, layer: str) -> DynamicQuantizedLinear:
+        weight = torch.from_numpy(self.tensors[f"{layer}.weight"])
+        scale = torch.from_numpy(self.tensors[f"{layer}.weight_scale"]).double()
+        # The low rank fc2's down projection has no bias
+        bias = (
+            torch.from_numpy(self.tensors[f"{layer}.bias"])
+            if f"{layer}.bias" in self.tensors
+            else None
+        )
+        out_features, in_features = weight.shape
+
+        qweight = torch.quantize_per_channel(
+            weight.float() * scale[:, None].float(),
+            scale,
+            torch.zeros(out_features, dtype=torch.long),
+            0,
+            torch.qint8,
+        )
+        linear = DynamicQuantizedLinear(
+            in_features, out_features, bias_=bias is not None, dtype=torch.qint8
+        )
+        linear.set_weight_bias(qweight, bias)
+
+        return linear
+
+
+def _aligned(offset: int) -> int:
+    return (offset + bundle_alignment - 1) // bundle_alignment * bundle_alignment
+
+
+def _read_header(f) -> tuple[dict, int]:
+    magic = f.read(len(bundle_magic))
+
+    if magic != bundle_magic:
+        raise ValueError(f"{f.name} is not a model bundle")
+
+    (header_length,) = struct.unpack("<Q", f.read(8))
+    header = json.loads(f.read(header_length).decode("utf-8"))
+
+    return header, len(bundle_magic) + 8 + header_length
@@ -1,6 +1,44 @@
+import torch
 from torch import nn
 
 
+class LowRankLinear(nn.Module):
+    """
+    A linear layer factorised into two thinner ones (in_features -> rank -> out_features), which needs
+    rank * (in_features + out_features) weights rather than in_features * out_features.
+    """
+
+    def __init__(self, in_features: int, out_features: int, rank: int):
+        super(LowRankLinear, self).__init__()
+        self.down = nn.Linear(in_features, rank, bias=False)
+        self.up = nn.Linear(rank, out_features)
+
+    @classmethod
+    def from_linear(cls, linear: nn.Linear, rank: int) -> "LowRankLinear":
+        """
+        Compresses a trained linear layer with a truncated SVD of its weights, which is the best
+        approximation of them at the given rank.
+        """
+        with torch.no_grad():
+            u, s, vh = torch.linalg.svd(linear.weight.float(), full_matrices=False)
+            rank = min(rank, len(s))
+            root_s = s[:rank].sqrt()
+
+            low_rank = cls(linear.in_features, linear.out_features, rank)
+            low_rank.down.weight.copy_(root_s[:, None] * vh[:rank])
+            low_rank.up.weight.copy_(u[:, :rank] * root_s[None, :])
+            low_rank.up.bias.copy_(linear.bias)
+
+        return low_rank
+
+    @property
+    def rank(self) -> int:
+        return self.down.out_features
+
+    def forward(self, x):
+        return self.up(self.down(x))
+
+
 class SimpleNN(nn.Module):
     def __init__(
         self,
@@ -9,6 +47,7 @@ class SimpleNN(nn.Module):
         output_size: int,
         dropout_prob1: float,
         dropout_prob2: float,
+        fc2_rank: int = 0,
     ):
         super(SimpleNN, self).__init__()
         self.dropout1 = nn.Dropout(
@@ -17,17 +56,215 @@ class SimpleNN(nn.Module):
         self.fc1 = nn.Linear(input_size, hidden_size)
         self.relu = nn.LeakyReLU()
         self.dropout2 = nn.Dropout(p=dropout_prob2)  # Keep the dropout layer
-        self.fc2 = nn.Linear(hidden_size, output_size)
+
+        # fc2 (hidden_size x number of subheadings) dominates the model so it can be trained factorised
+        if fc2_rank > 0:
+            self.fc2 = LowRankLinear(hidden_size, output_size, fc2_rank)
+        else:
+            self.fc2 = nn.Linear(hidden_size, output_size)
 
         # Apply He initialization to fc1 weights
         nn.init.kaiming_normal_(self.fc1.weight, mode="fan_in", nonlinearity="relu")
-        # Apply He initialization to fc2 weights
-        nn.init.kaiming_normal_(self.fc2.weight, mode="fan_in", nonlinearity="relu")
 
-    def forward(self, x):
+        if fc2_rank > 0:
+            nn.init.kaiming_normal_(self.fc2.down.weight, mode="fan_in")
+            nn.init.kaiming_normal_(
+                self.fc2.up.weight, mode="fan_in", nonlinearity="relu"
+            )
+        else:
+            # Apply He initialization to fc2 weights
+            nn.init.kaiming_normal_(self.fc2.weight, mode="fan_in", nonlinearity="relu")
+
+    @property
+    def fc2_rank(self) -> int:
+        return self.fc2.rank if isinstance(self.fc2, LowRankLinear) else 0
+
+    def factorise_fc2(self, rank: int) -> "SimpleNN":
+        """
+        Replaces a trained fc2 with its truncated SVD at the given rank.
+        """
+        if not isinstance(self.fc2, nn.Linear):
+            raise ValueError("Only a dense fc2 can be factorised")
+
+        self.fc2 = LowRankLinear.from_linear(self.fc2, rank)
+
+        return self
+
+    def hidden(self, x):
         x = self.dropout1(x)  # Apply dropout
         x = self.fc1(x)
         x = self.relu(x)
         x = self.dropout2(x)  # Apply dropout
+        return x
+
+    def forward(self, x):
+        x = self.hidden(x)
         x = self.fc2(x)
         return x
+
+
+# The logit given to subheadings a pruned head doesn't score, which makes them negligible in any softmax
+pruned_logit = -1e4
+
+
+class HierarchicalNN(nn.Module):
+    """
+    A coarse to fine variant of SimpleNN that uses the chapter (2 digit) and heading (4 digit) hierarchy of
+    the subheadings.
+
+    On top of the hidden layer there are chapter and heading heads as well as the usual subheading output
+    layer, all trained together. At inference the top chapters are predicted, then the top headings within
+    them, and only the subheadings under those headings are scored. The rest get pruned_logit. Scored
+    subheadings get exactly the logits the full output layer would give them.
+
+    A top_chapters or top_headings of 0 scores every subheading.
+    """
+
+    def __init__(
+        self,
+        input_size: int,
+        hidden_size: int,
+        subheadings: list[str],
+        dropout_prob1: float,
+        dropout_prob2: float,
+        top_chapters: int = 2,
+        top_headings: int = 8,
+    ):
+        super(HierarchicalNN, self).__init__()
+        chapters = list(dict.fromkeys(str(code)[:2] for code in subheadings))
+        headings = list(dict.fromkeys(str(code)[:4] for code in subheadings))
+        chapter_indexes = {chapter: i for i, chapter in enumerate(chapters)}
+        heading_indexes = {heading: i for i, heading in enumerate(headings)}
+
+        self.top_chapters = top_chapters
+        self.top_headings = top_headings
+
+        self.dropout1 = nn.Dropout(p=dropout_prob1)
+        self.fc1 = nn.Linear(input_size, hidden_size)
+        self.relu = nn.LeakyReLU()
+        self.dropout2 = nn.Dropout(p=dropout_prob2)
+        self.chapter_head = nn.Linear(hidden_size, len(chapters))
+        self.heading_head = nn.Linear(hidden_size, len(headings))
+        # Plain parameters rather than a Linear so that only the scored rows are used (and quantization leaves them be)
+        self.fc2_weight = nn.Parameter(torch.empty(len(subheadings), hidden_size))
+        self.fc2_bias = nn.Parameter(torch.zeros(len(subheadings)))
+
+        nn.init.kaiming_normal_(self.fc1.weight, mode="fan_in", nonlinearity="relu")
+        nn.init.kaiming_normal_(self.fc2_weight, mode="fan_in", nonlinearity="relu")
+
+        # The hierarchy is derived from the subheadings so it isn't saved with the weights. The device is
+        # explicit so that it's built even when the model is created on the meta device.
+        heading_of_subheading = torch.tensor(
+            [heading_indexes[str(code)[:4]] for code in subheadings], device="cpu"
+        )
+        chapter_of_heading = torch.tensor(
+            [chapter_indexes[heading[:2]] for heading in headings], device="cpu"
+        )
+        self.register_buffer(
+            "heading_of_subheading", heading_of_subheading, persistent=False
+        )
+        self.register_buffer("chapter_of_heading", chapter_of_heading, persistent=False)
+        self.register_buffer(
+            "chapter_of_subheading",
+            chapter_of_heading[heading_of_subheading],
+            persistent=False,
+        )
+        # The subheadings under each heading, a row per heading padded out with len(subheadings)
+        children_order = torch.argsort(heading_of_subheading, stable=True)
+        children_counts = torch.bincount(heading_of_subheading, minlength=len(headings))
+        children_starts = children_counts.cumsum(0) - children_counts
+        heading_children = torch.full(
+            (len(headings), int(children_counts.max())), len(subheadings), device="cpu"
+        )
+        heading_children[
+            heading_of_subheading[children_order],
+            torch.arange(len(subheadings), device="cpu")
+            - children_starts[heading_of_subheading[children_order]],
+        ] = children_order
+        self.register_buffer("heading_children", heading_children, persistent=False)
+
+    def hidden(self, x):
+        x = self.dropout1(x)
+        x = self.fc1(x)
+        x = self.relu(x)
+        return self.dropout2(x)
+
+    def forward_all(self, x):
+        """
+        The chapter, heading and (every) subheading logits, which is what the model is trained on.
+        """
+        hidden = self.hidden(x)
+
+        return (
+            self.chapter_head(hidden),
+            self.heading_head(hidden),
+            hidden @ self.fc2_weight.T + self.fc2_bias,
+        )
+
+    def forward(self, x):
+        hidden = self.hidden(x)
+
+        if self.top_chapters < 1 or self.top_headings < 1:
+            return hidden @ self.fc2_weight.T + self.fc2_bias
+
+        chapter_logits = self.chapter_head(hidden)
+        heading_logits = self.heading_head(hidden)
+        top_chapters = chapter_logits.topk(
+            min(self.top_chapters, chapter_logits.shape[1]), dim=1
+        ).indices
+
+        # Only headings in the top chapters are candidates
+        in_top_chapters = (
+            self.chapter_of_heading[None, :, None] == top_chapters[:, None, :]
+        ).any(dim=2)
+        heading_logits = heading_logits.masked_fill(~in_top_chapters, float("-inf"))
+        top_headings = heading_logits.topk(
+            min(self.top_headings, heading_logits.shape[1]), dim=1
+        ).indices
+
+        # Fewer candidate headings than top_headings are padded with -inf ones from other chapters. Their
+        # subheadings, like the padding of headings with fewer children, are scored into an extra column
+        # that is dropped.
+        padding = self.fc2_weight.shape[0]
+        candidate_headings = heading_logits.gather(1, top_headings) > float("-inf")
+        candidates = (
+            self.heading_children[top_headings]
+            .masked_fill(~candidate_headings[:, :, None], padding)
+            .flatten(1)
+        )
+        rows = candidates.clamp(max=padding - 1)
+        scores = (self.fc2_weight[rows] @ hidden[:, :, None]).squeeze(2)
+        scores = scores + self.fc2_bias[rows]
+
+        logits = torch.full(
+            (hidden.shape[0], padding + 1),
+            pruned_logit,
+            dtype=scores.dtype,
+            device=hidden.device,
+        )
+        logits.scatter_(1, candidates, scores)
+
+        return logits[:, :padding]
+
+
+def build_model(config: dict, subheadings: list[str]) -> nn.Module:
+    """
+    Builds the (untrained) model described by a model config (the contents of model.toml).
+    """
+    if config.get("architecture") == "hierarchical":
+        return HierarchicalNN(
+            config["input_size"],
+            config["hidden_size"],
+            subheadings,
+            config["dropout_layer_1_percentage"],
+            config["dropout_layer_2_percentage"],
+        )
+
+    return SimpleNN(
+        config["input_size"],
+        config["hidden_size"],
+        config["output_size"],
+        config["dropout_layer_1_percentage"],
+        config["dropout_layer_2_percentage"],
+        config.get("fc2_rank", 0),
+    )
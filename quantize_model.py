@@ -1,13 +1,13 @@
+import json
 import os
 import toml
 import torch
 from torch.quantization import quantize_dynamic
 
-from model.model import SimpleNN
-from train_args import TrainScriptArgsParser
+from model.bundle import ModelBundle
+from model.model import build_model
+from train_args import args
 
-args = TrainScriptArgsParser()
-args.load_config_file()
 
 device = "cpu"
 
@@ -16,13 +16,7 @@ def load_model():
     model_file = args.target_dir() / "model.pt"
     model_config = toml.load(args.target_dir() / "model.toml")
 
-    model = SimpleNN(
-        model_config["input_size"],
-        model_config["hidden_size"],
-        model_config["output_size"],
-        model_config["dropout_layer_1_percentage"],
-        model_config["dropout_layer_2_percentage"],
-    )
+    model = build_model(model_config, load_subheadings())
 
     model.load_state_dict(torch.load(model_file, map_location=device))
 
@@ -31,19 +25,63 @@ def load_model():
     return model
 
 
-# This will quantize the weights of Linear layers to int8 significantly reducing the model size whilst maintaining accuracy
+def quantize_linear_layers(module):
+    return quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def model_version():
+    model_version_file = args.pwd() / "MODEL_VERSION"
+
+    return model_version_file.read_text().strip() if model_version_file.exists() else ""
+
+
+def load_subheadings() -> list[str]:
+    with open(args.target_dir() / "subheadings.json", "r") as fp:
+        return json.load(fp)
+
+
+# This will quantize the weights of Linear layers to int8 significantly reducing the model size whilst maintaining accuracy.
+# The quantized weights are written to a pickle free model bundle which the classifier memory maps at load time.
 def quantize_model(model):
     print("== Quantizing model ==")
-    quantized_model = quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
-    torch.save(quantized_model, args.target_dir() / "model_quantized.pt")
+    model_config = toml.load(args.target_dir() / "model.toml")
+
+    subheadings = load_subheadings()
+
+    ModelBundle.from_state_dict(
+        model.state_dict(),
+        model_config,
+        subheadings,
+        quantized=True,
+        model_version=model_version(),
+    ).write(args.target_dir() / "model_quantized.bundle")
+
     print("== Deleting original model to save space ==")
     os.remove(args.target_dir() / "model.pt")
 
+    if (args.target_dir() / "model.bundle").exists():
+        os.remove(args.target_dir() / "model.bundle")
+
+
+# The sentence transformer is where nearly all of the inference time goes so we quantize its Linear layers too.
+# Only the quantized weights are saved. They're loaded back into a quantized copy of the downloaded transformer.
+def quantize_transformer():
+    from sentence_transformers import SentenceTransformer
+
+    print("== Quantizing sentence transformer ==")
+    sentence_transformer = SentenceTransformer(args.transformer(), device=device)
+    quantized_transformer = quantize_linear_layers(sentence_transformer)
+    torch.save(
+        quantized_transformer.state_dict(),
+        args.target_dir() / "transformer_quantized.pt",
+    )
+
 
 if __name__ == "__main__":
     if args.uses_quantized_model():
         print("== uses_quantized_model is true, proceeding with quantization ==")
         model = load_model()
         quantize_model(model)
+        quantize_transformer()
     else:
         print("== uses_quantized_model is false, skipping quantization ==")
@@ -3,7 +3,10 @@ import logging
 import unittest
 
 from aws_lambda.handler import LambdaHandler
+from aws_lambda.result_cache import ResultCache
+from inference.embedding_cache import EmbeddingCache
 from inference.infer import ClassificationResult, Classifier
+from tests.inference.test_flat_classifier import build_classifier
 
 logger = logging.getLogger()
 logger.addHandler(logging.StreamHandler())
@@ -19,6 +22,30 @@ class MockClassifier(Classifier):
         ]
 
 
+class CountingClassifier(MockClassifier):
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def classify(
+        self, search_text: str, limit: int = 5, digits: int = 6
+    ) -> list[ClassificationResult]:
+        self.calls += 1
+
+        return super().classify(search_text, limit, digits)
+
+
+class UnconfidentClassifier(CountingClassifier):
+    def classify(
+        self, search_text: str, limit: int = 5, digits: int = 6
+    ) -> list[ClassificationResult]:
+        results = super().classify(search_text, limit, digits)
+
+        for result in results:
+            result.score /= 2
+
+        return results
+
+
 classifier = MockClassifier()
 
 handler = LambdaHandler(classifier)
@@ -264,6 +291,120 @@ class Test_handler_handle(unittest.TestCase):
             "Expected a 200 status code",
         )
 
+    def test_it_should_cache_classification_results(self):
+        counting_classifier = CountingClassifier()
+        result_cache = ResultCache()
+        caching_handler = LambdaHandler(counting_classifier, result_cache=result_cache)
+
+        first = caching_handler.handle(self._create_post_event("foo", "6", "5"), {})
+        second = caching_handler.handle(self._create_post_event("foo", "6", "5"), {})
+        caching_handler.handle(self._create_post_event("foo", "8", "5"), {})
+
+        self.assertEqual(first["body"], second["body"])
+        self.assertEqual(2, counting_classifier.calls)
+        # The second request hits both the cleaning and results caches, the third just cleaning
+        self.assertEqual(3, result_cache.stats()["hits"])
+
+    def test_it_should_cache_cleaning_rejections(self):
+        result_cache = ResultCache()
+        caching_handler = LambdaHandler(classifier, result_cache=result_cache)
+
+        first = caching_handler.handle(self._create_post_event("Danke"), {})
+        second = caching_handler.handle(self._create_post_event("Danke"), {})
+
+        self.assertEqual(400, second["statusCode"], "Expected a 400 status code")
+        self.assertEqual(first["body"], second["body"])
+        self.assertEqual(1, result_cache.stats()["hits"])
+
+    def test_it_should_warm_up_every_stage_without_caching(self):
+        counting_classifier = CountingClassifier()
+        result_cache = ResultCache()
+        warming_handler = LambdaHandler(counting_classifier, result_cache=result_cache)
+
+        timings = warming_handler.warm_up(["cotton t-shirts", "bananas"])
+
+        self.assertEqual(
+            {
+                "cleaning",
+                "language_detection",
+                "vague_terms",
+                "search_references",
+                "classify",
+                "handler",
+            },
+            set(timings),
+        )
+        # Both queries go through the classifier warm-up but bananas is a search reference in the handler
+        self.assertEqual(3, counting_classifier.calls)
+        self.assertEqual(0, len(result_cache))
+        self.assertEqual(0, result_cache.stats()["misses"])
+
+    def test_it_should_not_log_or_cache_embeddings_for_the_warm_up(self):
+        flat_classifier = build_classifier(EmbeddingCache(max_size=10))
+        warming_handler = LambdaHandler(
+            flat_classifier, logger=logging.getLogger("warm-up")
+        )
+
+        with self.assertLogs("warm-up", level="INFO") as logs:
+            warming_handler.warm_up(["cotton t-shirts", "Danke"])
+
+        self.assertEqual(
+            ["Warm-up completed in"],
+            [record.getMessage()[:20] for record in logs.records],
+        )
+        self.assertEqual(0, len(flat_classifier.embedding_cache))
+        self.assertEqual(0, flat_classifier.embedding_cache.stats()["misses"])
+
+    def test_it_should_only_fall_back_when_the_first_stage_is_not_confident(self):
+        first_stage = CountingClassifier()
+        fallback = CountingClassifier()
+        cascading_handler = LambdaHandler(
+            fallback,
+            result_cache=ResultCache(max_size=0),
+            first_stage=first_stage,
+            cascade_threshold=0.9,
+        )
+
+        cascading_handler.handle(self._create_post_event("foo", "6", "5"), {})
+        cascading_handler.handle(self._create_post_event("foo", "6", "5"), {})
+
+        self.assertEqual(2, first_stage.calls)
+        self.assertEqual(0, fallback.calls)
+        self.assertEqual(
+            {
+                "threshold": 0.9,
+                "first_stage_hits": 2,
+                "fallbacks": 0,
+                "first_stage_hit_rate": 1.0,
+            },
+            cascading_handler.cascade_stats(),
+        )
+
+        cascading_handler = LambdaHandler(
+            fallback,
+            result_cache=ResultCache(max_size=0),
+            first_stage=UnconfidentClassifier(),
+            cascade_threshold=0.9,
+        )
+        cascading_handler.handle(self._create_post_event("foo", "6", "5"), {})
+
+        self.assertEqual(1, fallback.calls)
+        self.assertEqual(1, cascading_handler.cascade_stats()["fallbacks"])
+
+    def test_it_should_not_count_the_warm_up_in_the_cascade_stats(self):
+        cascading_handler = LambdaHandler(
+            CountingClassifier(), first_stage=CountingClassifier()
+        )
+
+        timings = cascading_handler.warm_up(["cotton t-shirts"])
+
+        self.assertIn("first_stage_classify", timings)
+        self.assertEqual(0, cascading_handler.cascade_stats()["first_stage_hits"])
+        self.assertEqual(0, cascading_handler.cascade_stats()["fallbacks"])
+
+    def test_it_should_not_have_cascade_stats_without_a_first_stage(self):
+        self.assertIsNone(handler.cascade_stats())
+
     def _create_post_event(self, description: str, digits: str = "6", limit: str = "5"):
         return {
             "path": "/fpo-code-search",
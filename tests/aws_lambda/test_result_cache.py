@@ -0,0 +1,55 @@
+import unittest
+
+from aws_lambda.result_cache import ResultCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestResultCache(unittest.TestCase):
+    def test_get_returns_a_stored_value(self):
+        cache = ResultCache()
+
+        cache.put(("results", "trousers", 6, 5), [{"code": "620462"}])
+
+        self.assertEqual([{"code": "620462"}], cache.get(("results", "trousers", 6, 5)))
+        self.assertIsNone(cache.get(("results", "trousers", 8, 5)))
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(1, cache.misses)
+
+    def test_entries_expire_after_the_ttl(self):
+        clock = FakeClock()
+        cache = ResultCache(ttl_seconds=60, clock=clock)
+
+        cache.put("trousers", [])
+        clock.now = 59
+        self.assertEqual([], cache.get("trousers"))
+
+        clock.now = 60
+        self.assertIsNone(cache.get("trousers"))
+        self.assertEqual(1, cache.expirations)
+        self.assertEqual(0, len(cache))
+
+    def test_put_evicts_the_least_recently_used_entry(self):
+        cache = ResultCache(max_size=2)
+
+        cache.put("trousers", [])
+        cache.put("t-shirts", [])
+        cache.get("trousers")
+        cache.put("mobile phone", [])
+
+        self.assertEqual([], cache.get("trousers"))
+        self.assertIsNone(cache.get("t-shirts"))
+        self.assertEqual(1, cache.evictions)
+
+    def test_zero_max_size_disables_the_cache(self):
+        cache = ResultCache(max_size=0)
+
+        cache.put("trousers", [])
+
+        self.assertIsNone(cache.get("trousers"))
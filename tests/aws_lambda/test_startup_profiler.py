@@ -0,0 +1,92 @@
+import json
+import logging
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from aws_lambda.startup_profiler import StartupProfiler, current_rss_mb
+
+
+class TestStartupProfiler(unittest.TestCase):
+    def test_it_records_nested_phases_in_start_order(self):
+        profiler = StartupProfiler(enabled=True)
+
+        with profiler.phase("config"):
+            with profiler.phase("reference files"):
+                pass
+
+        with profiler.phase("classifier"):
+            pass
+
+        report = profiler.report()
+
+        self.assertEqual(
+            [("config", 0), ("reference files", 1), ("classifier", 0)],
+            [(phase["name"], phase["depth"]) for phase in report["phases"]],
+        )
+        for phase in report["phases"]:
+            self.assertGreaterEqual(phase["duration_ms"], 0)
+            self.assertGreater(phase["rss_end_mb"], 0)
+            self.assertAlmostEqual(
+                phase["rss_end_mb"] - phase["rss_start_mb"], phase["rss_delta_mb"]
+            )
+        self.assertAlmostEqual(
+            report["phases"][0]["duration_ms"] + report["phases"][2]["duration_ms"],
+            report["total_ms"],
+        )
+
+    def test_it_records_phases_that_raise(self):
+        profiler = StartupProfiler(enabled=True)
+
+        with self.assertRaises(ValueError):
+            with profiler.phase("config"):
+                raise ValueError("bad config")
+
+        self.assertIn("duration_ms", profiler.phases[0])
+
+    def test_it_does_nothing_when_disabled(self):
+        profiler = StartupProfiler()
+
+        with profiler.phase("config"):
+            pass
+
+        self.assertEqual([], profiler.phases)
+        self.assertIsNone(profiler.finish(logging.getLogger("test")))
+
+    def test_it_writes_a_chrome_trace(self):
+        with tempfile.TemporaryDirectory() as directory:
+            trace_file = Path(directory) / "trace.json"
+            profiler = StartupProfiler(enabled=True, trace_file=trace_file)
+
+            with profiler.phase("config"):
+                pass
+
+            profiler.finish(logging.getLogger("test"))
+
+            with open(trace_file, "r") as f:
+                trace = json.load(f)
+
+        (event,) = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+
+        self.assertEqual("config", event["name"])
+        self.assertIn("rss_delta_mb", event["args"])
+
+    def test_it_is_configured_from_the_environment(self):
+        with mock.patch.dict(os.environ, {"STARTUP_PROFILE": "1"}, clear=True):
+            self.assertTrue(StartupProfiler.from_environment().enabled)
+
+        with mock.patch.dict(
+            os.environ, {"STARTUP_PROFILE_TRACE": "trace.json"}, clear=True
+        ):
+            profiler = StartupProfiler.from_environment()
+
+            self.assertTrue(profiler.enabled)
+            self.assertEqual("trace.json", profiler.trace_file)
+
+        with mock.patch.dict(os.environ, {}, clear=True):
+            self.assertFalse(StartupProfiler.from_environment().enabled)
+
+    def test_current_rss_mb(self):
+        self.assertGreater(current_rss_mb(), 0)
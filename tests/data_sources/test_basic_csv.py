@@ -2,6 +2,11 @@ import logging
 import unittest
 
 from data_sources.basic_csv import BasicCSVDataSource
+from training.cleaning_pipeline import (
+    CleaningPipeline,
+    RemoveDescriptionsMatchingRegexes,
+    RemoveShortDescription,
+)
 
 logger = logging.getLogger()
 logger.addHandler(logging.StreamHandler())
@@ -27,6 +32,48 @@ class Test_basic_csv_data_source(unittest.TestCase):
         }
         self.assertEqual(result, expected)
 
+    def test_batch_cleaning_matches_per_row_cleaning(self):
+        pipeline = CleaningPipeline(
+            [
+                RemoveShortDescription(min_length=11),
+                RemoveDescriptionsMatchingRegexes(regexes=["toys"]),
+            ]
+        )
+
+        per_row, batch = [
+            BasicCSVDataSource(
+                filename=self.sample_file_path,
+                cleaning_pipeline=pipeline,
+                batch_cleaning=batch_cleaning,
+            ).get_codes(digits=5)
+            for batch_cleaning in [False, True]
+        ]
+
+        self.assertEqual(
+            {"12345": {"raw ocean fish"}, "34567": {"wooden frames"}}, batch
+        )
+        self.assertEqual(per_row, batch)
+
+    def test_get_codes_for_cleaning_report(self):
+        data_source = BasicCSVDataSource(
+            filename=self.sample_file_path,
+            cleaning_pipeline=CleaningPipeline([RemoveShortDescription(min_length=10)]),
+        )
+
+        self.assertEqual(
+            [
+                [
+                    None,
+                    None,
+                    "12345",
+                    "Fresh fish",
+                    {"RemoveShortDescription": {"reason": "Short description"}},
+                ],
+                ["12345", "raw ocean fish", "12345", "Raw ocean fish", {}],
+            ],
+            data_source.get_codes_for_cleaning_report(digits=5)[:2],
+        )
+
     def test_get_description(self):
         expected_description = f"CSV data source from {self.sample_file_path}"
         self.assertEqual(self.data_source.description, expected_description)
@@ -0,0 +1,86 @@
+import unittest
+
+from inference.cascade import CascadeClassifier
+from inference.infer import ClassificationResult, Classifier
+
+
+class FixedClassifier(Classifier):
+    """
+    Returns the given results for each text and records what it was asked to classify.
+    """
+
+    def __init__(self, results: dict[str, list[ClassificationResult]]) -> None:
+        self.results = results
+        self.classified: list[str] = []
+
+    def classify(
+        self, search_text: str, limit: int = 5, digits: int = 6
+    ) -> list[ClassificationResult]:
+        self.classified.append(search_text)
+
+        return self.results.get(search_text, [])
+
+
+class TestCascadeClassifier(unittest.TestCase):
+    def setUp(self):
+        self.first_stage = FixedClassifier(
+            {
+                "bananas": [ClassificationResult("080390", 0.95)],
+                "misc item": [
+                    ClassificationResult("950300", 0.5),
+                    ClassificationResult("392690", 0.4),
+                ],
+            }
+        )
+        self.fallback = FixedClassifier(
+            {
+                "bananas": [ClassificationResult("080310", 0.6)],
+                "misc item": [ClassificationResult("392690", 0.7)],
+                "teapot": [ClassificationResult("691110", 0.8)],
+            }
+        )
+        self.cascade = CascadeClassifier(self.first_stage, self.fallback, 0.9)
+
+    def test_confident_first_stage_results_are_used(self):
+        self.assertEqual(["080390"], [r.code for r in self.cascade.classify("bananas")])
+        self.assertEqual([], self.fallback.classified)
+
+    def test_it_falls_back_when_the_first_stage_is_not_confident(self):
+        self.assertEqual(
+            ["392690"], [r.code for r in self.cascade.classify("misc item")]
+        )
+        self.assertEqual(["691110"], [r.code for r in self.cascade.classify("teapot")])
+        self.assertEqual(["misc item", "teapot"], self.fallback.classified)
+
+    def test_classify_batch_only_falls_back_for_the_unconfident_texts(self):
+        results = self.cascade.classify_batch(["misc item", "bananas", "teapot"])
+
+        self.assertEqual(
+            [["392690"], ["080390"], ["691110"]],
+            [[r.code for r in result] for result in results],
+        )
+        self.assertEqual(["misc item", "teapot"], self.fallback.classified)
+
+    def test_it_counts_the_stage_that_answered(self):
+        self.cascade.classify_batch(["misc item", "bananas", "teapot"])
+
+        self.assertEqual(
+            {
+                "threshold": 0.9,
+                "first_stage_hits": 1,
+                "fallbacks": 2,
+                "first_stage_hit_rate": 1 / 3,
+            },
+            self.cascade.stats(),
+        )
+
+        self.cascade.reset_stats()
+
+        self.assertEqual(0.0, self.cascade.stats()["first_stage_hit_rate"])
+
+    def test_warm_up_runs_both_stages_without_counting(self):
+        timings = self.cascade.warm_up(["bananas"])
+
+        self.assertEqual({"first_stage_classify", "classify"}, set(timings))
+        self.assertEqual(["bananas"], self.fallback.classified)
+        self.assertEqual(0, self.cascade.stats()["first_stage_hits"])
@@ -0,0 +1,105 @@
+import unittest
+
+import numpy as np
+
+from inference.embedding_cache import EmbeddingCache
+
+
+def embedding(seed: int) -> np.ndarray:
+    vector = np.random.default_rng(seed).normal(size=768).astype(np.float32)
+
+    return vector / np.linalg.norm(vector)
+
+
+class TestEmbeddingCache(unittest.TestCase):
+    def test_get_returns_none_and_counts_a_miss(self):
+        cache = EmbeddingCache(max_size=2)
+
+        self.assertIsNone(cache.get("t-shirts"))
+        self.assertEqual(1, cache.misses)
+        self.assertEqual(0, cache.hits)
+
+    def test_get_returns_a_stored_embedding(self):
+        for dtype, tolerance in [("float16", 1e-3), ("int8", 1e-2)]:
+            cache = EmbeddingCache(max_size=2, dtype=dtype)
+            stored = embedding(1)
+
+            cache.put("t-shirts", stored)
+            actual = cache.get("t-shirts")
+
+            self.assertEqual(np.float32, actual.dtype)
+            np.testing.assert_allclose(stored, actual, atol=tolerance)
+            self.assertEqual(1, cache.hits)
+
+    def test_put_returns_the_embedding_get_will(self):
+        for dtype in ["float16", "int8"]:
+            cache = EmbeddingCache(max_size=2, dtype=dtype)
+
+            put = cache.put("t-shirts", embedding(1))
+
+            np.testing.assert_array_equal(cache.get("t-shirts"), put)
+
+    def test_put_evicts_the_least_recently_used_entry(self):
+        cache = EmbeddingCache(max_size=2)
+
+        cache.put("t-shirts", embedding(1))
+        cache.put("trousers", embedding(2))
+        cache.get("t-shirts")
+        cache.put("mobile phone", embedding(3))
+
+        self.assertIn("t-shirts", cache)
+        self.assertNotIn("trousers", cache)
+        self.assertIn("mobile phone", cache)
+        self.assertEqual(1, cache.evictions)
+        self.assertEqual(2, len(cache))
+
+    def test_zero_max_size_disables_the_cache(self):
+        cache = EmbeddingCache(max_size=0)
+
+        cache.put("t-shirts", embedding(1))
+
+        self.assertIsNone(cache.get("t-shirts"))
+        self.assertEqual(0, len(cache))
+
+    def test_stats(self):
+        cache = EmbeddingCache(max_size=1, dtype="int8")
+
+        cache.put("t-shirts", embedding(1))
+        cache.get("t-shirts")
+        cache.get("trousers")
+        cache.put("trousers", embedding(2))
+
+        self.assertEqual(
+            {
+                "size": 1,
+                "max_size": 1,
+                "dtype": "int8",
+                "hits": 1,
+                "misses": 1,
+                "evictions": 1,
+                "hit_rate": 0.5,
+            },
+            cache.stats(),
+        )
+
+    def test_clear_drops_the_entries_and_the_stats(self):
+        cache = EmbeddingCache(max_size=1)
+        cache.put("t-shirts", embedding(0))
+        cache.get("t-shirts")
+        cache.get("trousers")
+        cache.put("trousers", embedding(1))
+
+        cache.clear()
+
+        self.assertEqual(0, len(cache))
+        self.assertEqual(
+            (0, 0, 0, 0.0),
+            tuple(
+                cache.stats()[key]
+                for key in ["hits", "misses", "evictions", "hit_rate"]
+            ),
+        )
+
+    def test_unsupported_dtype(self):
+        with self.assertRaises(ValueError):
+            EmbeddingCache(dtype="float64")
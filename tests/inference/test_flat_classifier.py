@@ -0,0 +1,188 @@
+import hashlib
+import unittest
+
+import numpy as np
+import torch
+
+from inference.embedding_cache import EmbeddingCache
+from inference.infer import FlatClassifier, PrefixGroups
+from model.model import SimpleNN
+from tests.inference.tiny_sentence_transformer import build_tiny_sentence_transformer
+
+SUBHEADINGS = [
+    f"{chapter:02d}{heading:02d}{subheading:02d}{suffix}"
+    for chapter in range(1, 21)
+    for heading in range(1, 6)
+    for subheading in (10, 90)
+    for suffix in ("00", "10")
+] + ["vvvvvvvvvv"]
+
+
+class MockSentenceTransformer:
+    """
+    Produces deterministic, normalised embeddings for each text without loading a real transformer.
+    """
+
+    def __init__(self, dimensions: int = 16) -> None:
+        self.dimensions = dimensions
+        self.encoded: list[str] = []
+
+    def encode(self, texts, **_kwargs):
+        self.encoded.extend(texts)
+        embeddings = torch.stack([self._embedding(text) for text in texts])
+
+        return torch.nn.functional.normalize(embeddings, dim=1)
+
+    def _embedding(self, text: str) -> torch.Tensor:
+        seed = int(hashlib.md5(text.encode()).hexdigest()[:8], 16)
+        generator = torch.Generator().manual_seed(seed)
+
+        return torch.randn(self.dimensions, generator=generator)
+
+
+def build_classifier(embedding_cache: EmbeddingCache | None = None) -> FlatClassifier:
+    torch.manual_seed(42)
+    model = SimpleNN(16, 32, len(SUBHEADINGS), 0.1, 0.1)
+    # Sharpen the logits so that the cut-off logic returns a handful of results
+    model.fc2.weight.data *= 8
+    model.eval()
+
+    return FlatClassifier(
+        SUBHEADINGS,
+        "cpu",
+        model=model,
+        sentence_transformer_model=MockSentenceTransformer(),
+        embedding_cache=(
+            EmbeddingCache(max_size=0) if embedding_cache is None else embedding_cache
+        ),
+    )
+
+
+class TestFlatClassifier(unittest.TestCase):
+    classifier = build_classifier()
+    texts = ["trousers", "lipstick", "water cup", "towel", "kingsmill bread"]
+
+    def test_classify_batch_matches_classify(self):
+        for digits in [2, 4, 6, 8]:
+            batch_results = self.classifier.classify_batch(self.texts, 5, digits)
+
+            self.assertEqual(len(self.texts), len(batch_results))
+
+            for text, batch_result in zip(self.texts, batch_results):
+                result = self.classifier.classify(text, 5, digits)
+
+                self.assertEqual(
+                    [r.code for r in result], [r.code for r in batch_result]
+                )
+                for expected, actual in zip(result, batch_result):
+                    self.assertAlmostEqual(expected.score, actual.score, places=5)
+
+    def test_classify_batch_matches_classify_with_a_sentence_transformer(self):
+        sentence_transformer = build_tiny_sentence_transformer()
+        # Texts of different lengths, which a batch would pad to a common length
+        texts = ["towel", "plenty kitchen towels with gold", "water cup", "t-shirts"]
+
+        for lean_encoder in [False, True]:
+            torch.manual_seed(42)
+            model = SimpleNN(32, 32, len(SUBHEADINGS), 0.1, 0.1)
+            model.fc2.weight.data *= 8
+            classifier = FlatClassifier(
+                SUBHEADINGS,
+                "cpu",
+                model=model.eval(),
+                sentence_transformer_model=sentence_transformer,
+                embedding_cache=EmbeddingCache(max_size=0),
+                lean_encoder=lean_encoder,
+            )
+
+            with self.subTest(lean_encoder=lean_encoder):
+                # The head's matmuls aren't bit-identical across batch sizes but the embeddings are
+                self.assertTrue(
+                    np.array_equal(
+                        np.concatenate([classifier._encode([text]) for text in texts]),
+                        classifier._encode(texts),
+                    )
+                )
+                batch_results = classifier.classify_batch(texts, 5, 8)
+
+                for text, batch_result in zip(texts, batch_results):
+                    result = classifier.classify(text, 5, 8)
+
+                    self.assertEqual(
+                        [r.code for r in result], [r.code for r in batch_result]
+                    )
+                    for expected, actual in zip(result, batch_result):
+                        self.assertAlmostEqual(expected.score, actual.score, places=5)
+
+    def test_ties_at_the_top_n_are_broken_on_the_first_seen_group(self):
+        subheadings = [f"{i:08d}" for i in range(200)]
+        groups = PrefixGroups(subheadings, 8)
+        # The top 10 groups (5%) are softmaxed. 6 clear leaders and then many groups tied for the last 4 places.
+        predictions = np.zeros(len(subheadings))
+        predictions[::7] = 9.9
+        predictions[[150, 20, 90, 5, 199, 60]] = 10.0
+
+        result = self.classifier._results_from_predictions(groups, predictions, 10, 8)
+        expected = np.argsort(-predictions, kind="stable")[: len(result)]
+
+        self.assertEqual(9, len(result))
+        self.assertEqual(groups.codes[expected].tolist(), [r.code for r in result])
+
+    def test_classify_respects_limit_and_digits(self):
+        for digits in [4, 6, 8]:
+            result = self.classifier.classify("trousers", 2, digits)
+
+            self.assertLessEqual(len(result), 2)
+            self.assertTrue(all(len(r.code) == digits for r in result))
+
+    def test_classify_batch_with_no_texts(self):
+        self.assertEqual([], self.classifier.classify_batch([], 5, 6))
+
+    def test_classify_uses_the_embedding_cache(self):
+        classifier = build_classifier(EmbeddingCache(max_size=10))
+        encoder = classifier._sentence_transformer_model
+
+        first = classifier.classify_batch(["towel", "towel", "trousers"], 5, 6)
+        second = classifier.classify_batch(["towel", "trousers"], 5, 6)
+
+        self.assertEqual(["towel", "trousers"], encoder.encoded)
+        self.assertEqual(2, classifier.embedding_cache.stats()["hits"])
+        self.assertEqual(
+            [[r.code for r in result] for result in first[1:]],
+            [[r.code for r in result] for result in second],
+        )
+
+    def test_classify_is_the_same_whether_or_not_the_embedding_was_cached(self):
+        for dtype in ["float16", "int8"]:
+            classifier = build_classifier(EmbeddingCache(max_size=10, dtype=dtype))
+
+            with self.subTest(dtype=dtype):
+                first = classifier.classify("water cup", 5, 8)
+                second = classifier.classify("water cup", 5, 8)
+
+                self.assertEqual(1, classifier.embedding_cache.stats()["hits"])
+                self.assertEqual(
+                    [(r.code, r.score) for r in first],
+                    [(r.code, r.score) for r in second],
+                )
+
+    def test_warm_up_bypasses_the_embedding_cache(self):
+        classifier = build_classifier(EmbeddingCache(max_size=10))
+        encoder = classifier._sentence_transformer_model
+
+        timings = classifier.warm_up(["towel"])
+        classifier.warm_up(["towel"])
+
+        self.assertEqual({"encode", "head"}, set(timings))
+        self.assertEqual(["towel", "towel"], encoder.encoded)
+        self.assertEqual(0, len(classifier.embedding_cache))
+
+    def test_it_rejects_unsupported_encoders(self):
+        with self.assertRaisesRegex(ValueError, "Unsupported encoder"):
+            FlatClassifier(
+                SUBHEADINGS,
+                "cpu",
+                model=self.classifier._model,
+                sentence_transformer_model=MockSentenceTransformer(),
+                encoder="professor",
+            )
@@ -0,0 +1,95 @@
+import unittest
+
+import torch
+from sentence_transformers import SentenceTransformer, models
+
+from inference.infer import LeanSentenceEncoder
+from quantize_model import quantize_linear_layers
+from tests.inference.tiny_sentence_transformer import build_tiny_sentence_transformer
+
+
+def encode(sentence_transformer: SentenceTransformer, text: str) -> torch.Tensor:
+    return sentence_transformer.encode(
+        [text],
+        convert_to_tensor=True,
+        device="cpu",
+        show_progress_bar=False,
+        normalize_embeddings=True,
+    )
+
+
+class TestLeanSentenceEncoder(unittest.TestCase):
+    texts = [
+        "trousers",
+        "plenty kitchen towels with gold",
+        "t-shirts",
+        " ".join(["cotton shirts"] * 100),  # Truncated to the max sequence length
+    ]
+
+    @classmethod
+    def setUpClass(cls):
+        cls.sentence_transformer = build_tiny_sentence_transformer()
+
+    def test_embeddings_are_identical_to_sentence_transformer_encode(self):
+        encoder = LeanSentenceEncoder(self.sentence_transformer, "cpu")
+
+        for text in self.texts:
+            self.assertTrue(
+                torch.equal(
+                    encode(self.sentence_transformer, text), encoder.encode([text])
+                )
+            )
+
+    def test_embeddings_are_identical_for_a_quantized_transformer(self):
+        quantized = quantize_linear_layers(build_tiny_sentence_transformer())
+        encoder = LeanSentenceEncoder(quantized, "cpu")
+
+        for text in self.texts:
+            self.assertTrue(
+                torch.equal(encode(quantized, text), encoder.encode([text]))
+            )
+
+    def test_encode_returns_a_row_per_text(self):
+        encoder = LeanSentenceEncoder(self.sentence_transformer, "cpu")
+
+        embeddings = encoder.encode(self.texts[:2])
+
+        self.assertEqual((2, 32), tuple(embeddings.shape))
+        self.assertFalse(torch.equal(embeddings[0], embeddings[1]))
+
+    def test_an_embedding_is_not_overwritten_by_the_next_one(self):
+        encoder = LeanSentenceEncoder(self.sentence_transformer, "cpu")
+
+        embedding = encoder.encode_one(self.texts[0])
+        expected = embedding.clone()
+        encoder.encode_one(self.texts[1])
+
+        self.assertTrue(torch.equal(expected, embedding))
+
+    def test_it_follows_changes_to_the_max_sequence_length(self):
+        sentence_transformer = build_tiny_sentence_transformer()
+        encoder = LeanSentenceEncoder(sentence_transformer, "cpu")
+
+        sentence_transformer.max_seq_length = 8
+        short = encoder.encode([self.texts[-1]])
+        sentence_transformer.max_seq_length = 128
+
+        self.assertTrue(
+            torch.equal(
+                encode(sentence_transformer, self.texts[-1]),
+                encoder.encode([self.texts[-1]]),
+            )
+        )
+        self.assertFalse(torch.equal(short, encoder.encode([self.texts[-1]])))
+
+    def test_it_rejects_other_pooling_modes(self):
+        sentence_transformer = SentenceTransformer(
+            modules=[
+                self.sentence_transformer[0],
+                models.Pooling(32, "cls"),
+            ],
+            device="cpu",
+        )
+
+        with self.assertRaisesRegex(ValueError, "Only mean pooled"):
+            LeanSentenceEncoder(sentence_transformer, "cpu")
@@ -0,0 +1,139 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import torch
+
+from inference.mips_index import (
+    CandidatePrunedModel,
+    MipsIndex,
+    mips_index_exists,
+    write_mips_index,
+)
+from model.model import SimpleNN, pruned_logit
+from quantize_model import quantize_linear_layers
+
+
+def build_model(fc2_rank: int = 0) -> SimpleNN:
+    torch.manual_seed(0)
+
+    return SimpleNN(16, 32, 12, 0.1, 0.1, fc2_rank).eval()
+
+
+class TestMipsIndex(unittest.TestCase):
+    def setUp(self):
+        self.index_dir = Path(tempfile.mkdtemp())
+        # Row 0 and 1 point one way, rows 2 and 3 the other
+        write_mips_index(
+            self.index_dir,
+            np.array([[1.0, 0.0, 0.0], [0.0, 1.0, 0.5]], dtype=np.float32),
+            np.array([0, 1, 0, 1]),
+        )
+        self.index = MipsIndex(self.index_dir)
+
+    def test_it_writes_every_file(self):
+        self.assertTrue(mips_index_exists(self.index_dir))
+        self.assertFalse(mips_index_exists(Path(tempfile.mkdtemp())))
+
+    def test_it_takes_the_rows_of_the_best_scoring_cluster(self):
+        self.assertEqual(4, self.index.rows)
+        self.assertEqual(
+            [[0, 2], [1, 3]],
+            self.index.candidates(torch.tensor([[1.0, 0.0], [0.0, 1.0]]), 1).tolist(),
+        )
+
+    def test_it_takes_whole_clusters_until_there_are_enough_candidates(self):
+        self.assertEqual(
+            [[0, 2, 1, 3]],
+            self.index.candidates(torch.tensor([[1.0, 0.0]]), 3).tolist(),
+        )
+
+    def test_queries_needing_fewer_clusters_are_padded(self):
+        index_dir = Path(tempfile.mkdtemp())
+        # Cluster 0 has rows 0, 1 and 2, cluster 1 has row 3
+        write_mips_index(
+            index_dir,
+            np.array([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]], dtype=np.float32),
+            np.array([0, 0, 0, 1]),
+        )
+
+        self.assertEqual(
+            [[0, 1, 2, 4, 4, 4], [3, 4, 4, 0, 1, 2]],
+            MipsIndex(index_dir)
+            .candidates(torch.tensor([[1.0, 0.0], [0.0, 1.0]]), 2)
+            .tolist(),
+        )
+
+
+class TestCandidatePrunedModel(unittest.TestCase):
+    def build_index(
+        self, clusters: int, rows: int = 12, dimensions: int = 32
+    ) -> MipsIndex:
+        index_dir = Path(tempfile.mkdtemp())
+        # The centroids have the bias appended
+        write_mips_index(
+            index_dir,
+            np.random.default_rng(0)
+            .normal(size=(clusters, dimensions + 1))
+            .astype(np.float32),
+            np.arange(rows) % clusters,
+        )
+
+        return MipsIndex(index_dir)
+
+    def test_candidates_get_exact_logits_and_the_rest_are_pruned(self):
+        model = build_model()
+        pruned_model = CandidatePrunedModel(model, self.build_index(4), 3)
+        x = torch.randn(4, 16)
+
+        with torch.no_grad():
+            expected = model(x)
+            logits = pruned_model(x)
+            candidates = pruned_model.candidate_rows(model.hidden(x))
+
+        for row, row_candidates in enumerate(candidates):
+            self.assertEqual(3, len(row_candidates))
+            torch.testing.assert_close(
+                expected[row, row_candidates], logits[row, row_candidates]
+            )
+            self.assertEqual(
+                (12 - 3) * [pruned_logit],
+                [
+                    logits[row, i].item()
+                    for i in range(12)
+                    if i not in row_candidates.tolist()
+                ],
+            )
+
+    def test_every_candidate_means_full_recall(self):
+        pruned_model = CandidatePrunedModel(build_model(), self.build_index(4), 12)
+
+        self.assertEqual(1.0, pruned_model.recall(torch.randn(8, 16)))
+        self.assertLessEqual(
+            CandidatePrunedModel(build_model(), self.build_index(4), 1).recall(
+                torch.randn(8, 16), k=12
+            ),
+            0.25,
+        )
+
+    def test_it_prunes_low_rank_and_quantized_models(self):
+        x = torch.randn(4, 16)
+
+        # The quantized fc2 also quantizes its input, which dequantized rows don't
+        for model, dimensions, tolerance in [
+            (build_model(fc2_rank=4), 4, 1e-5),
+            (quantize_linear_layers(build_model()), 32, 0.05),
+        ]:
+            pruned_model = CandidatePrunedModel(
+                model, self.build_index(1, dimensions=dimensions), 12
+            )
+
+            with torch.no_grad():
+                torch.testing.assert_close(
+                    model(x), pruned_model(x), atol=tolerance, rtol=tolerance
+                )
+
+    def test_it_rejects_an_index_for_other_subheadings(self):
+        with self.assertRaisesRegex(ValueError, "built for 10 subheadings"):
+            CandidatePrunedModel(build_model(), self.build_index(2, rows=10), 3)
@@ -0,0 +1,62 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import torch
+
+from inference.ngram_classifier import (
+    NgramModel,
+    load_ngram_classifier,
+    ngram_classifier_exists,
+    ngram_ids,
+    write_ngram_classifier,
+)
+from tests.inference.test_flat_classifier import SUBHEADINGS
+
+
+class TestNgramIds(unittest.TestCase):
+    def test_it_hashes_the_words_and_their_character_ngrams(self):
+        # "cup" has the word itself plus <cu, cup, up> then <cup, cup> then <cup>
+        self.assertEqual(7, len(ngram_ids("cup", 1000)))
+        self.assertEqual(14, len(ngram_ids("cup cup", 1000)))
+
+    def test_it_is_stable_and_within_the_buckets(self):
+        ids = ngram_ids("cotton t-shirts", 97)
+
+        np.testing.assert_array_equal(ids, ngram_ids("cotton t-shirts", 97))
+        self.assertTrue(((ids >= 0) & (ids < 97)).all())
+
+    def test_it_has_no_ids_for_empty_text(self):
+        self.assertEqual(0, len(ngram_ids("  ", 1000)))
+
+
+class TestNgramClassifier(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        torch.manual_seed(0)
+        cls.model = NgramModel(1024, 8, len(SUBHEADINGS)).eval()
+        # Sharpen the logits so that the cut-off logic returns a handful of results
+        cls.model.fc.weight.data *= 50
+        cls.ngram_dir = Path(tempfile.mkdtemp())
+        write_ngram_classifier(cls.ngram_dir, cls.model)
+
+    def test_it_writes_every_file(self):
+        self.assertTrue(ngram_classifier_exists(self.ngram_dir))
+        self.assertFalse(ngram_classifier_exists(Path(tempfile.mkdtemp())))
+
+    def test_the_loaded_classifier_matches_the_model(self):
+        classifier = load_ngram_classifier(self.ngram_dir, SUBHEADINGS)
+        text = "cotton t-shirts"
+        ids = torch.from_numpy(ngram_ids(text, 1024))
+
+        with torch.no_grad():
+            expected = self.model(ids, torch.tensor([0]))[0].argmax().item()
+
+        results = classifier.classify(text, 5, 10)
+
+        self.assertEqual(SUBHEADINGS[expected], results[0].code)
+
+    def test_it_rejects_a_model_for_other_subheadings(self):
+        with self.assertRaisesRegex(ValueError, "outputs but there are"):
+            load_ngram_classifier(self.ngram_dir, SUBHEADINGS[:-1])
@@ -0,0 +1,65 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import torch
+
+from inference.onnx_backend import (
+    OnnxHead,
+    OnnxSentenceEncoder,
+    export_encoder,
+    export_head,
+    onnx_models_exist,
+    onnx_runtime_available,
+)
+from model.model import HierarchicalNN, SimpleNN
+from tests.inference.tiny_sentence_transformer import build_tiny_sentence_transformer
+
+
+@unittest.skipUnless(onnx_runtime_available(), "onnxruntime is not installed")
+class TestOnnxBackend(unittest.TestCase):
+    texts = ["trousers", "plenty kitchen towels with gold", "t-shirts"]
+
+    @classmethod
+    def setUpClass(cls):
+        cls.onnx_dir = Path(tempfile.mkdtemp())
+        cls.sentence_transformer = build_tiny_sentence_transformer()
+
+        torch.manual_seed(0)
+        cls.model = SimpleNN(32, 48, 20, 0.1, 0.1).eval()
+
+        export_encoder(cls.sentence_transformer, cls.onnx_dir)
+        export_head(cls.model, 32, cls.onnx_dir)
+
+    def test_exports_all_of_the_models(self):
+        self.assertTrue(onnx_models_exist(self.onnx_dir))
+
+    def test_encoder_matches_the_sentence_transformer(self):
+        expected = self.sentence_transformer.encode(
+            self.texts, convert_to_tensor=True, normalize_embeddings=True
+        )
+
+        actual = OnnxSentenceEncoder(self.onnx_dir).encode(self.texts)
+
+        torch.testing.assert_close(expected, actual, atol=1e-5, rtol=1e-4)
+
+    def test_head_matches_the_model(self):
+        embeddings = torch.nn.functional.normalize(torch.randn(4, 32), dim=1)
+
+        with torch.no_grad():
+            expected = self.model(embeddings)
+
+        actual = OnnxHead(self.onnx_dir)(embeddings)
+
+        torch.testing.assert_close(expected, actual, atol=1e-5, rtol=1e-4)
+
+
+class TestExportHead(unittest.TestCase):
+    def test_it_refuses_heads_that_pick_rows_in_python(self):
+        model = HierarchicalNN(32, 48, ["01011000", "01019000", "02011000"], 0.1, 0.1)
+
+        with tempfile.TemporaryDirectory() as onnx_dir:
+            with self.assertRaisesRegex(ValueError, "HierarchicalNN head can't be"):
+                export_head(model, 32, Path(onnx_dir))
+
+            self.assertFalse(onnx_models_exist(Path(onnx_dir)))
@@ -0,0 +1,53 @@
+import unittest
+
+import numpy as np
+from scipy.special import logsumexp
+
+from inference.infer import PrefixGroups
+
+SUBHEADINGS = [
+    "62046239",
+    "33041000",
+    "62046211",
+    "39241000",
+    "62034231",
+    "33049900",
+    "39269097",
+]
+
+
+class TestPrefixGroups(unittest.TestCase):
+    def test_codes_are_in_first_seen_order(self):
+        groups = PrefixGroups(SUBHEADINGS, 4)
+
+        self.assertEqual(
+            ["6204", "3304", "3924", "6203", "3926"], groups.codes.tolist()
+        )
+
+    def test_logsumexp_matches_per_group_logsumexp(self):
+        rng = np.random.default_rng(42)
+        logits = rng.normal(size=len(SUBHEADINGS)).astype(np.float32)
+
+        for digits in [2, 4, 6, 8]:
+            groups = PrefixGroups(SUBHEADINGS, digits)
+            expected = {}
+
+            for subheading, logit in zip(SUBHEADINGS, logits):
+                expected.setdefault(subheading[:digits], []).append(logit)
+
+            actual = dict(zip(groups.codes.tolist(), groups.logsumexp(logits)))
+
+            self.assertEqual(list(expected.keys()), list(actual.keys()))
+            for code, group_logits in expected.items():
+                self.assertAlmostEqual(logsumexp(group_logits), actual[code], places=5)
+
+    def test_logsumexp_aggregates_each_row_of_a_matrix(self):
+        rng = np.random.default_rng(7)
+        logits = rng.normal(size=(3, len(SUBHEADINGS))).astype(np.float32)
+        groups = PrefixGroups(SUBHEADINGS, 6)
+
+        actual = groups.logsumexp(logits)
+
+        self.assertEqual((3, len(groups)), actual.shape)
+        for row, row_logits in zip(actual, logits):
+            np.testing.assert_allclose(groups.logsumexp(row_logits), row, rtol=1e-6)
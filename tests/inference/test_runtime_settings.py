@@ -0,0 +1,57 @@
+import os
+import unittest
+from unittest import mock
+
+import torch
+
+from inference.runtime_settings import apply_runtime_settings, quantized_engines
+
+
+class TestRuntimeSettings(unittest.TestCase):
+    def setUp(self):
+        self.num_threads = torch.get_num_threads()
+        self.engine = torch.backends.quantized.engine
+
+    def tearDown(self):
+        torch.set_num_threads(self.num_threads)
+        torch.backends.quantized.engine = self.engine
+
+    def test_it_leaves_the_defaults_alone(self):
+        with mock.patch.dict(os.environ, {}, clear=True):
+            settings = apply_runtime_settings()
+
+        self.assertEqual(self.num_threads, settings["num_threads"])
+        self.assertEqual(
+            torch.get_num_interop_threads(), settings["num_interop_threads"]
+        )
+        self.assertEqual(self.engine, settings["quantized_engine"])
+        self.assertEqual("", settings["tokenizers_parallelism"])
+
+    def test_it_applies_the_settings(self):
+        engine = quantized_engines()[-1]
+
+        with mock.patch.dict(os.environ, {}, clear=True):
+            settings = apply_runtime_settings(
+                num_threads=1,
+                num_interop_threads=torch.get_num_interop_threads(),
+                quantized_engine=engine,
+                tokenizers_parallelism="false",
+            )
+
+            self.assertEqual("false", os.environ["TOKENIZERS_PARALLELISM"])
+
+        self.assertEqual(1, torch.get_num_threads())
+        self.assertEqual(engine, torch.backends.quantized.engine)
+        self.assertEqual(
+            {
+                "num_threads": 1,
+                "num_interop_threads": torch.get_num_interop_threads(),
+                "quantized_engine": engine,
+                "tokenizers_parallelism": "false",
+            },
+            settings,
+        )
+
+    def test_it_rejects_an_unsupported_quantized_engine(self):
+        with self.assertRaisesRegex(ValueError, "Unsupported quantized engine"):
+            apply_runtime_settings(quantized_engine="not-an-engine")
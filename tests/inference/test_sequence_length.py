@@ -0,0 +1,57 @@
+import logging
+import unittest
+
+from inference.sequence_length import (
+    log_truncation_report,
+    token_lengths,
+    truncation_report,
+)
+
+
+class WhitespaceTokenizer:
+    def __call__(
+        self, texts: list[str], add_special_tokens: bool = True, **_kwargs
+    ) -> dict:
+        special_tokens = 2 if add_special_tokens else 0
+
+        return {
+            "input_ids": [
+                list(range(len(text.split()) + special_tokens)) for text in texts
+            ]
+        }
+
+
+TEXTS = ["towel", "cotton t-shirts", "a very long description of some goods"]
+
+
+class TestSequenceLength(unittest.TestCase):
+    def test_token_lengths_include_the_special_tokens(self):
+        self.assertEqual(
+            [3, 4, 9],
+            token_lengths(WhitespaceTokenizer(), TEXTS, batch_size=2).tolist(),
+        )
+
+    def test_truncation_report(self):
+        report = truncation_report(WhitespaceTokenizer(), TEXTS, [3, 4, 16])
+
+        self.assertEqual(
+            [2, 1, 0], [report[length]["truncated"] for length in [3, 4, 16]]
+        )
+        self.assertAlmostEqual(100 / 3, report[4]["truncated_percent"])
+
+    def test_truncation_report_with_no_texts(self):
+        self.assertEqual(
+            {8: {"truncated": 0, "truncated_percent": 0.0}},
+            truncation_report(WhitespaceTokenizer(), [], [8]),
+        )
+
+    def test_log_truncation_report(self):
+        with self.assertLogs("test", level="INFO") as logs:
+            log_truncation_report(
+                logging.getLogger("test"), "texts", WhitespaceTokenizer(), TEXTS, [4]
+            )
+
+        self.assertIn(
+            "1 of 3 texts (33.33%) would be truncated at max_seq_length 4",
+            logs.output[0],
+        )
@@ -0,0 +1,66 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import torch
+
+from inference.static_encoder import (
+    StaticSentenceEncoder,
+    static_encoder_exists,
+    token_rows,
+    write_static_encoder,
+)
+from tests.inference.tiny_sentence_transformer import build_tiny_sentence_transformer
+
+
+class TestStaticSentenceEncoder(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tokenizer = build_tiny_sentence_transformer().tokenizer
+        cls.static_dir = Path(tempfile.mkdtemp())
+        cls.token_ids = np.array(
+            cls.tokenizer.convert_tokens_to_ids(["cotton", "shirts", "gold"])
+        )
+        cls.embeddings = np.array(
+            [[3.0, 0.0, 0.0], [0.0, 4.0, 0.0], [0.0, 0.0, 1.0]], dtype=np.float32
+        )
+        write_static_encoder(
+            cls.static_dir, cls.tokenizer, cls.token_ids, cls.embeddings
+        )
+        cls.encoder = StaticSentenceEncoder(cls.static_dir)
+
+    def test_it_writes_every_file(self):
+        self.assertTrue(static_encoder_exists(self.static_dir))
+        self.assertFalse(static_encoder_exists(Path(tempfile.mkdtemp())))
+
+    def test_it_embeds_the_normalised_mean_of_the_token_vectors(self):
+        embedding = self.encoder.encode_one("cotton shirts")
+
+        np.testing.assert_allclose([0.6, 0.8, 0.0], embedding, rtol=1e-6)
+
+    def test_it_skips_tokens_without_a_vector(self):
+        np.testing.assert_allclose(
+            self.encoder.encode_one("gold"),
+            self.encoder.encode_one("gold bread with water"),
+        )
+
+    def test_it_embeds_texts_without_known_tokens_as_zeros(self):
+        np.testing.assert_array_equal(np.zeros(3), self.encoder.encode_one("bread"))
+
+    def test_it_truncates_to_the_max_sequence_length(self):
+        encoder = StaticSentenceEncoder(self.static_dir)
+        encoder.max_seq_length = 1
+
+        np.testing.assert_allclose([1.0, 0.0, 0.0], encoder.encode_one("cotton gold"))
+
+    def test_encode_returns_a_row_per_text(self):
+        embeddings = self.encoder.encode(["cotton", "shirts"])
+
+        self.assertIsInstance(embeddings, torch.Tensor)
+        self.assertEqual((2, 3), tuple(embeddings.shape))
+
+    def test_token_rows_maps_token_ids_to_their_row(self):
+        np.testing.assert_array_equal(
+            [-1, 1, -1, 0, -1], token_rows(5, np.array([3, 1]))
+        )
@@ -0,0 +1,62 @@
+import tempfile
+from pathlib import Path
+
+import torch
+from sentence_transformers import SentenceTransformer, models
+from transformers import BertConfig, BertModel, BertTokenizerFast
+
+WORDS = [
+    "bread",
+    "cotton",
+    "cup",
+    "gold",
+    "kitchen",
+    "lipstick",
+    "mobile",
+    "phone",
+    "plenty",
+    "shirts",
+    "towel",
+    "towels",
+    "trousers",
+    "water",
+    "with",
+]
+CHARACTERS = list("abcdefghijklmnopqrstuvwxyz0123456789-")
+
+
+def build_tiny_sentence_transformer(
+    directory: Path | None = None, dimensions: int = 32
+) -> SentenceTransformer:
+    """
+    Builds a small, randomly initialised, mean pooled sentence transformer so that the encoder
+    paths can be tested without downloading a pretrained model.
+    """
+    directory = Path(directory or tempfile.mkdtemp())
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + WORDS + CHARACTERS
+    vocab += [f"##{character}" for character in CHARACTERS]
+    vocab_file = directory / "vocab.txt"
+    vocab_file.write_text("\n".join(vocab))
+
+    torch.manual_seed(0)
+    config = BertConfig(
+        vocab_size=len(vocab),
+        hidden_size=dimensions,
+        num_hidden_layers=2,
+        num_attention_heads=4,
+        intermediate_size=dimensions * 2,
+        max_position_embeddings=128,
+    )
+    BertModel(config).save_pretrained(directory / "transformer")
+    BertTokenizerFast(str(vocab_file), do_lower_case=True).save_pretrained(
+        directory / "transformer"
+    )
+
+    return SentenceTransformer(
+        modules=[
+            models.Transformer(str(directory / "transformer"), max_seq_length=64),
+            models.Pooling(dimensions, "mean"),
+            models.Normalize(),
+        ],
+        device="cpu",
+    )
@@ -0,0 +1,176 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import torch
+
+from model.bundle import ModelBundle
+from model.model import HierarchicalNN, SimpleNN
+
+CONFIG = {
+    "input_size": 16,
+    "hidden_size": 32,
+    "output_size": 8,
+    "dropout_layer_1_percentage": 0.1,
+    "dropout_layer_2_percentage": 0.1,
+}
+SUBHEADINGS = [f"01010{i}" for i in range(8)]
+
+
+def build_model() -> SimpleNN:
+    torch.manual_seed(0)
+    model = SimpleNN(
+        CONFIG["input_size"],
+        CONFIG["hidden_size"],
+        CONFIG["output_size"],
+        CONFIG["dropout_layer_1_percentage"],
+        CONFIG["dropout_layer_2_percentage"],
+    )
+    model.eval()
+
+    return model
+
+
+class TestModelBundle(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.bundle_file = Path(self.directory.name) / "model.bundle"
+        self.model = build_model()
+        self.embeddings = torch.randn(4, CONFIG["input_size"])
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_bundle(self, quantized: bool = False) -> ModelBundle:
+        ModelBundle.from_state_dict(
+            self.model.state_dict(),
+            CONFIG,
+            SUBHEADINGS,
+            quantized=quantized,
+            model_version="1.2.3",
+        ).write(self.bundle_file)
+
+        return ModelBundle.load(self.bundle_file)
+
+    def test_round_trips_the_header(self):
+        bundle = self.write_bundle()
+
+        self.assertEqual(CONFIG, bundle.config)
+        self.assertEqual(SUBHEADINGS, bundle.subheadings)
+        self.assertEqual("1.2.3", bundle.model_version)
+        self.assertFalse(bundle.quantized)
+        self.assertEqual(
+            SUBHEADINGS, ModelBundle.read_header(self.bundle_file)["subheadings"]
+        )
+
+    def test_fp32_model_matches_the_original(self):
+        model = self.write_bundle().build_model()
+
+        with torch.no_grad():
+            expected = self.model(self.embeddings)
+            actual = model(self.embeddings)
+
+        torch.testing.assert_close(expected, actual)
+
+    def test_fp32_weights_are_memory_mapped(self):
+        bundle = self.write_bundle()
+
+        for tensor in bundle.tensors.values():
+            self.assertIsInstance(tensor.base, np.memmap)
+
+    def test_int8_model_is_close_to_the_original(self):
+        bundle = self.write_bundle(quantized=True)
+        model = bundle.build_model()
+
+        self.assertTrue(bundle.quantized)
+        self.assertEqual(np.int8, bundle.tensors["fc2.weight"].dtype)
+
+        with torch.no_grad():
+            expected = self.model(self.embeddings)
+            actual = model(self.embeddings)
+
+        torch.testing.assert_close(expected, actual, atol=0.05, rtol=0.05)
+        self.assertTrue(
+            torch.equal(expected.argmax(dim=1), actual.argmax(dim=1)),
+        )
+
+    def test_low_rank_models_round_trip(self):
+        self.model = build_model().factorise_fc2(4)
+        config = {**CONFIG, "fc2_rank": 4}
+
+        for quantized in [False, True]:
+            ModelBundle.from_state_dict(
+                self.model.state_dict(), config, SUBHEADINGS, quantized=quantized
+            ).write(self.bundle_file)
+            model = ModelBundle.load(self.bundle_file).build_model()
+
+            with torch.no_grad():
+                expected = self.model(self.embeddings)
+                actual = model(self.embeddings)
+
+            torch.testing.assert_close(
+                expected,
+                actual,
+                atol=0.05 if quantized else 1e-5,
+                rtol=0.05 if quantized else 1e-5,
+            )
+
+    def test_hierarchical_models_round_trip(self):
+        subheadings = [
+            f"0{chapter}0{heading}10"
+            for chapter in range(1, 5)
+            for heading in range(1, 3)
+        ]
+        torch.manual_seed(0)
+        self.model = HierarchicalNN(
+            CONFIG["input_size"],
+            CONFIG["hidden_size"],
+            subheadings,
+            CONFIG["dropout_layer_1_percentage"],
+            CONFIG["dropout_layer_2_percentage"],
+        ).eval()
+        config = {**CONFIG, "architecture": "hierarchical"}
+
+        for quantized in [False, True]:
+            ModelBundle.from_state_dict(
+                self.model.state_dict(), config, subheadings, quantized=quantized
+            ).write(self.bundle_file)
+            model = ModelBundle.load(self.bundle_file).build_model()
+
+            self.assertIsInstance(model, HierarchicalNN)
+
+            # Quantized heads could prune differently so compare full scoring
+            self.model.top_headings = model.top_headings = 0
+
+            with torch.no_grad():
+                expected = self.model(self.embeddings)
+                actual = model(self.embeddings)
+
+            torch.testing.assert_close(
+                expected,
+                actual,
+                atol=0.05 if quantized else 1e-5,
+                rtol=0.05 if quantized else 1e-5,
+            )
+
+    def test_load_rejects_a_corrupted_bundle(self):
+        self.write_bundle()
+
+        with open(self.bundle_file, "r+b") as f:
+            f.seek(-1, 2)
+            last_byte = f.read(1)
+            f.seek(-1, 2)
+            f.write(bytes([last_byte[0] ^ 0xFF]))
+
+        with self.assertRaisesRegex(ValueError, "Checksum mismatch"):
+            ModelBundle.verify(self.bundle_file)
+
+        # Loading doesn't hash the tensors, so that the memory map isn't read up front
+        ModelBundle.load(self.bundle_file)
+
+    def test_load_rejects_a_file_that_is_not_a_bundle(self):
+        self.bundle_file.write_bytes(b"not a bundle")
+
+        with self.assertRaisesRegex(ValueError, "is not a model bundle"):
+            ModelBundle.load(self.bundle_file)
@@ -0,0 +1,156 @@
+import unittest
+
+import torch
+
+from model.model import HierarchicalNN, LowRankLinear, SimpleNN, pruned_logit
+
+# 3 chapters, 6 headings and 12 subheadings
+SUBHEADINGS = [
+    f"{chapter}{heading}{subheading}"
+    for chapter in ["01", "02", "03"]
+    for heading in ["01", "02"]
+    for subheading in ["10", "20"]
+]
+
+
+def build_model(fc2_rank: int = 0) -> SimpleNN:
+    torch.manual_seed(0)
+
+    return SimpleNN(16, 32, 64, 0.1, 0.1, fc2_rank).eval()
+
+
+def build_hierarchical_model(top_chapters: int, top_headings: int) -> HierarchicalNN:
+    torch.manual_seed(0)
+
+    return HierarchicalNN(
+        16, 32, SUBHEADINGS, 0.1, 0.1, top_chapters, top_headings
+    ).eval()
+
+
+class TestLowRankLinear(unittest.TestCase):
+    def test_a_full_rank_factorisation_matches_the_layer(self):
+        torch.manual_seed(0)
+        linear = torch.nn.Linear(16, 64)
+        x = torch.randn(4, 16)
+
+        with torch.no_grad():
+            torch.testing.assert_close(
+                linear(x), LowRankLinear.from_linear(linear, 16)(x)
+            )
+
+    def test_the_rank_is_capped_at_the_smallest_dimension(self):
+        self.assertEqual(
+            16, LowRankLinear.from_linear(torch.nn.Linear(16, 64), 32).rank
+        )
+
+    def test_lower_ranks_approximate_the_layer_less_closely(self):
+        torch.manual_seed(0)
+        linear = torch.nn.Linear(16, 64)
+        x = torch.randn(32, 16)
+
+        with torch.no_grad():
+            errors = [
+                (LowRankLinear.from_linear(linear, rank)(x) - linear(x)).norm().item()
+                for rank in [2, 8, 14]
+            ]
+
+        self.assertEqual(sorted(errors, reverse=True), errors)
+
+
+class TestSimpleNN(unittest.TestCase):
+    def test_fc2_is_dense_by_default(self):
+        model = build_model()
+
+        self.assertIsInstance(model.fc2, torch.nn.Linear)
+        self.assertEqual(0, model.fc2_rank)
+
+    def test_fc2_can_be_trained_factorised(self):
+        model = build_model(fc2_rank=8)
+
+        self.assertEqual(8, model.fc2_rank)
+        self.assertEqual((4, 64), tuple(model(torch.randn(4, 16)).shape))
+        self.assertEqual(
+            8 * (32 + 64) + 64, sum(p.numel() for p in model.fc2.parameters())
+        )
+
+    def test_factorise_fc2_replaces_a_dense_fc2(self):
+        model = build_model().factorise_fc2(8)
+
+        self.assertEqual(8, model.fc2_rank)
+
+        with self.assertRaisesRegex(ValueError, "Only a dense fc2"):
+            model.factorise_fc2(4)
+
+
+class TestHierarchicalNN(unittest.TestCase):
+    def test_it_derives_the_hierarchy_from_the_subheadings(self):
+        model = build_hierarchical_model(2, 2)
+
+        self.assertEqual(3, model.chapter_head.out_features)
+        self.assertEqual(6, model.heading_head.out_features)
+        self.assertEqual(
+            [0, 0, 1, 1, 2, 2, 3, 3, 4, 4, 5, 5], model.heading_of_subheading.tolist()
+        )
+        self.assertEqual([0, 0, 1, 1, 2, 2], model.chapter_of_heading.tolist())
+
+    def test_it_only_scores_the_subheadings_under_the_top_headings(self):
+        model = build_hierarchical_model(2, 2)
+        x = torch.randn(4, 16)
+
+        with torch.no_grad():
+            chapter_logits, heading_logits, all_logits = model.forward_all(x)
+            logits = model(x)
+
+        for row in range(len(x)):
+            top_chapters = chapter_logits[row].topk(2).indices.tolist()
+            candidate_headings = [
+                heading
+                for heading in range(6)
+                if model.chapter_of_heading[heading] in top_chapters
+            ]
+            top_headings = sorted(
+                candidate_headings, key=lambda heading: -heading_logits[row, heading]
+            )[:2]
+            scored = [
+                model.heading_of_subheading[subheading] in top_headings
+                for subheading in range(len(SUBHEADINGS))
+            ]
+
+            self.assertEqual(4, sum(scored))
+
+            for subheading, is_scored in enumerate(scored):
+                self.assertAlmostEqual(
+                    all_logits[row, subheading].item() if is_scored else pruned_logit,
+                    logits[row, subheading].item(),
+                    places=5,
+                )
+
+    def test_a_top_of_zero_scores_every_subheading(self):
+        model = build_hierarchical_model(0, 0)
+        x = torch.randn(4, 16)
+
+        with torch.no_grad():
+            torch.testing.assert_close(model.forward_all(x)[2], model(x))
+
+    def test_headings_with_different_numbers_of_subheadings_are_scored(self):
+        subheadings = ["01011000", "01012000", "01013000", "01020000", "02010000"]
+        torch.manual_seed(0)
+        # Fewer headings in the top chapter than top_headings
+        model = HierarchicalNN(16, 32, subheadings, 0.1, 0.1, 1, 3).eval()
+        x = torch.randn(4, 16)
+
+        with torch.no_grad():
+            chapter_logits, _heading_logits, all_logits = model.forward_all(x)
+            logits = model(x)
+
+        for row in range(len(x)):
+            top_chapter = chapter_logits[row].argmax().item()
+
+            for subheading in range(len(subheadings)):
+                self.assertAlmostEqual(
+                    all_logits[row, subheading].item()
+                    if model.chapter_of_subheading[subheading] == top_chapter
+                    else pruned_logit,
+                    logits[row, subheading].item(),
+                    places=5,
+                )
@@ -0,0 +1,39 @@
+import unittest
+
+import toml
+
+from autotune import set_config_values
+
+CONFIG = """# Shared settings
+transformer = "all-mpnet-base-v2"
+torch_num_threads = 0  # autotuned
+warm_up_queries = [ "bananas",]
+torch_quantized_engine = ""
+"""
+
+
+class TestSetConfigValues(unittest.TestCase):
+    def test_it_only_changes_the_lines_of_the_keys(self):
+        self.assertEqual(
+            """# Shared settings
+transformer = "all-mpnet-base-v2"
+torch_num_threads = 4
+warm_up_queries = [ "bananas",]
+torch_quantized_engine = "fbgemm"
+""",
+            set_config_values(
+                CONFIG, {"torch_num_threads": 4, "torch_quantized_engine": "fbgemm"}
+            ),
+        )
+
+    def test_it_appends_missing_keys(self):
+        config_text = set_config_values(CONFIG, {"tokenizers_parallelism": "false"})
+
+        self.assertTrue(config_text.startswith(CONFIG))
+        self.assertEqual("false", toml.loads(config_text)["tokenizers_parallelism"])
+
+    def test_it_does_not_change_keys_that_only_share_a_prefix(self):
+        config_text = set_config_values(CONFIG, {"torch_num": 1})
+
+        self.assertEqual(0, toml.loads(config_text)["torch_num_threads"])
+        self.assertEqual(1, toml.loads(config_text)["torch_num"])
@@ -0,0 +1,19 @@
+import unittest
+
+from train_args import LazyConfig, TrainScriptArgsParser, args, shared_config
+
+
+class TestSharedConfig(unittest.TestCase):
+    def test_it_is_built_once(self):
+        self.assertIs(shared_config(), shared_config())
+        self.assertIsInstance(shared_config(), TrainScriptArgsParser)
+
+    def test_it_reads_search_config(self):
+        self.assertEqual(
+            "all-mpnet-base-v2", shared_config().parsed_config["transformer"]
+        )
+
+    def test_lazy_config_delegates_to_the_shared_config(self):
+        self.assertIsInstance(args, LazyConfig)
+        self.assertEqual(shared_config().transformer(), args.transformer())
+        self.assertEqual(shared_config().target_dir(), args.target_dir())
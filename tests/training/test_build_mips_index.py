@@ -0,0 +1,41 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import torch
+
+from inference.mips_index import CandidatePrunedModel, MipsIndex, write_mips_index
+from model.model import SimpleNN
+from training.build_mips_index import MipsIndexBuilder
+
+
+class TestMipsIndexBuilder(unittest.TestCase):
+    def setUp(self):
+        torch.manual_seed(0)
+        self.model = SimpleNN(16, 32, 64, 0.1, 0.1).eval()
+        args = MagicMock()
+        args.fc2_index_clusters.return_value = 8
+        self.centroids, self.assignments = MipsIndexBuilder(args).run(self.model)
+
+    def test_it_assigns_every_row_to_a_cluster(self):
+        self.assertEqual((8, 33), self.centroids.shape)
+        self.assertEqual((64,), self.assignments.shape)
+        self.assertTrue(((self.assignments >= 0) & (self.assignments < 8)).all())
+
+    def test_centroids_are_the_mean_of_their_rows(self):
+        rows = torch.cat([self.model.fc2.weight, self.model.fc2.bias[:, None]], dim=1)
+        cluster = self.assignments[0]
+
+        torch.testing.assert_close(
+            rows[torch.from_numpy(self.assignments == cluster)].mean(dim=0),
+            torch.from_numpy(self.centroids[cluster]),
+        )
+
+    def test_the_index_recalls_more_than_chance(self):
+        index_dir = Path(tempfile.mkdtemp())
+        write_mips_index(index_dir, self.centroids, self.assignments)
+        pruned_model = CandidatePrunedModel(self.model, MipsIndex(index_dir), 16)
+
+        # 16 of 64 candidates would recall a quarter of the top results by chance
+        self.assertGreater(pruned_model.recall(torch.randn(64, 16)), 0.25)
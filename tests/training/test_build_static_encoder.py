@@ -0,0 +1,78 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import numpy as np
+import torch
+
+from inference.static_encoder import StaticSentenceEncoder, write_static_encoder
+from tests.inference.tiny_sentence_transformer import build_tiny_sentence_transformer
+from training.build_static_encoder import StaticEncoderBuilder
+from training.create_embeddings import EmbeddingsProcessor
+
+
+def builder_args(max_epochs: int) -> MagicMock:
+    args = MagicMock()
+    args.torch_device.return_value = "cpu"
+    args.static_encoder_max_epochs.return_value = max_epochs
+    args.static_encoder_learning_rate.return_value = 1e-2
+    args.model_batch_size.return_value = 4
+
+    return args
+
+
+class TestStaticEncoderBuilder(unittest.TestCase):
+    texts = [
+        "cotton shirts",
+        "kitchen towels",
+        "gold lipstick",
+        "mobile phone",
+        "bread",
+        "water cup",
+        "trousers with gold",
+        "plenty towels",
+    ]
+
+    @classmethod
+    def setUpClass(cls):
+        transformer_dir = Path(tempfile.mkdtemp())
+        build_tiny_sentence_transformer().save(str(transformer_dir))
+        cls.embeddings_processor = EmbeddingsProcessor(str(transformer_dir))
+        cls.teacher_embeddings = cls.embeddings_processor.create_embeddings(cls.texts)
+
+    def build(self, max_epochs: int) -> StaticSentenceEncoder:
+        torch.manual_seed(0)
+        token_ids, embeddings = StaticEncoderBuilder(builder_args(max_epochs)).run(
+            self.texts, self.teacher_embeddings, self.embeddings_processor
+        )
+        static_dir = Path(tempfile.mkdtemp())
+        write_static_encoder(
+            static_dir, self.embeddings_processor.tokenizer, token_ids, embeddings
+        )
+
+        return StaticSentenceEncoder(static_dir)
+
+    def loss(self, encoder: StaticSentenceEncoder) -> float:
+        return torch.nn.functional.mse_loss(
+            encoder.encode(self.texts), self.teacher_embeddings
+        ).item()
+
+    def test_the_vocabulary_is_the_tokens_in_the_training_descriptions(self):
+        encoder = self.build(max_epochs=0)
+        tokenizer = self.embeddings_processor.tokenizer
+        tokens = {token for text in self.texts for token in tokenizer.tokenize(text)}
+
+        self.assertEqual((len(tokens), 32), encoder.embeddings.shape)
+
+    def test_untrained_tokens_are_the_transformers_embedding_of_the_token(self):
+        encoder = self.build(max_epochs=0)
+
+        np.testing.assert_allclose(
+            self.embeddings_processor.create_embeddings(["bread"])[0].numpy(),
+            encoder.encode_one("bread"),
+            atol=1e-6,
+        )
+
+    def test_training_reduces_the_loss_against_the_transformer(self):
+        self.assertLess(self.loss(self.build(max_epochs=20)), self.loss(self.build(0)))
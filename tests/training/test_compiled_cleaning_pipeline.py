@@ -0,0 +1,187 @@
+import unittest
+
+from tests.training import (
+    test_description_lower,
+    test_incorrect_pairs_remover,
+    test_language_cleaning,
+    test_map_2024_to_2025_codes,
+    test_map_2025_to_2026_codes,
+    test_negation_cleaning,
+    test_pad_codes,
+    test_phrase_remover,
+    test_plural_cleaning,
+    test_remove_descriptions_matching_regexes,
+    test_remove_empty_description,
+    test_remove_short_description,
+    test_remove_subheadings_not_matching_regexes,
+    test_strip_excess_characters,
+)
+from training.cleaning_pipeline import (
+    CleaningPipeline,
+    CompiledCleaningPipeline,
+    DescriptionLower,
+    NegationCleaning,
+    PluralCleaning,
+    RemoveDescriptionsMatchingRegexes,
+    RemoveShortDescription,
+    StripExcessCharacters,
+)
+
+# The inputs of the examples each cleaner's own tests use, as (subheading, description) pairs
+CLEANER_EXAMPLES = [
+    (module.filter, [example for example, _expected in examples])
+    for module, examples in [
+        (test_description_lower, test_description_lower.TestDescriptionLower.EXAMPLES),
+        (
+            test_incorrect_pairs_remover,
+            test_incorrect_pairs_remover.TestIncorrectPairsRemover.EXAMPLES,
+        ),
+        (
+            test_map_2024_to_2025_codes,
+            test_map_2024_to_2025_codes.TestMap2024To2025Codes.EXAMPLES,
+        ),
+        (
+            test_map_2025_to_2026_codes,
+            test_map_2025_to_2026_codes.TestMap2025To2026Codes.EXAMPLES,
+        ),
+        (test_phrase_remover, test_phrase_remover.TestPhraseRemover.EXAMPLES),
+        (test_plural_cleaning, test_plural_cleaning.TestPluralCleaning.EXAMPLES),
+        (
+            test_remove_descriptions_matching_regexes,
+            test_remove_descriptions_matching_regexes.TestRemoveDescriptionsMatchingRegexes.EXAMPLES,
+        ),
+        (
+            test_remove_empty_description,
+            test_remove_empty_description.TestRemoveEmptyDescription.EXAMPLES,
+        ),
+        (
+            test_remove_short_description,
+            test_remove_short_description.TestRemoveShortDescription.EXAMPLES,
+        ),
+        (
+            test_remove_subheadings_not_matching_regexes,
+            test_remove_subheadings_not_matching_regexes.TestRemoveSubheadingsNotMatchingRegexes.EXAMPLES,
+        ),
+        (
+            test_strip_excess_characters,
+            test_strip_excess_characters.TestStripExcessCharacters.EXAMPLES,
+        ),
+    ]
+] + [
+    (
+        test_language_cleaning.filter,
+        [
+            ("subheading", example)
+            for example, _expected in test_language_cleaning.TestLanguageCleaning.EXAMPLES
+        ],
+    ),
+    (
+        test_negation_cleaning.filter,
+        [
+            ("subheading", example)
+            for example, _expected in test_negation_cleaning.TestNegationCleaning.EXAMPLES
+        ],
+    ),
+    (
+        test_pad_codes.filter,
+        [
+            (example, "irrelevant")
+            for example, _expected in test_pad_codes.TestPadCodes.EXAMPLES
+        ],
+    ),
+]
+
+DESCRIPTIONS = [
+    "  Mens  S Shirts, size  s.,",
+    "women s trousers (excluding shorts)",
+    "tomatoes, other than monster beef tomatoes",
+    "tomatoes not cherry",
+    "size_placeholder s",
+    "5234-5234",
+    "\\d12",
+    "12 34",
+    "ab",
+    "   ",
+    "",
+]
+
+
+class TestCompiledCleaningPipeline(unittest.TestCase):
+    def test_each_cleaner_matches_the_interpreted_cleaner(self):
+        for cleaner, examples in CLEANER_EXAMPLES:
+            compiled = CleaningPipeline([cleaner]).compile()
+
+            for subheading, description in examples:
+                with self.subTest(
+                    cleaner=cleaner.__class__.__name__, example=description
+                ):
+                    expected_subheading, expected_description, _meta = cleaner.filter(
+                        subheading, description
+                    )
+                    actual_subheading, actual_description, _meta = compiled.filter(
+                        subheading, description
+                    )
+
+                    self.assertEqual(expected_subheading, actual_subheading)
+                    self.assertEqual(expected_description, actual_description)
+
+    def test_a_pipeline_matches_the_interpreted_pipeline(self):
+        cleaners = [
+            StripExcessCharacters(),
+            DescriptionLower(),
+            PluralCleaning(),
+            NegationCleaning.build(),
+            RemoveShortDescription(min_length=2),
+            RemoveDescriptionsMatchingRegexes.build(),
+        ]
+        pipeline = CleaningPipeline(cleaners)
+        compiled = pipeline.compile()
+
+        for description in DESCRIPTIONS:
+            with self.subTest(description=description):
+                self.assertEqual(
+                    pipeline.filter("010101", description)[:2],
+                    compiled("010101", description)[:2],
+                )
+
+    def test_rejections_carry_the_reason(self):
+        compiled = CleaningPipeline([RemoveShortDescription(min_length=4)]).compile()
+
+        self.assertEqual(
+            (None, None, {"RemoveShortDescription": {"reason": "Short description"}}),
+            compiled.filter("01010100", "ab"),
+        )
+        self.assertEqual(
+            ("01010100", "abcdef", {}), compiled.filter("01010100", "abcdef")
+        )
+
+    def test_it_builds_the_full_meta_when_asked_to(self):
+        cleaners = [test_pad_codes.filter, RemoveShortDescription(min_length=4)]
+        compiled = CleaningPipeline(cleaners, return_meta=True).compile()
+
+        self.assertIsInstance(compiled, CompiledCleaningPipeline)
+        self.assertEqual(
+            CleaningPipeline(cleaners, return_meta=True).filter("010101", "shirts"),
+            compiled.filter("010101", "shirts"),
+        )
+
+    def test_filter_batch_matches_filter(self):
+        cleaners = [
+            StripExcessCharacters(),
+            DescriptionLower(),
+            test_language_cleaning.filter,
+            PluralCleaning(),
+            NegationCleaning.build(),
+            RemoveShortDescription(min_length=2),
+            RemoveDescriptionsMatchingRegexes.build(),
+        ]
+        pipeline = CleaningPipeline(cleaners)
+        descriptions = DESCRIPTIONS + ["deutsch", "something kinder", "faux fur"]
+
+        self.assertEqual(
+            [
+                pipeline.compile().filter("010101", description)
+                for description in descriptions
+            ],
+            pipeline.filter_batch(["010101"] * len(descriptions), descriptions),
+        )
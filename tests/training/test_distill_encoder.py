@@ -0,0 +1,93 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import torch
+
+from inference.infer import LeanSentenceEncoder
+from tests.inference.tiny_sentence_transformer import build_tiny_sentence_transformer
+from training.distill_encoder import StudentEncoderDistiller
+
+
+def distiller_args(student_transformer: str, max_epochs: int) -> MagicMock:
+    args = MagicMock()
+    args.torch_device.return_value = "cpu"
+    args.student_transformer.return_value = student_transformer
+    args.student_max_epochs.return_value = max_epochs
+    args.student_learning_rate.return_value = 1e-3
+    args.embedding_batch_size.return_value = 4
+    args.max_seq_length.return_value = 0
+
+    return args
+
+
+class TestStudentEncoderDistiller(unittest.TestCase):
+    texts = [
+        "cotton shirts",
+        "kitchen towels",
+        "gold lipstick",
+        "mobile phone",
+        "bread",
+        "water cup",
+        "trousers with gold",
+        "plenty towels",
+    ]
+
+    @classmethod
+    def setUpClass(cls):
+        cls.teacher = build_tiny_sentence_transformer(dimensions=32)
+        cls.teacher_embeddings = cls.teacher.encode(
+            cls.texts, convert_to_tensor=True, normalize_embeddings=True
+        )
+        cls.student_dir = Path(tempfile.mkdtemp())
+        build_tiny_sentence_transformer(cls.student_dir, dimensions=16)
+
+    def distil(self, max_epochs: int):
+        torch.manual_seed(0)
+
+        return StudentEncoderDistiller(
+            distiller_args(str(self.student_dir / "transformer"), max_epochs)
+        ).run(self.texts, self.teacher_embeddings)
+
+    def distillation_loss(self, student) -> float:
+        embeddings = student.encode(
+            self.texts, convert_to_tensor=True, normalize_embeddings=True
+        )
+
+        return torch.nn.functional.mse_loss(embeddings, self.teacher_embeddings).item()
+
+    def test_the_student_is_projected_to_the_teacher_dimensions(self):
+        student = self.distil(max_epochs=1)
+
+        self.assertEqual(32, student.get_embedding_dimension())
+        self.assertEqual(
+            (len(self.texts), 32),
+            tuple(student.encode(self.texts, convert_to_tensor=True).shape),
+        )
+
+    def test_distilling_reduces_the_loss_against_the_teacher(self):
+        untrained = self.distil(max_epochs=0)
+        trained = self.distil(max_epochs=20)
+
+        self.assertLess(
+            self.distillation_loss(trained), self.distillation_loss(untrained)
+        )
+
+    def test_the_student_can_be_encoded_with_the_lean_encoder(self):
+        student = self.distil(max_epochs=1)
+        encoder = LeanSentenceEncoder(student, "cpu")
+
+        for text in self.texts:
+            self.assertTrue(
+                torch.equal(
+                    student.encode(
+                        [text],
+                        convert_to_tensor=True,
+                        device="cpu",
+                        show_progress_bar=False,
+                        normalize_embeddings=True,
+                    ),
+                    encoder.encode([text]),
+                )
+            )
@@ -0,0 +1,110 @@
+import unittest
+
+import numpy as np
+
+from tests.training import test_language_cleaning, test_pad_codes
+from tests.training.test_compiled_cleaning_pipeline import (
+    CLEANER_EXAMPLES,
+    DESCRIPTIONS,
+)
+from training.cleaning_pipeline import (
+    CleaningPipeline,
+    DescriptionLower,
+    Map2025CodesTo2026Codes,
+    NegationCleaning,
+    PluralCleaning,
+    RemoveDescriptionsMatchingRegexes,
+    RemoveShortDescription,
+    RemoveSubheadingsNotMatchingRegexes,
+    StripExcessCharacters,
+)
+
+
+def filter_rows(pipeline: CleaningPipeline, rows: list[tuple[str, str]]):
+    cleaned = pipeline.filter_many(
+        [subheading for subheading, _description in rows],
+        [description for _subheading, description in rows],
+    )
+
+    return [
+        (subheading, description, {rejected_by: {"reason": reason}} if reason else {})
+        if keep
+        else (None, None, {rejected_by: {"reason": reason}} if reason else {})
+        for keep, subheading, description, rejected_by, reason in zip(
+            cleaned.keep.tolist(),
+            cleaned.subheadings.tolist(),
+            cleaned.descriptions.tolist(),
+            cleaned.rejected_by.tolist(),
+            cleaned.reasons.tolist(),
+        )
+    ]
+
+
+class TestFilterMany(unittest.TestCase):
+    def test_each_cleaner_matches_the_compiled_cleaner(self):
+        for cleaner, examples in CLEANER_EXAMPLES:
+            # String columns can't hold a missing description
+            examples = [example for example in examples if example[1] is not None]
+            pipeline = CleaningPipeline([cleaner])
+            compiled = pipeline.compile()
+
+            with self.subTest(cleaner=cleaner.__class__.__name__):
+                self.assertEqual(
+                    [compiled.filter(*example) for example in examples],
+                    filter_rows(pipeline, examples),
+                )
+
+    def test_a_pipeline_matches_the_compiled_pipeline(self):
+        pipeline = CleaningPipeline(
+            [
+                test_pad_codes.filter,
+                StripExcessCharacters(),
+                DescriptionLower(),
+                RemoveSubheadingsNotMatchingRegexes(regexes=[r"^\d{8}$"]),
+                Map2025CodesTo2026Codes.build(),
+                test_language_cleaning.filter,
+                PluralCleaning(),
+                NegationCleaning.build(),
+                RemoveShortDescription(min_length=2),
+                RemoveDescriptionsMatchingRegexes.build(),
+            ]
+        )
+        rows = [
+            (subheading, description)
+            for subheading in ["010101", "28419085", "0101", " 12345678. "]
+            for description in DESCRIPTIONS + ["deutsch", "faux fur", "Mens\xa0SHIRTS"]
+        ]
+        compiled = pipeline.compile()
+
+        self.assertEqual(
+            [compiled.filter(*row) for row in rows], filter_rows(pipeline, rows)
+        )
+
+    def test_it_returns_a_keep_mask_the_cleaned_columns_and_the_reasons(self):
+        pipeline = CleaningPipeline(
+            [DescriptionLower(), RemoveShortDescription(min_length=4)]
+        )
+
+        cleaned = pipeline.filter_many(
+            np.array(["01010100", "02020200"]), ["Cotton SHIRTS", "ab"]
+        )
+
+        self.assertEqual([True, False], cleaned.keep.tolist())
+        self.assertEqual(["01010100", ""], cleaned.subheadings.tolist())
+        self.assertEqual(["cotton shirts", ""], cleaned.descriptions.tolist())
+        self.assertEqual(["", "RemoveShortDescription"], cleaned.rejected_by.tolist())
+        self.assertEqual(["", "Short description"], cleaned.reasons.tolist())
+
+    def test_it_takes_empty_columns(self):
+        cleaned = CleaningPipeline([DescriptionLower()]).filter_many([], [])
+
+        self.assertEqual(0, len(cleaned.keep))
+
+    def test_repeated_rows_each_get_the_result(self):
+        pipeline = CleaningPipeline([RemoveShortDescription(min_length=4)])
+        rows = [("01010100", "shirts"), ("01010100", "ab")] * 3
+
+        self.assertEqual(
+            [pipeline.compile().filter(*row) for row in rows],
+            filter_rows(pipeline, rows),
+        )
@@ -57,3 +57,52 @@ class TestLanguageCleaning(unittest.TestCase):
         for example, expected in TestLanguageCleaning.EXAMPLES:
             _, actual, _meta = filter.filter("subheading", example) or (None, None, {})
             self.assertEqual(actual, expected)
+
+    def test_the_term_lists_decide_before_detecting_the_language(self):
+        cleaner = LanguageCleaning(
+            detected_languages=args.detected_languages(),
+            preferred_languages=args.preferred_languages(),
+            partial_skips=language_skips,
+            partial_keeps=language_keeps,
+            exact_keeps=language_keeps_exact,
+        )
+
+        cleaner.filter("subheading", "pendant")
+        cleaner.filter("subheading", "something kinder")
+
+        self.assertEqual(0.0, cleaner.detection_ms)
+
+        cleaner.filter("subheading", "deutsch")
+
+        self.assertGreater(cleaner.detection_ms, 0.0)
+
+    def test_detected_languages_are_cached_by_description(self):
+        cleaner = LanguageCleaning(
+            detected_languages=args.detected_languages(),
+            preferred_languages=args.preferred_languages(),
+            partial_skips=language_skips,
+            partial_keeps=language_keeps,
+            exact_keeps=language_keeps_exact,
+            preload_models=True,
+        )
+
+        first = cleaner.filter("subheading", "francais")
+        second = cleaner.filter("subheading", "francais")
+
+        self.assertEqual(first, second)
+        self.assertEqual(1, cleaner._detect_language_of.cache_info().hits)
+
+    def test_filter_batch_matches_filter(self):
+        descriptions = [example for example, _expected in TestLanguageCleaning.EXAMPLES]
+        # Repeats are only detected once but still get a result each
+        descriptions += descriptions
+
+        expected = [
+            (subheading, description, meta.get("reason"))
+            for subheading, description, meta in (
+                filter.filter("subheading", description) for description in descriptions
+            )
+        ]
+        actual = filter.filter_batch(["subheading"] * len(descriptions), descriptions)
+
+        self.assertEqual(expected, actual)
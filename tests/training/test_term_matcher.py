@@ -0,0 +1,29 @@
+import unittest
+
+from training.cleaning_pipeline import TermMatcher
+
+
+class TestTermMatcher(unittest.TestCase):
+    matcher = TermMatcher(["kinder", "(iso)", " iso", "kind", "ssd"])
+
+    def test_it_matches_any_term_anywhere_in_the_text(self):
+        self.assertTrue(self.matcher.matches("kinder schokolade"))
+        self.assertTrue(self.matcher.matches("a kind gift"))
+        self.assertTrue(self.matcher.matches("valve (iso)"))
+        self.assertTrue(self.matcher.matches("sata ssd"))
+        self.assertFalse(self.matcher.matches("iso valve"))
+        self.assertFalse(self.matcher.matches("kin"))
+
+    def test_regex_characters_are_literal(self):
+        self.assertFalse(self.matcher.matches("valve xisox"))
+
+    def test_first_returns_the_first_term_in_order(self):
+        self.assertEqual("kinder", self.matcher.first("kinder iso"))
+        self.assertEqual(" iso", self.matcher.first("a iso kind"))
+        self.assertIsNone(self.matcher.first("cotton shirts"))
+
+    def test_no_terms_never_match(self):
+        self.assertFalse(TermMatcher([]).matches("anything"))
+
+    def test_an_empty_term_matches_everything(self):
+        self.assertEqual("", TermMatcher(["x", ""]).first("anything"))
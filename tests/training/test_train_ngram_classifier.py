@@ -0,0 +1,38 @@
+import unittest
+from unittest.mock import MagicMock
+
+import torch
+
+from inference.ngram_classifier import ngram_ids
+from training.train_ngram_classifier import NgramClassifierTrainer
+
+
+def trainer_args() -> MagicMock:
+    args = MagicMock()
+    args.torch_device.return_value = "cpu"
+    args.ngram_max_epochs.return_value = 30
+    args.ngram_learning_rate.return_value = 5e-2
+    args.model_batch_size.return_value = 4
+    args.ngram_buckets.return_value = 4096
+    args.ngram_dimensions.return_value = 8
+
+    return args
+
+
+class TestNgramClassifierTrainer(unittest.TestCase):
+    def test_it_learns_the_training_data(self):
+        texts = ["cotton shirts", "kitchen towels", "gold lipstick", "bananas"]
+        text_indexes = [0, 1, 2, 3, 0, 3]
+        labels = torch.tensor([0, 1, 2, 3, 0, 3])
+
+        torch.manual_seed(0)
+        model = NgramClassifierTrainer(trainer_args()).run(
+            texts, text_indexes, labels, 4
+        )
+
+        with torch.no_grad():
+            for label, text in enumerate(texts):
+                ids = torch.from_numpy(ngram_ids(text, 4096))
+                self.assertEqual(
+                    label, model(ids, torch.tensor([0]))[0].argmax().item()
+                )
@@ -11,7 +11,23 @@ if __name__ == "__main__":
     from data_sources.data_source import DataSource
     from data_sources.search_references import SearchReferencesDataSource
     from data_sources.vague_terms import VagueTermsCSVDataSource
+    from inference.mips_index import (
+        CandidatePrunedModel,
+        MipsIndex,
+        write_mips_index,
+    )
+    from inference.ngram_classifier import write_ngram_classifier
+    from inference.sequence_length import (
+        candidate_max_seq_lengths,
+        log_truncation_report,
+    )
+    from inference.static_encoder import StaticSentenceEncoder, write_static_encoder
+    from model.bundle import ModelBundle
+    from model.model import SimpleNN, build_model
+    from quantize_model import model_version
     from train_args import TrainScriptArgsParser
+    from training.build_mips_index import MipsIndexBuilder
+    from training.build_static_encoder import StaticEncoderBuilder
     from training.cleaning_pipeline import (
         CleaningPipeline,
         DescriptionLower,
@@ -30,8 +46,10 @@ if __name__ == "__main__":
         StripExcessCharacters,
     )
     from training.create_embeddings import EmbeddingsProcessor
+    from training.distill_encoder import StudentEncoderDistiller
     from training.prepare_data import TrainingDataLoader
     from training.train_model import FlatClassifierModelTrainer
+    from training.train_ngram_classifier import NgramClassifierTrainer
 
     args = TrainScriptArgsParser()
     args.print()
@@ -199,6 +217,18 @@ if __name__ == "__main__":
         transformer_model=args.transformer(),
         torch_device=args.torch_device(),
         batch_size=args.embedding_batch_size(),
+        max_seq_length=args.max_seq_length(),
+    )
+
+    logger.info(
+        f"Embedding with a max_seq_length of {embeddings_processor.max_seq_length}"
+    )
+    log_truncation_report(
+        logger,
+        "training descriptions",
+        embeddings_processor.tokenizer,
+        unique_text_values,
+        sorted(set(candidate_max_seq_lengths) | {embeddings_processor.max_seq_length}),
     )
 
     unique_embeddings = embeddings_processor.create_embeddings(unique_text_values)
@@ -212,23 +242,197 @@ if __name__ == "__main__":
     embeddings = torch.stack([unique_embeddings[idx] for idx in text_indexes])
 
     state_dict, input_size, hidden_size, output_size = trainer.run(
-        embeddings, labels, len(subheadings)
+        embeddings, labels, len(subheadings), subheadings
     )
 
+    architecture = "hierarchical" if args.hierarchical_head() else "flat"
+    # The hierarchical head's output layer is always dense
+    trained_fc2_rank = 0 if args.hierarchical_head() else args.fc2_rank()
+    fc2_rank = trained_fc2_rank
+
+    if args.fc2_svd_rank() > 0 and args.hierarchical_head():
+        logger.warning("fc2_svd_rank is ignored by the hierarchical head")
+    elif args.fc2_svd_rank() > 0:
+        model = SimpleNN(
+            input_size,
+            hidden_size,
+            output_size,
+            args.model_dropout_layer_1_percentage(),
+            args.model_dropout_layer_2_percentage(),
+            fc2_rank,
+        )
+        model.load_state_dict(state_dict)
+        fc2_parameters = sum(p.numel() for p in model.fc2.parameters())
+
+        model.factorise_fc2(args.fc2_svd_rank())
+
+        logger.info(
+            f"Factorised fc2 at rank {model.fc2_rank}: {fc2_parameters} parameters down to {sum(p.numel() for p in model.fc2.parameters())}"
+        )
+
+        state_dict = model.state_dict()
+        fc2_rank = model.fc2_rank
+
     logger.info("💾⇦ Saving model")
 
     model_file = target_dir / "model.pt"
     torch.save(state_dict, model_file)
 
     model_config = {
+        "architecture": architecture,
         "input_size": input_size,
         "hidden_size": hidden_size,
         "output_size": output_size,
         "dropout_layer_1_percentage": args.model_dropout_layer_1_percentage(),
         "dropout_layer_2_percentage": args.model_dropout_layer_2_percentage(),
+        "fc2_rank": fc2_rank,
     }
 
     with open("target/model.toml", "w") as f:
         toml.dump(model_config, f)
 
+    logger.info("💾⇦ Saving model bundle")
+
+    ModelBundle.from_state_dict(
+        state_dict,
+        model_config,
+        subheadings,
+        model_version=model_version(),
+    ).write(target_dir / "model.bundle")
+
+    if args.build_fc2_index() and args.hierarchical_head():
+        logger.warning("The fc2 index is only built for the flat model")
+    elif args.build_fc2_index():
+        logger.info("Building the fc2 index")
+
+        model = build_model(model_config, subheadings)
+        model.load_state_dict(state_dict)
+        model.eval()
+
+        centroids, assignments = MipsIndexBuilder(args).run(model)
+        fc2_index_dir = target_dir / "fc2_index"
+
+        logger.info("💾⇦ Saving fc2 index")
+
+        write_mips_index(fc2_index_dir, centroids, assignments)
+
+        # The recall of the full scoring top 5 on a sample of the training data guides the choice of fc2_candidates
+        sample = embeddings[
+            torch.randperm(len(embeddings), generator=torch.Generator().manual_seed(0))[
+                :1000
+            ]
+        ]
+
+        for candidates in sorted({128, 256, 512, args.fc2_candidates()} - {0}):
+            recall = CandidatePrunedModel(
+                model, MipsIndex(fc2_index_dir), candidates
+            ).recall(sample)
+            logger.info(f"fc2 candidates {candidates}: top 5 recall {recall:.2%}")
+
+    if args.train_ngram_classifier():
+        logger.info("Training the n-gram classifier")
+
+        ngram_model = NgramClassifierTrainer(args).run(
+            unique_text_values, text_indexes, labels, len(subheadings)
+        )
+
+        logger.info("💾⇦ Saving n-gram classifier")
+
+        write_ngram_classifier(target_dir / "ngram_classifier", ngram_model)
+
+    if args.distil_student_encoder():
+        logger.info("Distilling the student encoder")
+
+        student = StudentEncoderDistiller(args).run(
+            unique_text_values, unique_embeddings
+        )
+
+        logger.info("💾⇦ Saving student encoder")
+
+        student_dir = target_dir / "student_encoder"
+        student.save(str(student_dir))
+
+        del student
+
+        logger.info("Creating the student embeddings")
+
+        student_embeddings_processor = EmbeddingsProcessor(
+            transformer_model=str(student_dir),
+            torch_device=args.torch_device(),
+            batch_size=args.embedding_batch_size(),
+            max_seq_length=args.max_seq_length(),
+        )
+
+        unique_student_embeddings = student_embeddings_processor.create_embeddings(
+            unique_text_values
+        )
+        student_embeddings = torch.stack(
+            [unique_student_embeddings[idx] for idx in text_indexes]
+        )
+
+        logger.info("Training the model on the student embeddings")
+
+        student_state_dict, input_size, hidden_size, output_size = trainer.run(
+            student_embeddings, labels, len(subheadings), subheadings
+        )
+
+        logger.info("💾⇦ Saving student model bundle")
+
+        ModelBundle.from_state_dict(
+            student_state_dict,
+            {
+                **model_config,
+                "input_size": input_size,
+                "hidden_size": hidden_size,
+                "output_size": output_size,
+                "fc2_rank": trained_fc2_rank,
+            },
+            subheadings,
+            model_version=model_version(),
+        ).write(target_dir / "student_model.bundle")
+
+    if args.build_static_encoder():
+        logger.info("Building the static encoder")
+
+        token_ids, token_embeddings = StaticEncoderBuilder(args).run(
+            unique_text_values, unique_embeddings, embeddings_processor
+        )
+
+        logger.info("💾⇦ Saving static encoder")
+
+        static_dir = target_dir / "static_encoder"
+        write_static_encoder(
+            static_dir, embeddings_processor.tokenizer, token_ids, token_embeddings
+        )
+
+        logger.info("Creating the static embeddings")
+
+        unique_static_embeddings = StaticSentenceEncoder(static_dir).encode(
+            unique_text_values
+        )
+        static_embeddings = torch.stack(
+            [unique_static_embeddings[idx] for idx in text_indexes]
+        )
+
+        logger.info("Training the model on the static embeddings")
+
+        static_state_dict, input_size, hidden_size, output_size = trainer.run(
+            static_embeddings, labels, len(subheadings), subheadings
+        )
+
+        logger.info("💾⇦ Saving static model bundle")
+
+        ModelBundle.from_state_dict(
+            static_state_dict,
+            {
+                **model_config,
+                "input_size": input_size,
+                "hidden_size": hidden_size,
+                "output_size": output_size,
+                "fc2_rank": trained_fc2_rank,
+            },
+            subheadings,
+            model_version=model_version(),
+        ).write(target_dir / "static_model.bundle")
+
     logger.info("✅ Training complete. Enjoy your model!")
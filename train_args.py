@@ -1,9 +1,9 @@
 import argparse
+import functools
 import logging
 from pathlib import Path
 
 import toml
-import torch
 
 logger = logging.getLogger("config")
 logging.basicConfig(level=logging.INFO)
@@ -175,6 +175,24 @@ class TrainScriptArgsParser:
             help="the minimum relative distance to use for language detection",
             default=0.7,
         )
+        parser.add_argument(
+            "--language-detection-cache-size",
+            type=int,
+            help="the number of language detection results to cache by description. 0 disables the cache.",
+            default=10000,
+        )
+        parser.add_argument(
+            "--language-detection-low-accuracy",
+            action=argparse.BooleanOptionalAction,
+            help="whether the handler detects languages with lingua's low accuracy mode, which is quicker and smaller but less reliable on short descriptions",
+            default=False,
+        )
+        parser.add_argument(
+            "--batch-cleaning",
+            action=argparse.BooleanOptionalAction,
+            help="whether the CSV data sources clean each chunk of rows as a batch, with vectorised cleaners, each distinct row cleaned once and lingua's multi-threaded batch language detection, rather than row by row",
+            default=True,
+        )
         parser.add_argument(
             "--model-dropout-layer-1-percentage",
             type=float,
@@ -187,6 +205,226 @@ class TrainScriptArgsParser:
             help="the percentage of dropout to use in the second dropout layer",
             default=0.3,
         )
+        parser.add_argument(
+            "--embedding-cache-size",
+            type=int,
+            help="the maximum number of search text embeddings to keep in the inference embedding cache. 0 disables the cache.",
+            default=50000,
+        )
+        parser.add_argument(
+            "--embedding-cache-dtype",
+            type=str,
+            help="how to store embeddings in the inference embedding cache. int8 fits more entries in memory at a small cost in precision.",
+            choices=["float16", "int8"],
+            default="float16",
+        )
+        parser.add_argument(
+            "--result-cache-size",
+            type=int,
+            help="the maximum number of request outcomes to keep in the handler result cache. 0 disables the cache.",
+            default=10000,
+        )
+        parser.add_argument(
+            "--result-cache-ttl-seconds",
+            type=float,
+            help="how long a request outcome is kept in the handler result cache before it expires",
+            default=3600,
+        )
+        parser.add_argument(
+            "--inference-backend",
+            type=str,
+            help="the runtime to use for the sentence transformer and model at inference time. onnx requires the models to have been exported with export_onnx.py and falls back to torch if they are missing.",
+            choices=["torch", "onnx"],
+            default="torch",
+        )
+        parser.add_argument(
+            "--max-seq-length",
+            type=int,
+            help="the maximum number of tokens the sentence transformer embeds for training and inference. Longer texts are truncated. 0 keeps the transformer's default.",
+            default=0,
+        )
+        parser.add_argument(
+            "--lean-encoder",
+            action=argparse.BooleanOptionalAction,
+            help="whether single searches are encoded by calling the tokenizer and transformer directly rather than through SentenceTransformer.encode. The embeddings are identical.",
+            default=True,
+        )
+        parser.add_argument(
+            "--distil-student-encoder",
+            action=argparse.BooleanOptionalAction,
+            help="whether training also distils a smaller student sentence transformer from the transformer's embeddings and retrains the model on the student's embeddings",
+            default=False,
+        )
+        parser.add_argument(
+            "--student-transformer",
+            type=str,
+            help="the pretrained transformer the student encoder is distilled from (e.g. a 6 layer MiniLM)",
+            default="sentence-transformers/all-MiniLM-L6-v2",
+        )
+        parser.add_argument(
+            "--student-max-epochs",
+            type=int,
+            help="the number of epochs to distil the student encoder for",
+            default=3,
+        )
+        parser.add_argument(
+            "--student-learning-rate",
+            type=float,
+            help="the learning rate to distil the student encoder with",
+            default=5e-5,
+        )
+        parser.add_argument(
+            "--build-static-encoder",
+            action=argparse.BooleanOptionalAction,
+            help="whether training also builds a static encoder (a table of per token vectors distilled from the transformer) and retrains the model on its embeddings",
+            default=False,
+        )
+        parser.add_argument(
+            "--static-encoder-max-epochs",
+            type=int,
+            help="the number of epochs to train the static encoder's token vectors against the transformer's embeddings for. 0 keeps the transformer's embedding of each token on its own.",
+            default=3,
+        )
+        parser.add_argument(
+            "--static-encoder-learning-rate",
+            type=float,
+            help="the learning rate to train the static encoder's token vectors with",
+            default=1e-3,
+        )
+        parser.add_argument(
+            "--fc2-rank",
+            type=int,
+            help="train the model's output layer (fc2) factorised into two layers through this many dimensions. 0 trains it dense.",
+            default=0,
+        )
+        parser.add_argument(
+            "--fc2-svd-rank",
+            type=int,
+            help="after training, compress a dense output layer (fc2) with a truncated SVD at this rank. 0 keeps it as trained.",
+            default=0,
+        )
+        parser.add_argument(
+            "--hierarchical-head",
+            action=argparse.BooleanOptionalAction,
+            help="whether to train the hierarchical model, which predicts chapters and headings and only scores the subheadings under the top ones, rather than the flat model",
+            default=False,
+        )
+        parser.add_argument(
+            "--hierarchy-top-chapters",
+            type=int,
+            help="the number of chapters the hierarchical model picks headings from at inference time. 0 scores every subheading.",
+            default=2,
+        )
+        parser.add_argument(
+            "--hierarchy-top-headings",
+            type=int,
+            help="the number of headings whose subheadings the hierarchical model scores at inference time. 0 scores every subheading.",
+            default=8,
+        )
+        parser.add_argument(
+            "--build-fc2-index",
+            action=argparse.BooleanOptionalAction,
+            help="whether to build a maximum inner product index over the rows of the flat model's output layer (fc2) for candidate pruning",
+            default=False,
+        )
+        parser.add_argument(
+            "--fc2-index-clusters",
+            type=int,
+            help="the number of clusters the fc2 index groups the subheadings into",
+            default=128,
+        )
+        parser.add_argument(
+            "--fc2-candidates",
+            type=int,
+            help="the (minimum) number of subheadings the flat model scores exactly per search using the fc2 index. 0 scores every subheading.",
+            default=0,
+        )
+        parser.add_argument(
+            "--train-ngram-classifier",
+            action=argparse.BooleanOptionalAction,
+            help="whether training also trains the hashed character n-gram classifier that is the first stage of the cascade",
+            default=False,
+        )
+        parser.add_argument(
+            "--ngram-buckets",
+            type=int,
+            help="the number of buckets the n-gram classifier hashes words and character n-grams into",
+            default=262144,
+        )
+        parser.add_argument(
+            "--ngram-dimensions",
+            type=int,
+            help="the size of the n-gram classifier's n-gram vectors",
+            default=32,
+        )
+        parser.add_argument(
+            "--ngram-max-epochs",
+            type=int,
+            help="the number of epochs to train the n-gram classifier for",
+            default=5,
+        )
+        parser.add_argument(
+            "--ngram-learning-rate",
+            type=float,
+            help="the learning rate to train the n-gram classifier with",
+            default=1e-2,
+        )
+        parser.add_argument(
+            "--cascade",
+            action=argparse.BooleanOptionalAction,
+            help="whether the lambda answers searches with the n-gram classifier first and only runs the sentence transformer when it isn't confident",
+            default=False,
+        )
+        parser.add_argument(
+            "--cascade-threshold",
+            type=float,
+            help="the top score (0 to 1) the n-gram classifier needs for its results to be used without running the sentence transformer",
+            default=0.9,
+        )
+        parser.add_argument(
+            "--encoder",
+            type=str,
+            help="what the classifier encodes searches with at inference time. The student and static encoders need to have been built by training.",
+            choices=["teacher", "student", "static"],
+            default="teacher",
+        )
+        parser.add_argument(
+            "--torch-num-threads",
+            type=int,
+            help="the number of intra-op threads torch uses at inference time. 0 leaves it to torch. Use autotune.py to pick it.",
+            default=0,
+        )
+        parser.add_argument(
+            "--torch-num-interop-threads",
+            type=int,
+            help="the number of inter-op threads torch uses at inference time. 0 leaves it to torch. Use autotune.py to pick it.",
+            default=0,
+        )
+        parser.add_argument(
+            "--torch-quantized-engine",
+            type=str,
+            help="the engine torch runs quantized models with (e.g. fbgemm, qnnpack, onednn, x86). Empty leaves it to torch. Use autotune.py to pick it.",
+            default="",
+        )
+        parser.add_argument(
+            "--tokenizers-parallelism",
+            type=str,
+            help="whether the tokenizer encodes in parallel at inference time. Empty leaves it to the tokenizers library. Use autotune.py to pick it.",
+            choices=["", "true", "false"],
+            default="",
+        )
+        parser.add_argument(
+            "--warm-up-queries",
+            type=str,
+            nargs="*",
+            help="synthetic search queries run through the lambda handler at init so that the first real request doesn't pay for lazy initialisation. Pass none to disable the warm-up.",
+            default=[
+                "cotton t-shirts",
+                "bananas",
+                "misc item",
+                "ceramic coffee mugs",
+            ],
+        )
         parser.add_argument(
             "--uses-quantized-model",
             action="store_true",
@@ -198,6 +436,8 @@ class TrainScriptArgsParser:
         self._parse_search_config()
 
     def print(self):
+        import torch
+
         logger.info("Configuration:")
         logger.info(f"  device: {self.device()}")
         logger.info(f"  torch_device: {self.torch_device()}")
@@ -227,6 +467,13 @@ class TrainScriptArgsParser:
         logger.info(f"  preferred_languages: {self.preferred_languages()}")
         logger.info(f"  detected_languages: {self.detected_languages()}")
         logger.info(f"  minimum_relative_distance: {self.minimum_relative_distance()}")
+        logger.info(
+            f"  language_detection_cache_size: {self.language_detection_cache_size()}"
+        )
+        logger.info(
+            f"  language_detection_low_accuracy: {self.language_detection_low_accuracy()}"
+        )
+        logger.info(f"  batch_cleaning: {self.batch_cleaning()}")
         logger.info(
             f"  model_dropout_layer_1_percentage: {self.model_dropout_layer_1_percentage()}"
         )
@@ -234,6 +481,43 @@ class TrainScriptArgsParser:
             f"  model_dropout_layer_2_percentage: {self.model_dropout_layer_2_percentage()}"
         )
         logger.info(f"  uses_quantized_model: {self.uses_quantized_model()}")
+        logger.info(f"  embedding_cache_size: {self.embedding_cache_size()}")
+        logger.info(f"  embedding_cache_dtype: {self.embedding_cache_dtype()}")
+        logger.info(f"  result_cache_size: {self.result_cache_size()}")
+        logger.info(f"  inference_backend: {self.inference_backend()}")
+        logger.info(f"  result_cache_ttl_seconds: {self.result_cache_ttl_seconds()}")
+        logger.info(f"  warm_up_queries: {self.warm_up_queries()}")
+        logger.info(f"  max_seq_length: {self.max_seq_length()}")
+        logger.info(f"  lean_encoder: {self.lean_encoder()}")
+        logger.info(f"  distil_student_encoder: {self.distil_student_encoder()}")
+        logger.info(f"  student_transformer: {self.student_transformer()}")
+        logger.info(f"  student_max_epochs: {self.student_max_epochs()}")
+        logger.info(f"  student_learning_rate: {self.student_learning_rate()}")
+        logger.info(f"  build_static_encoder: {self.build_static_encoder()}")
+        logger.info(f"  static_encoder_max_epochs: {self.static_encoder_max_epochs()}")
+        logger.info(
+            f"  static_encoder_learning_rate: {self.static_encoder_learning_rate()}"
+        )
+        logger.info(f"  encoder: {self.encoder()}")
+        logger.info(f"  fc2_rank: {self.fc2_rank()}")
+        logger.info(f"  fc2_svd_rank: {self.fc2_svd_rank()}")
+        logger.info(f"  hierarchical_head: {self.hierarchical_head()}")
+        logger.info(f"  hierarchy_top_chapters: {self.hierarchy_top_chapters()}")
+        logger.info(f"  hierarchy_top_headings: {self.hierarchy_top_headings()}")
+        logger.info(f"  build_fc2_index: {self.build_fc2_index()}")
+        logger.info(f"  fc2_index_clusters: {self.fc2_index_clusters()}")
+        logger.info(f"  fc2_candidates: {self.fc2_candidates()}")
+        logger.info(f"  train_ngram_classifier: {self.train_ngram_classifier()}")
+        logger.info(f"  ngram_buckets: {self.ngram_buckets()}")
+        logger.info(f"  ngram_dimensions: {self.ngram_dimensions()}")
+        logger.info(f"  ngram_max_epochs: {self.ngram_max_epochs()}")
+        logger.info(f"  ngram_learning_rate: {self.ngram_learning_rate()}")
+        logger.info(f"  cascade: {self.cascade()}")
+        logger.info(f"  cascade_threshold: {self.cascade_threshold()}")
+        logger.info(f"  torch_num_threads: {self.torch_num_threads()}")
+        logger.info(f"  torch_num_interop_threads: {self.torch_num_interop_threads()}")
+        logger.info(f"  torch_quantized_engine: {self.torch_quantized_engine()}")
+        logger.info(f"  tokenizers_parallelism: {self.tokenizers_parallelism()}")
 
     def torch_device(self):
         arg_device = self.device()
@@ -349,6 +633,18 @@ class TrainScriptArgsParser:
     def minimum_relative_distance(self):
         return self.parsed_args.minimum_relative_distance
 
+    @config_from_file
+    def language_detection_cache_size(self):
+        return self.parsed_args.language_detection_cache_size
+
+    @config_from_file
+    def language_detection_low_accuracy(self):
+        return self.parsed_args.language_detection_low_accuracy
+
+    @config_from_file
+    def batch_cleaning(self):
+        return self.parsed_args.batch_cleaning
+
     @config_from_file
     def model_dropout_layer_1_percentage(self):
         return self.parsed_args.model_dropout_layer_1_percentage
@@ -361,6 +657,146 @@ class TrainScriptArgsParser:
     def uses_quantized_model(self):
         return self.parsed_args.uses_quantized_model
 
+    @config_from_file
+    def embedding_cache_size(self):
+        return self.parsed_args.embedding_cache_size
+
+    @config_from_file
+    def embedding_cache_dtype(self):
+        return self.parsed_args.embedding_cache_dtype
+
+    @config_from_file
+    def result_cache_size(self):
+        return self.parsed_args.result_cache_size
+
+    @config_from_file
+    def result_cache_ttl_seconds(self):
+        return self.parsed_args.result_cache_ttl_seconds
+
+    @config_from_file
+    def inference_backend(self):
+        return self.parsed_args.inference_backend
+
+    @config_from_file
+    def warm_up_queries(self):
+        return self.parsed_args.warm_up_queries
+
+    @config_from_file
+    def max_seq_length(self):
+        return self.parsed_args.max_seq_length
+
+    @config_from_file
+    def lean_encoder(self):
+        return self.parsed_args.lean_encoder
+
+    @config_from_file
+    def distil_student_encoder(self):
+        return self.parsed_args.distil_student_encoder
+
+    @config_from_file
+    def student_transformer(self):
+        return self.parsed_args.student_transformer
+
+    @config_from_file
+    def student_max_epochs(self):
+        return self.parsed_args.student_max_epochs
+
+    @config_from_file
+    def student_learning_rate(self):
+        return self.parsed_args.student_learning_rate
+
+    @config_from_file
+    def build_static_encoder(self):
+        return self.parsed_args.build_static_encoder
+
+    @config_from_file
+    def static_encoder_max_epochs(self):
+        return self.parsed_args.static_encoder_max_epochs
+
+    @config_from_file
+    def static_encoder_learning_rate(self):
+        return self.parsed_args.static_encoder_learning_rate
+
+    @config_from_file
+    def encoder(self):
+        return self.parsed_args.encoder
+
+    @config_from_file
+    def fc2_rank(self):
+        return self.parsed_args.fc2_rank
+
+    @config_from_file
+    def fc2_svd_rank(self):
+        return self.parsed_args.fc2_svd_rank
+
+    @config_from_file
+    def hierarchical_head(self):
+        return self.parsed_args.hierarchical_head
+
+    @config_from_file
+    def hierarchy_top_chapters(self):
+        return self.parsed_args.hierarchy_top_chapters
+
+    @config_from_file
+    def hierarchy_top_headings(self):
+        return self.parsed_args.hierarchy_top_headings
+
+    @config_from_file
+    def build_fc2_index(self):
+        return self.parsed_args.build_fc2_index
+
+    @config_from_file
+    def fc2_index_clusters(self):
+        return self.parsed_args.fc2_index_clusters
+
+    @config_from_file
+    def fc2_candidates(self):
+        return self.parsed_args.fc2_candidates
+
+    @config_from_file
+    def train_ngram_classifier(self):
+        return self.parsed_args.train_ngram_classifier
+
+    @config_from_file
+    def ngram_buckets(self):
+        return self.parsed_args.ngram_buckets
+
+    @config_from_file
+    def ngram_dimensions(self):
+        return self.parsed_args.ngram_dimensions
+
+    @config_from_file
+    def ngram_max_epochs(self):
+        return self.parsed_args.ngram_max_epochs
+
+    @config_from_file
+    def ngram_learning_rate(self):
+        return self.parsed_args.ngram_learning_rate
+
+    @config_from_file
+    def cascade(self):
+        return self.parsed_args.cascade
+
+    @config_from_file
+    def cascade_threshold(self):
+        return self.parsed_args.cascade_threshold
+
+    @config_from_file
+    def torch_num_threads(self):
+        return self.parsed_args.torch_num_threads
+
+    @config_from_file
+    def torch_num_interop_threads(self):
+        return self.parsed_args.torch_num_interop_threads
+
+    @config_from_file
+    def torch_quantized_engine(self):
+        return self.parsed_args.torch_quantized_engine
+
+    @config_from_file
+    def tokenizers_parallelism(self):
+        return self.parsed_args.tokenizers_parallelism
+
     def load_config_file(self):
         self.parsed_config = toml.load("search-config.toml")
 
@@ -371,6 +807,8 @@ class TrainScriptArgsParser:
             self.parsed_config = None
 
     def _auto_device(self):
+        import torch
+
         if torch.cuda.is_available():
             return "cuda"
         elif torch.backends.mps.is_available():
@@ -379,13 +817,44 @@ class TrainScriptArgsParser:
             return "cpu"
 
     def _cuda_device(self):
+        import torch
+
         if not torch.cuda.is_available():
             return "cpu"
 
         return "cuda"
 
     def _mps_device(self):
+        import torch
+
         if not torch.backends.mps.is_available():
             return "cpu"
 
         return "mps"
+
+
+@functools.cache
+def shared_config() -> TrainScriptArgsParser:
+    """
+    The process-wide configuration. The command line is parsed and the config file read once, the first time
+    it's asked for. search-config.toml is used unless --config points at another file.
+    """
+    config = TrainScriptArgsParser()
+
+    if config.parsed_config is None:
+        config.load_config_file()
+
+    return config
+
+
+class LazyConfig:
+    """
+    Stands in for the shared configuration so that modules can hold a reference to it at import time
+    without paying for argparse and the config file until a setting is first read.
+    """
+
+    def __getattr__(self, name: str):
+        return getattr(shared_config(), name)
+
+
+args = LazyConfig()
@@ -0,0 +1,61 @@
+import logging
+
+import numpy as np
+import torch
+from torch import nn
+
+from inference.mips_index import output_rows
+from model.model import SimpleNN
+from train_args import TrainScriptArgsParser
+
+logger = logging.getLogger("mips_index")
+
+kmeans_iterations = 10
+
+
+class MipsIndexBuilder:
+    """
+    Builds the fc2 index by clustering the output layer's rows (with their biases appended) by direction with
+    spherical k-means.
+
+    Each cluster's centroid is the mean of its rows, so a centroid's score against a search is the mean logit
+    of the subheadings in the cluster.
+    """
+
+    def __init__(self, args: TrainScriptArgsParser) -> None:
+        self._clusters = args.fc2_index_clusters()
+
+    def run(self, model: SimpleNN) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the centroids and the cluster of each row.
+        """
+        _project, weight, bias = output_rows(model.fc2)
+        rows = torch.cat([weight, bias[:, None]], dim=1).float()
+        directions = nn.functional.normalize(rows, dim=1)
+        clusters = min(self._clusters, len(rows))
+
+        generator = torch.Generator().manual_seed(0)
+        centres = directions[torch.randperm(len(rows), generator=generator)[:clusters]]
+
+        for _ in range(kmeans_iterations):
+            assignments = (directions @ centres.T).argmax(dim=1)
+            sums = torch.zeros_like(centres).index_add_(0, assignments, directions)
+            # An empty cluster keeps its centre
+            centres = torch.where(
+                sums.norm(dim=1, keepdim=True) > 0,
+                nn.functional.normalize(sums, dim=1),
+                centres,
+            )
+
+        assignments = (directions @ centres.T).argmax(dim=1)
+        counts = torch.bincount(assignments, minlength=clusters)
+        centroids = (
+            torch.zeros_like(centres).index_add_(0, assignments, rows)
+            / (counts.clamp(min=1)[:, None])
+        )
+
+        logger.info(
+            f"Clustered {len(rows)} subheadings into {clusters} clusters of at most {counts.max().item()}"
+        )
+
+        return centroids.numpy(), assignments.numpy()
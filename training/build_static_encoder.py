@@ -0,0 +1,108 @@
+import logging
+import math
+
+import numpy as np
+import torch
+from torch import Tensor, nn, optim
+
+from inference.static_encoder import token_rows
+from train_args import TrainScriptArgsParser
+from training.create_embeddings import EmbeddingsProcessor
+
+logger = logging.getLogger("static_encoder")
+
+
+class StaticEncoderBuilder:
+    """
+    Builds the per token vectors of a static encoder from the sentence transformer.
+
+    The vocabulary is every token that appears in the training descriptions. Each token starts out as the
+    sentence transformer's embedding of that token on its own, then the vectors are trained so that the
+    normalised mean of a description's token vectors matches the sentence transformer's embedding of it.
+    """
+
+    def __init__(self, args: TrainScriptArgsParser) -> None:
+        self._device = args.torch_device()
+        self._max_epochs = args.static_encoder_max_epochs()
+        self._learning_rate = args.static_encoder_learning_rate()
+        self._batch_size = args.model_batch_size()
+
+    def run(
+        self,
+        texts: list[str],
+        teacher_embeddings: Tensor,
+        embeddings_processor: EmbeddingsProcessor,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the token ids of the vocabulary and their vectors (one row per token id).
+        """
+        tokenizer = embeddings_processor.tokenizer
+        # There's no attention window to fit in so descriptions aren't truncated
+        text_token_ids = tokenizer(texts, add_special_tokens=False, verbose=False)[
+            "input_ids"
+        ]
+        token_ids = np.unique(
+            np.concatenate([np.array(ids, dtype=np.int64) for ids in text_token_ids])
+        )
+
+        logger.info(
+            f"Embedding the {len(token_ids)} tokens in the training descriptions"
+        )
+
+        initial_embeddings = embeddings_processor.create_embeddings(
+            tokenizer.convert_ids_to_tokens(token_ids.tolist())
+        )
+
+        rows = token_rows(len(tokenizer), token_ids)
+        text_rows = [rows[ids] for ids in text_token_ids if ids]
+        teacher_embeddings = teacher_embeddings[
+            [i for i, ids in enumerate(text_token_ids) if ids]
+        ]
+
+        embeddings = self._train(initial_embeddings, text_rows, teacher_embeddings)
+
+        return token_ids, embeddings
+
+    def _train(
+        self,
+        initial_embeddings: Tensor,
+        text_rows: list[np.ndarray],
+        teacher_embeddings: Tensor,
+    ) -> np.ndarray:
+        table = nn.EmbeddingBag.from_pretrained(
+            initial_embeddings.float(), freeze=False, mode="mean"
+        ).to(self._device)
+        optimizer = optim.Adam(table.parameters(), lr=self._learning_rate)
+        criterion = nn.MSELoss()
+        batches = math.ceil(len(text_rows) / self._batch_size)
+
+        for epoch in range(self._max_epochs):
+            total_loss = 0.0
+
+            for indexes in torch.randperm(len(text_rows)).split(self._batch_size):
+                batch_rows = [text_rows[i] for i in indexes]
+                offsets = np.cumsum([0] + [len(rows) for rows in batch_rows[:-1]])
+
+                embeddings = nn.functional.normalize(
+                    table(
+                        torch.from_numpy(np.concatenate(batch_rows)).to(self._device),
+                        torch.from_numpy(offsets).to(self._device),
+                    ),
+                    p=2,
+                    dim=1,
+                )
+                loss = criterion(
+                    embeddings, teacher_embeddings[indexes].to(self._device)
+                )
+
+                optimizer.zero_grad()
+                loss.backward()
+                optimizer.step()
+
+                total_loss += loss.item()
+
+            logger.info(
+                f"Epoch {epoch + 1}/{self._max_epochs} average loss {total_loss / batches:.6f}"
+            )
+
+        return table.weight.detach().cpu().numpy()
@@ -1,13 +1,14 @@
 import csv
 import logging
 import re
-from typing import Dict, List
+import time
+from functools import lru_cache
+from typing import Callable, Dict, List, NamedTuple
 
-from lingua import Language, LanguageDetectorBuilder
+import numpy as np
 
-from train_args import TrainScriptArgsParser
+from train_args import args
 
-training_args = TrainScriptArgsParser()
 logger = logging.getLogger("cleaning_pipeline")
 
 
@@ -25,6 +26,120 @@ def debug(func):
     return wrapper
 
 
+def alternation(regexes: list[str]) -> re.Pattern:
+    """
+    Compiles regexes into a single pattern that searches for any of them in one pass.
+    """
+    return re.compile("|".join(f"(?:{regex})" for regex in regexes))
+
+
+class TermMatcher:
+    """
+    Finds whether any of a list of terms occurs in a text in a single pass, however many terms there are.
+
+    The terms are built into a trie that's compiled into one regex, so at each position of the text the regex
+    engine walks the trie rather than each term being checked in turn.
+    """
+
+    def __init__(self, terms: list[str]) -> None:
+        self._terms = terms
+        trie: dict = {}
+
+        for term in terms:
+            node = trie
+
+            for character in term:
+                node = node.setdefault(character, {})
+
+            # Anything longer can't change whether there's a match
+            node.clear()
+            node[""] = {}
+
+        self.search: Callable[[str], re.Match | None] = (
+            re.compile(_trie_pattern(trie)).search if trie else _no_match
+        )
+
+    def matches(self, text: str) -> bool:
+        return self.search(text) is not None
+
+    def first(self, text: str) -> str | None:
+        """
+        The first term (in the order given) that occurs in the text.
+        """
+        if not self.matches(text):
+            return None
+
+        return next(term for term in self._terms if term in text)
+
+
+def _no_match(text: str) -> None:
+    return None
+
+
+def _trie_pattern(node: dict) -> str:
+    if "" in node:
+        return ""
+
+    branches = [
+        re.escape(character) + _trie_pattern(child) for character, child in node.items()
+    ]
+
+    return branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+
+
+# A cleaner's meta-free filter: it returns the rejection reason (if any) rather than the meta
+CompiledCleaner = Callable[[str, str], tuple[str | None, str | None, str | None]]
+
+# Whether each row is kept, the cleaned subheadings and descriptions, and the reason each rejected row was rejected
+FilteredColumns = tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
+
+def string_column(values) -> np.ndarray:
+    """
+    A column of strings as a numpy StringDType array. Anything numpy can convert will do, e.g. a list, a numpy
+    array, a pandas Series or an Arrow array.
+    """
+    return np.asarray(values, dtype=np.dtypes.StringDType())
+
+
+def empty_column(count: int) -> np.ndarray:
+    return np.full(count, "", dtype=np.dtypes.StringDType())
+
+
+def searches(search: Callable[[str], object], column: np.ndarray) -> np.ndarray:
+    """
+    Whether a search (e.g. a compiled regex's search) finds anything in each string of a column. numpy has no
+    regexes, so only the search itself runs per row.
+    """
+    return np.fromiter(map(search, column.tolist()), dtype=bool, count=len(column))
+
+
+def rejecting(
+    keep: np.ndarray, subheadings: np.ndarray, descriptions: np.ndarray, reason: str
+) -> FilteredColumns:
+    reasons = empty_column(len(keep))
+    reasons[~keep] = reason
+
+    return keep, subheadings, descriptions, reasons
+
+
+def keeping(subheadings: np.ndarray, descriptions: np.ndarray) -> FilteredColumns:
+    return (
+        np.ones(len(subheadings), dtype=bool),
+        subheadings,
+        descriptions,
+        empty_column(len(subheadings)),
+    )
+
+
+class CleanedColumns(NamedTuple):
+    keep: np.ndarray
+    subheadings: np.ndarray
+    descriptions: np.ndarray
+    rejected_by: np.ndarray
+    reasons: np.ndarray
+
+
 class Cleaner:
     def filter(
         self,
@@ -33,6 +148,58 @@ class Cleaner:
     ) -> tuple[str | None, str | None, dict]:
         raise NotImplementedError()
 
+    def compile(self) -> CompiledCleaner:
+        """
+        Returns the cleaner's filter for a compiled pipeline. Cleaners override this with an equivalent that
+        skips the meta and does its work up front where they can.
+        """
+
+        def compiled(subheading: str, description: str):
+            subheading, description, meta = self.filter(subheading, description)
+
+            return subheading, description, meta.get("reason")
+
+        return compiled
+
+    def filter_batch(
+        self, subheadings: list[str], descriptions: list[str]
+    ) -> list[tuple[str | None, str | None, str | None]]:
+        """
+        Filters many rows at once, returning each row's result as the compiled filter would. Cleaners override
+        this where working over the whole batch is quicker than row by row.
+        """
+        compiled = self.compile()
+
+        return [
+            compiled(subheading, description)
+            for subheading, description in zip(subheadings, descriptions)
+        ]
+
+    def filter_many(
+        self, subheadings: np.ndarray, descriptions: np.ndarray
+    ) -> FilteredColumns:
+        """
+        Filters columns (StringDType arrays) of subheadings and descriptions. Rejected rows are left empty in the
+        cleaned columns. Cleaners override this with vectorised numpy string operations where they can, otherwise
+        it falls back to filter_batch.
+        """
+        results = self.filter_batch(subheadings.tolist(), descriptions.tolist())
+        keep = np.fromiter(
+            (
+                subheading is not None and description is not None
+                for subheading, description, _reason in results
+            ),
+            dtype=bool,
+            count=len(results),
+        )
+
+        return (
+            keep,
+            string_column([subheading or "" for subheading, _, _ in results]),
+            string_column([description or "" for _, description, _ in results]),
+            string_column([reason or "" for _, _, reason in results]),
+        )
+
 
 class CleaningPipeline:
     """
@@ -69,6 +236,109 @@ class CleaningPipeline:
 
         return subheading, description, all_meta
 
+    def compile(self) -> "CompiledCleaningPipeline":
+        return CompiledCleaningPipeline(self._filters, self._return_meta)
+
+    def filter_batch(
+        self, subheadings: list[str], descriptions: list[str]
+    ) -> list[tuple[str | None, str | None, dict]]:
+        """
+        Filters many rows at once by running each cleaner's filter_batch over the rows that survived the cleaners
+        before it. The cleaned rows match filter, and a rejected row's meta only holds the rejecting cleaner's
+        reason, as with a compiled pipeline.
+        """
+        results: list[tuple[str | None, str | None, dict]] = [
+            (None, None, {}) for _ in subheadings
+        ]
+        rows = list(range(len(subheadings)))
+        subheadings = list(subheadings)
+        descriptions = list(descriptions)
+
+        for cleaner in self._filters:
+            if not rows:
+                break
+
+            name = cleaner.__class__.__name__
+            outcomes = cleaner.filter_batch(subheadings, descriptions)
+            surviving_rows, subheadings, descriptions = [], [], []
+
+            for row, (subheading, description, reason) in zip(rows, outcomes):
+                if subheading is None or description is None:
+                    results[row] = (
+                        None,
+                        None,
+                        {name: {"reason": reason}} if reason else {},
+                    )
+                else:
+                    surviving_rows.append(row)
+                    subheadings.append(subheading)
+                    descriptions.append(description)
+
+            rows = surviving_rows
+
+        for row, subheading, description in zip(rows, subheadings, descriptions):
+            results[row] = (subheading, description, {})
+
+        return results
+
+    def filter_many(self, subheadings, descriptions) -> CleanedColumns:
+        """
+        Filters columns of subheadings and descriptions (anything string_column takes, e.g. pandas or Arrow string
+        columns) by running each cleaner's filter_many over the rows that survived the cleaners before it.
+
+        Returns whether each row is kept, the cleaned columns (empty for rejected rows) and, for each rejected row,
+        the name of the cleaner that rejected it and its reason. The kept rows match filter.
+        """
+        # Each distinct pair is only cleaned once, as tradesets repeat the same pairs many times over
+        distinct: dict[tuple[str, str], int] = {}
+        inverse = np.fromiter(
+            (
+                distinct.setdefault(pair, len(distinct))
+                for pair in zip(
+                    string_column(subheadings).tolist(),
+                    string_column(descriptions).tolist(),
+                )
+            ),
+            dtype=np.intp,
+            count=len(subheadings),
+        )
+        subheadings = string_column([subheading for subheading, _ in distinct])
+        descriptions = string_column([description for _, description in distinct])
+        count = len(distinct)
+        rows = np.arange(count)
+        rejected_by = empty_column(count)
+        reasons = empty_column(count)
+
+        for cleaner in self._filters:
+            if not len(rows):
+                break
+
+            keep, subheadings, descriptions, cleaner_reasons = cleaner.filter_many(
+                subheadings, descriptions
+            )
+
+            if keep.all():
+                continue
+
+            rejected_by[rows[~keep]] = cleaner.__class__.__name__
+            reasons[rows[~keep]] = cleaner_reasons[~keep]
+            rows = rows[keep]
+            subheadings = subheadings[keep]
+            descriptions = descriptions[keep]
+
+        cleaned = CleanedColumns(
+            np.zeros(count, dtype=bool),
+            empty_column(count),
+            empty_column(count),
+            rejected_by,
+            reasons,
+        )
+        cleaned.keep[rows] = True
+        cleaned.subheadings[rows] = subheadings
+        cleaned.descriptions[rows] = descriptions
+
+        return CleanedColumns(*(column[inverse] for column in cleaned))
+
     def to_serialized_data(self) -> list:
         return [
             (
@@ -92,6 +362,47 @@ class CleaningPipeline:
         return cls(filters)
 
 
+class CompiledCleaningPipeline(CleaningPipeline):
+    """
+    A drop-in CleaningPipeline that runs each cleaner's compiled filter, so no meta is built per cleaner, the
+    regex cleaners match with a single precompiled alternation and the first rejection returns straight away.
+
+    The cleaned subheadings and descriptions match the interpreted pipeline. The meta only holds the rejecting
+    cleaner's reason (e.g. {"RemoveShortDescription": {"reason": "Short description"}}) unless return_meta is
+    set, in which case the interpreted pipeline runs to build the full meta.
+    """
+
+    def __init__(self, cleaners: list[Cleaner], return_meta: bool = False) -> None:
+        super().__init__(cleaners, return_meta)
+        self._steps = [
+            (cleaner.__class__.__name__, cleaner.compile()) for cleaner in cleaners
+        ]
+
+    def filter(
+        self, subheading: str, description: str
+    ) -> tuple[str | None, str | None, dict]:
+        if self._return_meta:
+            return super().filter(subheading, description)
+
+        for name, step in self._steps:
+            subheading, description, reason = step(subheading, description)
+
+            if subheading is None or description is None:
+                logger.debug(f"Skipping {name}: {reason}")
+
+                return (None, None, {name: {"reason": reason}} if reason else {})
+
+        return subheading, description, {}
+
+    def __call__(
+        self, subheading: str, description: str
+    ) -> tuple[str | None, str | None, dict]:
+        return self.filter(subheading, description)
+
+    def compile(self) -> "CompiledCleaningPipeline":
+        return self
+
+
 class StripExcessCharacters(Cleaner):
     """
     This cleaner is responsible for stripping excess characters from the subheading and description.
@@ -119,6 +430,33 @@ class StripExcessCharacters(Cleaner):
 
         return (subheading, description, {})
 
+    def compile(self) -> CompiledCleaner:
+        # Neither ends with whitespace after strip/split so only the period and comma rstrips can do anything
+        def compiled(subheading: str, description: str):
+            return (
+                subheading.strip().rstrip(".").rstrip(","),
+                " ".join(description.split()).rstrip(".").rstrip(","),
+                None,
+            )
+
+        return compiled
+
+    def filter_many(
+        self, subheadings: np.ndarray, descriptions: np.ndarray
+    ) -> FilteredColumns:
+        # numpy can't split strings, so the descriptions are cleaned one by one as they are by the compiled filter
+        return keeping(
+            np.strings.rstrip(
+                np.strings.rstrip(np.strings.strip(subheadings), "."), ","
+            ),
+            string_column(
+                [
+                    " ".join(description.split()).rstrip(".").rstrip(",")
+                    for description in descriptions.tolist()
+                ]
+            ),
+        )
+
 
 class PluralCleaning(Cleaner):
     """
@@ -141,6 +479,42 @@ class PluralCleaning(Cleaner):
 
         return (subheading, description, {})
 
+    def compile(self) -> CompiledCleaner:
+        # Both patterns need a whitespace separated s so most descriptions only need this one scan
+        separate_s = re.compile(r"\s+s\b").search
+        size_s = self._size_s.sub
+        plural_s = self._plural_s.sub
+
+        def compiled(subheading: str, description: str):
+            if separate_s(description):
+                description = plural_s(r"\1s", size_s("size_placeholder", description))
+
+            return (
+                subheading,
+                description.replace("size_placeholder", "size s"),
+                None,
+            )
+
+        return compiled
+
+    def filter_many(
+        self, subheadings: np.ndarray, descriptions: np.ndarray
+    ) -> FilteredColumns:
+        # Only descriptions with a separate s or a placeholder can change
+        changing = searches(re.compile(r"\ss\b").search, descriptions) | (
+            np.strings.find(descriptions, "size_placeholder") >= 0
+        )
+        compiled = self.compile()
+        descriptions = descriptions.copy()
+        descriptions[changing] = [
+            compiled(subheading, description)[1]
+            for subheading, description in zip(
+                subheadings[changing].tolist(), descriptions[changing].tolist()
+            )
+        ]
+
+        return keeping(subheadings, descriptions)
+
 
 class IncorrectPairsRemover(Cleaner):
     """
@@ -179,6 +553,51 @@ class IncorrectPairsRemover(Cleaner):
 
         return (subheading, description, {})
 
+    def compile(self) -> CompiledCleaner:
+        candidate_skips_for = self._incorrect_code_desc_pairs.get
+
+        def compiled(subheading: str, description: str):
+            candidate_skips = candidate_skips_for(description.lower())
+
+            if candidate_skips is not None:
+                kept_chapter = candidate_skips["kept_chapter"] or None
+
+                if subheading == (candidate_skips["skipped_code"] or ""):
+                    return (None, None, "Incorrect code for description")
+                elif kept_chapter and subheading[:2] != kept_chapter:
+                    return (None, None, "Incorrect chapter for description")
+
+            return (subheading, description, None)
+
+        return compiled
+
+    def filter_many(
+        self, subheadings: np.ndarray, descriptions: np.ndarray
+    ) -> FilteredColumns:
+        # Only the few rows whose description is listed need checking row by row
+        listed = np.fromiter(
+            (
+                description.lower() in self._incorrect_code_desc_pairs
+                for description in descriptions.tolist()
+            ),
+            dtype=bool,
+            count=len(descriptions),
+        )
+        keep = np.ones(len(subheadings), dtype=bool)
+        reasons = empty_column(len(subheadings))
+        compiled = self.compile()
+
+        for row in np.flatnonzero(listed):
+            _subheading, _description, reason = compiled(
+                subheadings[row], descriptions[row]
+            )
+
+            if reason is not None:
+                keep[row] = False
+                reasons[row] = reason
+
+        return keep, subheadings, descriptions, reasons
+
     @classmethod
     def build(cls, filename: str) -> "IncorrectPairsRemover":
         with open(filename) as f:
@@ -206,6 +625,24 @@ class RemoveEmptyDescription(Cleaner):
 
         return (subheading, description, {})
 
+    def compile(self) -> CompiledCleaner:
+        def compiled(subheading: str, description: str):
+            if not description or description.isspace():
+                return (None, None, "Empty description")
+
+            return (subheading, description, None)
+
+        return compiled
+
+    def filter_many(
+        self, subheadings: np.ndarray, descriptions: np.ndarray
+    ) -> FilteredColumns:
+        keep = (np.strings.str_len(descriptions) > 0) & ~np.strings.isspace(
+            descriptions
+        )
+
+        return rejecting(keep, subheadings, descriptions, "Empty description")
+
 
 class RemoveShortDescription(Cleaner):
     def __init__(self, min_length: int | None) -> None:
@@ -221,6 +658,24 @@ class RemoveShortDescription(Cleaner):
 
         return (subheading, description, {})
 
+    def compile(self) -> CompiledCleaner:
+        min_length = self._min_length
+
+        def compiled(subheading: str, description: str):
+            if len(description) <= min_length:
+                return (None, None, "Short description")
+
+            return (subheading, description, None)
+
+        return compiled
+
+    def filter_many(
+        self, subheadings: np.ndarray, descriptions: np.ndarray
+    ) -> FilteredColumns:
+        keep = np.strings.str_len(descriptions) > self._min_length
+
+        return rejecting(keep, subheadings, descriptions, "Short description")
+
 
 class RemoveSubheadingsNotMatchingRegexes(Cleaner):
     """
@@ -246,6 +701,30 @@ class RemoveSubheadingsNotMatchingRegexes(Cleaner):
             {"reason": f"Subheading does not match regexes {self._regexes}"},
         )
 
+    def compile(self) -> CompiledCleaner:
+        matches = alternation(self._regexes).search
+        reason = f"Subheading does not match regexes {self._regexes}"
+
+        def compiled(subheading: str, description: str):
+            if matches(subheading):
+                return (subheading, description, None)
+
+            return (None, None, reason)
+
+        return compiled
+
+    def filter_many(
+        self, subheadings: np.ndarray, descriptions: np.ndarray
+    ) -> FilteredColumns:
+        keep = searches(alternation(self._regexes).search, subheadings)
+
+        return rejecting(
+            keep,
+            subheadings,
+            descriptions,
+            f"Subheading does not match regexes {self._regexes}",
+        )
+
 
 class RemoveDescriptionsMatchingRegexes(Cleaner):
     """
@@ -271,6 +750,33 @@ class RemoveDescriptionsMatchingRegexes(Cleaner):
 
         return (subheading, description, {})
 
+    def compile(self) -> CompiledCleaner:
+        matches = alternation(self._regexes).search
+
+        def compiled(subheading: str, description: str):
+            if matches(description):
+                return (
+                    None,
+                    None,
+                    "Description cannot contain only numbers and dashes. Please add some text.",
+                )
+
+            return (subheading, description, None)
+
+        return compiled
+
+    def filter_many(
+        self, subheadings: np.ndarray, descriptions: np.ndarray
+    ) -> FilteredColumns:
+        keep = ~searches(alternation(self._regexes).search, descriptions)
+
+        return rejecting(
+            keep,
+            subheadings,
+            descriptions,
+            "Description cannot contain only numbers and dashes. Please add some text.",
+        )
+
     @classmethod
     def build(cls):
         return cls(
@@ -295,6 +801,13 @@ class LanguageCleaning(Cleaner):
     3. If the description contains a partial skip, skip it
     4. If the language of the description cannot be detected, keep it
     5. If the detected language is not in the preferred languages, skip it
+
+    Language detection is by far the slowest step so it only happens once the term lists haven't decided,
+    and its results are cached by description (up to language_detection_cache_size of them). The time spent
+    detecting is totalled in detection_ms.
+
+    Setting preload_models loads lingua's models up front (e.g. during the Lambda's init phase) rather than on
+    the first detection, and low_accuracy switches lingua to its quicker, less accurate mode.
     """
 
     def __init__(
@@ -304,11 +817,18 @@ class LanguageCleaning(Cleaner):
         partial_skips: list[str],
         partial_keeps: list[str],
         exact_keeps: list[str],
+        preload_models: bool = False,
+        low_accuracy: bool = False,
     ) -> None:
+        # lingua is slow to import so only pay for it when language cleaning is used
+        from lingua import Language, LanguageDetectorBuilder
+
         super().__init__()
         self._partial_skips = partial_skips
         self._partial_keeps = partial_keeps
-        self._exact_keeps = exact_keeps
+        self._exact_keeps = set(exact_keeps)
+        self._partial_skip_matcher = TermMatcher(partial_skips)
+        self._partial_keep_matcher = TermMatcher(partial_keeps)
         self._preferred_languages = [
             getattr(Language, lang) for lang in preferred_languages
         ]
@@ -316,45 +836,106 @@ class LanguageCleaning(Cleaner):
             getattr(Language, lang) for lang in detected_languages
         ]
 
-        self._detector = (
-            LanguageDetectorBuilder.from_languages(*self._detected_languages)
-            .with_minimum_relative_distance(training_args.minimum_relative_distance())
-            .build()
-        )
+        builder = LanguageDetectorBuilder.from_languages(
+            *self._detected_languages
+        ).with_minimum_relative_distance(args.minimum_relative_distance())
+
+        if low_accuracy:
+            builder = builder.with_low_accuracy_mode()
+
+        if preload_models:
+            builder = builder.with_preloaded_language_models()
+
+        self._detector = builder.build()
+        self._detect_language_of = self._detector.detect_language_of
+        cache_size = args.language_detection_cache_size()
+
+        if cache_size > 0:
+            self._detect_language_of = lru_cache(maxsize=cache_size)(
+                self._detect_language_of
+            )
+
+        self.detection_ms = 0.0
 
     @debug
     def filter(
         self, subheading: str, description: str
     ) -> tuple[str | None, str | None, dict]:
-        language = self._detector.detect_language_of(description)
-
-        if description in self._exact_keeps:
+        if self._kept_by_terms(description):
             return (subheading, description, {})
 
-        for partial_keep in self._partial_keeps:
-            if partial_keep in description:
-                return (subheading, description, {})
+        reason = self._partial_skip_reason(description)
 
-        for partial_skip in self._partial_skips:
-            if partial_skip in description:
-                return (
-                    None,
-                    None,
-                    {"reason": f"Description contains partial skip {partial_skip}"},
-                )
+        if reason is None:
+            start = time.perf_counter()
+            language = self._detect_language_of(description)
+            self.detection_ms += (time.perf_counter() - start) * 1000
+            reason = self._language_reason(language)
 
-        if language is None:
-            return (subheading, description, {})
-
-        if language not in self._preferred_languages:
-            return (
-                None,
-                None,
-                {"reason": f"Detected language {language} not in preferred languages"},
-            )
+        if reason is not None:
+            return (None, None, {"reason": reason})
 
         return (subheading, description, {})
 
+    def filter_batch(
+        self, subheadings: list[str], descriptions: list[str]
+    ) -> list[tuple[str | None, str | None, str | None]]:
+        """
+        Decides what it can from the term lists row by row, then detects the languages of the remaining
+        (distinct) descriptions with one call to lingua's multi-threaded batch detection.
+        """
+        results: list[tuple[str | None, str | None, str | None]] = []
+        undecided: dict[str, list[int]] = {}
+
+        for row, (subheading, description) in enumerate(zip(subheadings, descriptions)):
+            reason = None
+
+            if not self._kept_by_terms(description):
+                reason = self._partial_skip_reason(description)
+
+                if reason is None:
+                    undecided.setdefault(description, []).append(row)
+
+            if reason is None:
+                results.append((subheading, description, None))
+            else:
+                results.append((None, None, reason))
+
+        if not undecided:
+            return results
+
+        start = time.perf_counter()
+        languages = self._detector.detect_languages_in_parallel_of(list(undecided))
+        self.detection_ms += (time.perf_counter() - start) * 1000
+
+        for rows, language in zip(undecided.values(), languages):
+            reason = self._language_reason(language)
+
+            if reason is not None:
+                for row in rows:
+                    results[row] = (None, None, reason)
+
+        return results
+
+    def _kept_by_terms(self, description: str) -> bool:
+        return description in self._exact_keeps or self._partial_keep_matcher.matches(
+            description
+        )
+
+    def _partial_skip_reason(self, description: str) -> str | None:
+        partial_skip = self._partial_skip_matcher.first(description)
+
+        if partial_skip is None:
+            return None
+
+        return f"Description contains partial skip {partial_skip}"
+
+    def _language_reason(self, language) -> str | None:
+        if language is None or language in self._preferred_languages:
+            return None
+
+        return f"Detected language {language} not in preferred languages"
+
     @classmethod
     def from_serialized_data(cls, data: dict) -> "LanguageCleaning":
         return cls(
@@ -371,7 +952,7 @@ class LanguageCleaning(Cleaner):
             "preferred_languages": [lang.name for lang in self._preferred_languages],
             "partial_skips": self._partial_skips,
             "partial_keeps": self._partial_keeps,
-            "exact_keeps": self._exact_keeps,
+            "exact_keeps": list(self._exact_keeps),
         }
 
 
@@ -425,6 +1006,41 @@ class NegationCleaning(Cleaner):
 
         return (subheading, description, {})
 
+    def compile(self) -> CompiledCleaner:
+        # Both patterns need a negation term so most descriptions only need this one scan
+        has_negation = re.compile("|".join(self._negation_terms)).search
+        bracket_negation = self._bracket_negation_regex.sub
+        full_negation = self._full_negation_regex.sub
+        non_breaking_space = self._non_breaking_space
+
+        def compiled(subheading: str, description: str):
+            description = (description or "").lower().replace(non_breaking_space, " ")
+
+            if has_negation(description):
+                description = full_negation("", bracket_negation("", description))
+
+            return (subheading, description.strip(), None)
+
+        return compiled
+
+    def filter_many(
+        self, subheadings: np.ndarray, descriptions: np.ndarray
+    ) -> FilteredColumns:
+        descriptions = np.strings.replace(
+            np.strings.lower(descriptions), self._non_breaking_space, " "
+        )
+        negated = searches(
+            re.compile("|".join(self._negation_terms)).search, descriptions
+        )
+        descriptions[negated] = [
+            self._full_negation_regex.sub(
+                "", self._bracket_negation_regex.sub("", description)
+            )
+            for description in descriptions[negated].tolist()
+        ]
+
+        return keeping(subheadings, np.strings.strip(descriptions))
+
 
 class DescriptionLower(Cleaner):
     @debug
@@ -433,6 +1049,17 @@ class DescriptionLower(Cleaner):
     ) -> tuple[str | None, str | None, dict]:
         return (subheading, description.lower(), {})
 
+    def compile(self) -> CompiledCleaner:
+        def compiled(subheading: str, description: str):
+            return (subheading, description.lower(), None)
+
+        return compiled
+
+    def filter_many(
+        self, subheadings: np.ndarray, descriptions: np.ndarray
+    ) -> FilteredColumns:
+        return keeping(subheadings, np.strings.lower(descriptions))
+
 
 class PhraseRemover(Cleaner):
     """
@@ -444,6 +1071,7 @@ class PhraseRemover(Cleaner):
 
     def __init__(self, phrases: List[str]) -> None:
         self._phrases = phrases
+        self._matcher = TermMatcher(phrases)
 
     @classmethod
     def build(cls, filename: str) -> "PhraseRemover":
@@ -454,8 +1082,10 @@ class PhraseRemover(Cleaner):
     def filter(
         self, subheading: str, description: str
     ) -> tuple[str | None, str | None, dict]:
-        for phrase in self._phrases:
-            description = description.replace(phrase, "")
+        # Removing phrases only starts when one occurs, and then in order as a removal can reveal another phrase
+        if self._matcher.matches(description):
+            for phrase in self._phrases:
+                description = description.replace(phrase, "")
 
         description = description.strip()
         if not description:
@@ -463,6 +1093,47 @@ class PhraseRemover(Cleaner):
 
         return (subheading, description, {})
 
+    def compile(self) -> CompiledCleaner:
+        phrases = self._phrases
+        matches = self._matcher.matches
+
+        def compiled(subheading: str, description: str):
+            if matches(description):
+                for phrase in phrases:
+                    description = description.replace(phrase, "")
+
+            description = description.strip()
+
+            if not description:
+                return (None, None, "Empty description")
+
+            return (subheading, description, None)
+
+        return compiled
+
+    def filter_many(
+        self, subheadings: np.ndarray, descriptions: np.ndarray
+    ) -> FilteredColumns:
+        matched = searches(self._matcher.search, descriptions)
+
+        if matched.any():
+            descriptions = descriptions.copy()
+            removed = descriptions[matched]
+
+            for phrase in self._phrases:
+                removed = np.strings.replace(removed, phrase, "")
+
+            descriptions[matched] = removed
+
+        descriptions = np.strings.strip(descriptions)
+
+        return rejecting(
+            np.strings.str_len(descriptions) > 0,
+            subheadings,
+            descriptions,
+            "Empty description",
+        )
+
 
 class PadCodes(Cleaner):
     """
@@ -490,6 +1161,27 @@ class PadCodes(Cleaner):
 
         return (subheading, description, {"padded": False})
 
+    def compile(self) -> CompiledCleaner:
+        is_code = self._code_regex.fullmatch
+
+        def compiled(subheading: str, description: str):
+            if is_code(subheading):
+                return (subheading.ljust(8, "0"), description, None)
+
+            return (subheading, description, None)
+
+        return compiled
+
+    def filter_many(
+        self, subheadings: np.ndarray, descriptions: np.ndarray
+    ) -> FilteredColumns:
+        is_code = searches(self._code_regex.fullmatch, subheadings)
+
+        return keeping(
+            np.where(is_code, np.strings.ljust(subheadings, 8, "0"), subheadings),
+            descriptions,
+        )
+
 
 class Map2024CodesTo2025Codes(Cleaner):
     """
@@ -517,6 +1209,27 @@ class Map2024CodesTo2025Codes(Cleaner):
 
         return (subheading, description, {"updated": False})
 
+    def compile(self) -> CompiledCleaner:
+        mapped_code = self._code_mappings.get
+        digits = self._digits
+
+        def compiled(subheading: str, description: str):
+            return (mapped_code(subheading[:digits], subheading), description, None)
+
+        return compiled
+
+    def filter_many(
+        self, subheadings: np.ndarray, descriptions: np.ndarray
+    ) -> FilteredColumns:
+        codes = np.strings.slice(subheadings, self._digits)
+        mapped = np.isin(codes, string_column(list(self._code_mappings)))
+        subheadings = subheadings.copy()
+        subheadings[mapped] = [
+            self._code_mappings[code] for code in codes[mapped].tolist()
+        ]
+
+        return keeping(subheadings, descriptions)
+
     @classmethod
     def build(cls) -> "Map2024CodesTo2025Codes":
         return cls(
@@ -563,6 +1276,27 @@ class Map2025CodesTo2026Codes(Cleaner):
 
         return (subheading, description, {"updated": False})
 
+    def compile(self) -> CompiledCleaner:
+        mapped_code = self._code_mappings.get
+        digits = self._digits
+
+        def compiled(subheading: str, description: str):
+            return (mapped_code(subheading[:digits], subheading), description, None)
+
+        return compiled
+
+    def filter_many(
+        self, subheadings: np.ndarray, descriptions: np.ndarray
+    ) -> FilteredColumns:
+        codes = np.strings.slice(subheadings, self._digits)
+        mapped = np.isin(codes, string_column(list(self._code_mappings)))
+        subheadings = subheadings.copy()
+        subheadings[mapped] = [
+            self._code_mappings[code] for code in codes[mapped].tolist()
+        ]
+
+        return keeping(subheadings, descriptions)
+
     @classmethod
     def build(cls) -> "Map2025CodesTo2026Codes":
         return cls(
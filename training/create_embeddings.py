@@ -9,6 +9,7 @@ class EmbeddingsProcessor:
         transformer_model: str,
         torch_device: str = "cpu",
         batch_size: int = 100,
+        max_seq_length: int = 0,
         logger: logging.Logger = logging.getLogger("embeddings"),
     ) -> None:
         self._torch_device = torch_device
@@ -18,6 +19,17 @@ class EmbeddingsProcessor:
         )
         self._logger = logger
 
+        if max_seq_length > 0:
+            self._sentence_transformer_model.max_seq_length = max_seq_length
+
+    @property
+    def tokenizer(self):
+        return self._sentence_transformer_model.tokenizer
+
+    @property
+    def max_seq_length(self) -> int:
+        return self._sentence_transformer_model.max_seq_length
+
     def create_embeddings(self, texts: list[str]):
         self._sentence_transformer_model.to(self._torch_device)
 
@@ -0,0 +1,103 @@
+import logging
+import math
+
+import torch
+from sentence_transformers import SentenceTransformer
+from sentence_transformers.sentence_transformer.modules import (
+    Dense,
+    Normalize,
+    Pooling,
+    Transformer,
+)
+from torch import Tensor, nn, optim
+
+from train_args import TrainScriptArgsParser
+
+logger = logging.getLogger("distill")
+
+
+class StudentEncoderDistiller:
+    """
+    Distils a small student sentence transformer (e.g. a 6 layer MiniLM) from the teacher's embeddings of our own
+    training descriptions.
+
+    The student is mean pooled, projected up to the teacher's embedding size (if it differs) and normalised, then
+    trained to minimise the mean squared error between its embeddings and the teacher's.
+    """
+
+    def __init__(self, args: TrainScriptArgsParser) -> None:
+        self._device = args.torch_device()
+        self._student_transformer = args.student_transformer()
+        self._max_epochs = args.student_max_epochs()
+        self._learning_rate = args.student_learning_rate()
+        self._batch_size = args.embedding_batch_size()
+        self._max_seq_length = args.max_seq_length()
+
+    def build_student(self, teacher_dimensions: int) -> SentenceTransformer:
+        transformer = Transformer(self._student_transformer)
+
+        if self._max_seq_length > 0:
+            transformer.max_seq_length = self._max_seq_length
+
+        student_dimensions = transformer.get_embedding_dimension()
+        modules = [transformer, Pooling(student_dimensions, "mean")]
+
+        if student_dimensions != teacher_dimensions:
+            modules.append(
+                Dense(
+                    student_dimensions,
+                    teacher_dimensions,
+                    activation_function=nn.Identity(),
+                )
+            )
+
+        modules.append(Normalize())
+
+        return SentenceTransformer(modules=modules, device=self._device)
+
+    def run(self, texts: list[str], teacher_embeddings: Tensor) -> SentenceTransformer:
+        student = self.build_student(teacher_embeddings.shape[1])
+        optimizer = optim.AdamW(student.parameters(), lr=self._learning_rate)
+        criterion = nn.MSELoss()
+        batches = math.ceil(len(texts) / self._batch_size)
+
+        logger.info(
+            f"Distilling {self._student_transformer} from {len(texts)} teacher embeddings"
+        )
+
+        for epoch in range(self._max_epochs):
+            student.train()
+            total_loss = 0.0
+
+            for batch, indexes in enumerate(
+                torch.randperm(len(texts)).split(self._batch_size)
+            ):
+                features = student.tokenize([texts[i] for i in indexes])
+                features = {
+                    key: value.to(self._device) if isinstance(value, Tensor) else value
+                    for key, value in features.items()
+                }
+
+                embeddings = student(features)["sentence_embedding"]
+                loss = criterion(
+                    embeddings, teacher_embeddings[indexes].to(self._device)
+                )
+
+                optimizer.zero_grad()
+                loss.backward()
+                optimizer.step()
+
+                total_loss += loss.item()
+
+                if batch % 100 == 0:
+                    logger.info(
+                        f"Epoch {epoch + 1}/{self._max_epochs}, batch {batch + 1}/{batches}, loss {loss.item():.6f}"
+                    )
+
+            logger.info(
+                f"Epoch {epoch + 1}/{self._max_epochs} average loss {total_loss / batches:.6f}"
+            )
+
+        student.eval()
+
+        return student
@@ -2,7 +2,7 @@ import logging
 import torch
 from torch import Tensor, optim, nn
 from torch.utils.data import DataLoader, TensorDataset
-from model.model import SimpleNN
+from model.model import HierarchicalNN, SimpleNN
 from typing import Any, Dict
 from train_args import TrainScriptArgsParser
 import json
@@ -23,9 +23,15 @@ class FlatClassifierModelTrainer:
         self._batch_size = args.model_batch_size()
         self._dropout_prob1 = args.model_dropout_layer_1_percentage()
         self._dropout_prob2 = args.model_dropout_layer_2_percentage()
+        self._fc2_rank = args.fc2_rank()
+        self._hierarchical = args.hierarchical_head()
 
     def run(
-        self, embeddings: Tensor, labels: Tensor, num_labels: int
+        self,
+        embeddings: Tensor,
+        labels: Tensor,
+        num_labels: int,
+        subheadings: list[str] | None = None,
     ) -> tuple[Dict[str, Any], int, int, int]:
         train_dataset = TensorDataset(embeddings, labels)
 
@@ -33,13 +39,24 @@ class FlatClassifierModelTrainer:
         output_size = num_labels  # Number of unique classes in your labels
         hidden_size = int(0.8 * (input_size + output_size))
 
-        model = SimpleNN(
-            input_size,
-            hidden_size,
-            output_size,
-            self._dropout_prob1,
-            self._dropout_prob2,
-        ).to(self._device)
+        # The hierarchical head needs the subheadings for their chapters and headings
+        if self._hierarchical and subheadings is not None:
+            model = HierarchicalNN(
+                input_size,
+                hidden_size,
+                subheadings,
+                self._dropout_prob1,
+                self._dropout_prob2,
+            ).to(self._device)
+        else:
+            model = SimpleNN(
+                input_size,
+                hidden_size,
+                output_size,
+                self._dropout_prob1,
+                self._dropout_prob2,
+                self._fc2_rank,
+            ).to(self._device)
 
         criterion = nn.CrossEntropyLoss()
         optimizer = optim.Adam(model.parameters(), lr=self._learning_rate)
@@ -88,9 +105,23 @@ class FlatClassifierModelTrainer:
                 inputs = inputs.to(self._device)
                 loader_labels = loader_labels.to(self._device)
 
-                outputs = model(inputs)
-
-                loss = criterion(outputs, loader_labels)
+                if isinstance(model, HierarchicalNN):
+                    chapter_outputs, heading_outputs, outputs = model.forward_all(
+                        inputs
+                    )
+                    loss = (
+                        criterion(outputs, loader_labels)
+                        + criterion(
+                            heading_outputs, model.heading_of_subheading[loader_labels]
+                        )
+                        + criterion(
+                            chapter_outputs, model.chapter_of_subheading[loader_labels]
+                        )
+                    )
+                else:
+                    outputs = model(inputs)
+
+                    loss = criterion(outputs, loader_labels)
                 loss.backward()
                 optimizer.step()
                 scheduler.step()  # Update learning rate (learning rate warm up)
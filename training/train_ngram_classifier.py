@@ -0,0 +1,86 @@
+import logging
+
+import numpy as np
+import torch
+from torch import nn, optim
+from torch.utils.data import DataLoader, TensorDataset
+
+from inference.ngram_classifier import NgramModel, ngram_ids
+from train_args import TrainScriptArgsParser
+
+logger = logging.getLogger("train")
+
+
+class NgramClassifierTrainer:
+    """
+    Trains the hashed n-gram linear classifier that answers confident searches ahead of the sentence
+    transformer in the cascade, on the same training data as the main model.
+    """
+
+    def __init__(self, args: TrainScriptArgsParser) -> None:
+        self._device = args.torch_device()
+        self._max_epochs = args.ngram_max_epochs()
+        self._learning_rate = args.ngram_learning_rate()
+        self._batch_size = args.model_batch_size()
+        self._buckets = args.ngram_buckets()
+        self._dimensions = args.ngram_dimensions()
+
+    def run(
+        self,
+        texts: list[str],
+        text_indexes: list[int],
+        labels: torch.Tensor,
+        num_labels: int,
+    ) -> NgramModel:
+        text_ids = [torch.from_numpy(ngram_ids(text, self._buckets)) for text in texts]
+        train_loader = DataLoader(
+            TensorDataset(torch.tensor(text_indexes, dtype=torch.long), labels),
+            batch_size=self._batch_size,
+            shuffle=True,
+        )
+
+        model = NgramModel(self._buckets, self._dimensions, num_labels).to(self._device)
+        # The n-gram vectors get sparse gradients as each batch only touches a handful of buckets
+        sparse_optimizer = optim.SparseAdam(
+            model.embeddings.parameters(), lr=self._learning_rate
+        )
+        dense_optimizer = optim.Adam(model.fc.parameters(), lr=self._learning_rate)
+        criterion = nn.CrossEntropyLoss()
+
+        logger.info("Created n-gram model")
+        logger.info(model)
+
+        for epoch in range(self._max_epochs):
+            model.train()
+            running_loss = 0.0
+            correct = 0
+
+            for indexes, loader_labels in train_loader:
+                batch_ids = [text_ids[i] for i in indexes]
+                offsets = torch.tensor(
+                    np.cumsum([0] + [len(ids) for ids in batch_ids[:-1]]),
+                    dtype=torch.long,
+                )
+                loader_labels = loader_labels.to(self._device)
+
+                outputs = model(
+                    torch.cat(batch_ids).to(self._device), offsets.to(self._device)
+                )
+                loss = criterion(outputs, loader_labels)
+
+                sparse_optimizer.zero_grad()
+                dense_optimizer.zero_grad()
+                loss.backward()
+                sparse_optimizer.step()
+                dense_optimizer.step()
+
+                running_loss += loss.item()
+                correct += (outputs.argmax(1) == loader_labels).sum().item()
+
+            logger.info(
+                f"n-gram {epoch + 1} \n Accuracy: {(100 * correct / len(text_indexes)):>0.1f}%, Avg loss: {(running_loss / len(train_loader)):>8f} \n"
+            )
+
+        model.eval()
+
+        return model.to("cpu")
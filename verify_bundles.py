@@ -0,0 +1,18 @@
+from model.bundle import ModelBundle
+from train_args import args
+
+
+# The bundles are only checked against their checksums when they're written, so this checks them again once
+# they've been copied into the image and before they're deployed.
+def verify_bundles():
+    bundle_files = sorted(args.target_dir().glob("*.bundle"))
+
+    for bundle_file in bundle_files:
+        print(f"== Verifying {bundle_file.name} ==")
+        ModelBundle.verify(bundle_file)
+
+    print(f"== {len(bundle_files)} model bundles verified ==")
+
+
+if __name__ == "__main__":
+    verify_bundles()